@@ -0,0 +1,160 @@
+import asyncio
+from collections import deque
+
+# Overflow policies
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+SAMPLE = "sample"
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, SAMPLE)
+
+
+class BoundedBuffer:
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST, sample_every=10):
+        """
+        Fixed-capacity FIFO between telemetry producers and their consumer
+
+        Drop-in for the asyncio.Queue put/get/qsize calls. Memory stays
+        bounded whether or not a consumer is attached; what happens on
+        overflow depends on the policy:
+
+            block:       put() waits for space (put_nowait() drops the new item)
+            drop_oldest: the oldest item is evicted to make room
+            drop_newest: the new item is discarded
+            sample:      1 in `sample_every` overflowing items evicts the oldest,
+                         the rest are discarded
+
+        Args:
+            maxsize: Maximum number of buffered items
+            policy: One of POLICIES
+            sample_every: Admission interval for the sample policy
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown buffer policy '{policy}', expected one of {', '.join(POLICIES)}")
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sample_every = max(1, sample_every)
+        self.items = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._overflows = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0
+
+    def qsize(self):
+        return len(self.items)
+
+    def empty(self):
+        return not self.items
+
+    def full(self):
+        return len(self.items) >= self.maxsize
+
+    def _append(self, item):
+        self.items.append(item)
+        self.enqueued += 1
+        self._not_empty.set()
+        if len(self.items) >= self.maxsize:
+            self._not_full.clear()
+
+    def put_nowait(self, item):
+        """
+        Add an item without waiting, applying the overflow policy
+
+        Returns:
+            bool: False if the new item was dropped
+        """
+        if len(self.items) < self.maxsize:
+            self._append(item)
+            return True
+        if self.policy in (BLOCK, DROP_NEWEST):
+            self.dropped += 1
+            return False
+        if self.policy == SAMPLE:
+            self._overflows += 1
+            if self._overflows % self.sample_every:
+                self.dropped += 1
+                return False
+        self.items.popleft()
+        self.dropped += 1
+        self._append(item)
+        return True
+
+    async def put(self, item):
+        """Add an item; only the block policy ever waits"""
+        if self.policy == BLOCK:
+            if len(self.items) >= self.maxsize:
+                self.blocked += 1
+            while len(self.items) >= self.maxsize:
+                self._not_full.clear()
+                await self._not_full.wait()
+            self._append(item)
+            return True
+        return self.put_nowait(item)
+
+    async def put_many(self, items):
+        """
+        Add a batch of items in order
+
+        The block policy waits for space as often as needed; the other
+        policies apply put_nowait() to each item.
+
+        Returns:
+            int: Number of items dropped
+        """
+        if self.policy != BLOCK:
+            return sum(not self.put_nowait(item) for item in items)
+        start = 0
+        while start < len(items):
+            if len(self.items) >= self.maxsize:
+                self.blocked += 1
+                while len(self.items) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            end = start + self.maxsize - len(self.items)
+            for item in items[start:end]:
+                self._append(item)
+            start = end
+        return 0
+
+    def get_nowait(self):
+        if not self.items:
+            raise asyncio.QueueEmpty
+        item = self.items.popleft()
+        if not self.items:
+            self._not_empty.clear()
+        self._not_full.set()
+        return item
+
+    async def get(self):
+        while not self.items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    async def get_batch(self, max_items):
+        """Wait for at least one item, then take up to max_items without waiting"""
+        while not self.items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        count = min(max_items, len(self.items))
+        batch = [self.items.popleft() for _ in range(count)]
+        if not self.items:
+            self._not_empty.clear()
+        self._not_full.set()
+        return batch
+
+    def get_stats(self):
+        """Queue depth and drop counters"""
+        return {
+            "depth": len(self.items),
+            "capacity": self.maxsize,
+            "policy": self.policy,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "blocked_puts": self.blocked,
+        }
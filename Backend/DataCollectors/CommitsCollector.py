@@ -1,7 +1,11 @@
-from pydriller import Repository
+from pydriller import Repository, Git
 import json
 import sys
 import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from datetime import datetime
 
@@ -9,36 +13,153 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from Services.MongoClient import MongoDBClient
 
+
+def _commit_document(commit, repo_name):
+    """
+    Build the stored document for a pydriller commit
+    
+    Only the diff of each modified file and its stats are extracted; the
+    full before/after file contents are never materialized.
+    """
+    commit_info = {
+        "hash": commit.hash,
+        "message": commit.msg,
+        "timestamp": commit.committer_date,
+        "author": commit.author.name,
+        "repo_name": repo_name,
+        "added_lines": commit.insertions,
+        "deleted_lines": commit.deletions,
+        "files": []
+    }
+    for mod in commit.modified_files:
+        commit_info["files"].append({
+            "filename": mod.filename,
+            "change_type": mod.change_type.name,
+            "added_lines": mod.added_lines,
+            "deleted_lines": mod.deleted_lines,
+            "changed_methods": [method.name for method in mod.changed_methods],
+            "diff": mod.diff
+        })
+    return commit_info
+
+
+def _extract_commits(git, repo_name, hashes):
+    return [_commit_document(git.get_commit(commit_hash), repo_name) for commit_hash in hashes]
+
+
+# Repository handle of a mining process, opened once by _init_worker
+_worker_git = None
+
+
+def _init_worker(repo_path):
+    global _worker_git
+    for attempt in range(20):
+        try:
+            _worker_git = Git(repo_path)
+            return
+        except OSError:
+            # pydriller writes .git/config on open; another worker holds its lock
+            time.sleep(0.05 * (attempt + 1))
+    _worker_git = Git(repo_path)
+
+
+def _mine_chunk(repo_name, hashes):
+    """Process pool worker: extract the documents of a chunk of commits"""
+    return _extract_commits(_worker_git, repo_name, hashes)
+
+
 class CommitsCollector:
     def __init__(self, repo_path: str = None, mongo_client=None):
         """
         Initialize the collector with a repository path or URL.
         """
         self.repo_path = repo_path
+        self.repo_name = Path(repo_path).name if repo_path else "unknown"
         self.mongo_client = mongo_client or MongoDBClient()
 
+    def sync_commits(self, batch_size: int = 100, workers: int = None):
+        """
+        Store commits made since the last sync of this repository
+        
+        Traversal resumes from the per-repo checkpoint (hash of the newest
+        synced commit), so repeated syncs only process new commits. The
+        checkpoint advances after every stored batch.
+        
+        Args:
+            batch_size: Commits per worker chunk and per storage batch
+            workers: Mining processes for local repositories (defaults to the CPU count)
+        
+        Returns:
+            int: Number of commits processed
+        """
+        checkpoint = self.mongo_client.get_sync_checkpoint(self.repo_name)
+        try:
+            return self._sync_from(checkpoint, batch_size, workers)
+        except Exception as e:
+            if not checkpoint:
+                raise
+            # Checkpoint no longer reachable (e.g. rewritten history): full resync, upserts dedupe
+            print(f"Resuming from checkpoint {checkpoint} failed ({e}), resyncing {self.repo_name}")
+            return self._sync_from(None, batch_size, workers)
+
+    def _sync_from(self, checkpoint, batch_size, workers):
+        repository = Repository(self.repo_path, from_commit=checkpoint) if checkpoint \
+            else Repository(self.repo_path)
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and os.path.isdir(self.repo_path):
+            # Listing hashes is cheap; diffs are extracted by the pool
+            hashes = [commit.hash for commit in repository.traverse_commits() if commit.hash != checkpoint]
+            return self._mine_parallel(hashes, batch_size, workers)
+        return self._store_traversal(repository.traverse_commits(), checkpoint, batch_size)
+
+    def _mine_parallel(self, hashes, batch_size, workers):
+        """Split the commits (oldest first) into chunks mined by a process pool"""
+        chunks = [hashes[i:i + batch_size] for i in range(0, len(hashes), batch_size)]
+        processed = 0
+        if len(chunks) <= 1:
+            git = Git(self.repo_path)
+            try:
+                for chunk in chunks:
+                    processed += self._store_batch(_extract_commits(git, self.repo_name, chunk))
+            finally:
+                git.clear()
+            return processed
+        
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context,
+                                 initializer=_init_worker, initargs=(self.repo_path,)) as pool:
+            # map yields chunks in order, so the checkpoint only ever moves forward
+            for batch in pool.map(_mine_chunk, repeat(self.repo_name), chunks):
+                processed += self._store_batch(batch)
+        return processed
+
+    def _store_traversal(self, commits, checkpoint, batch_size):
+        batch = []
+        processed = 0
+        for commit in commits:
+            if commit.hash == checkpoint:
+                continue  # from_commit is inclusive
+            batch.append(_commit_document(commit, self.repo_name))
+            if len(batch) >= batch_size:
+                processed += self._store_batch(batch)
+                batch = []
+        if batch:
+            processed += self._store_batch(batch)
+        return processed
+
+    def _store_batch(self, batch):
+        self.mongo_client.store_commits(batch)
+        self.mongo_client.set_sync_checkpoint(self.repo_name, batch[-1]["hash"])
+        return len(batch)
+
     def get_all_commits(self):
         """
-        Get all commits with filenames and source code.
-        Returns a list of dicts: [{hash, message, files: [{filename, code}]}]
+        Get all commits with the diff and stats of every modified file.
+        Returns a list of dicts: [{hash, message, files: [{filename, diff, added_lines, ...}]}]
         """
         commits_data = []
         for commit in Repository(self.repo_path).traverse_commits():
-            commit_info = {
-                "hash": commit.hash,
-                "message": commit.msg,
-                "timestamp": commit.committer_date,
-                "author": commit.author.name,
-                "repo_name": Path(self.repo_path).name if self.repo_path else "unknown",
-                "files": []
-            }
-            for mod in commit.modifications:
-                if mod.source_code:  # Only include files with source code
-                    commit_info["files"].append({
-                        "filename": mod.filename,
-                        "code": mod.source_code
-                    })
-            commits_data.append(commit_info)
+            commits_data.append(_commit_document(commit, self.repo_name))
         
         # Store in MongoDB
         if commits_data:
@@ -55,22 +176,9 @@ class CommitsCollector:
             commits = self.mongo_client.get_commits(limit=1)
             return commits[0] if commits else None
             
-        repo = Repository(self.repo_path)
+        repo = Repository(self.repo_path, order='reverse')
         latest_commit = next(repo.traverse_commits())
-        commit_info = {
-            "hash": latest_commit.hash,
-            "message": latest_commit.msg,
-            "timestamp": latest_commit.committer_date,
-            "author": latest_commit.author.name,
-            "repo_name": Path(self.repo_path).name,
-            "files": []
-        }
-        for mod in latest_commit.modifications:
-            if mod.source_code:  # Only include files with source code
-                commit_info["files"].append({
-                    "filename": mod.filename,
-                    "code": mod.source_code
-                })
+        commit_info = _commit_document(latest_commit, self.repo_name)
         
         # Store in MongoDB
         self.mongo_client.store_commit(commit_info)
@@ -84,32 +192,25 @@ class CommitsCollector:
         if not self.repo_path:
             # Return from MongoDB if no repo path
             return self.mongo_client.get_commits(limit=k)
-            
+        
+        # Walk newest first and stop after k commits or at the sync checkpoint
+        checkpoint = self.mongo_client.get_sync_checkpoint(self.repo_name)
         commits_data = []
-        for i, commit in enumerate(Repository(self.repo_path).traverse_commits()):
-            if i >= k:
+        complete = True
+        for commit in Repository(self.repo_path, order='reverse').traverse_commits():
+            if commit.hash == checkpoint:
+                break
+            if len(commits_data) >= k:
+                complete = False
                 break
-            commit_info = {
-                "hash": commit.hash,
-                "message": commit.msg,
-                "timestamp": commit.committer_date,
-                "author": commit.author.name,
-                "repo_name": Path(self.repo_path).name,
-                "files": []
-            }
-            for mod in commit.modifications:
-                if mod.source_code: 
-                    commit_info["files"].append({
-                        "filename": mod.filename,
-                        "code": mod.source_code
-                    })
-            commits_data.append(commit_info)
+            commits_data.append(_commit_document(commit, self.repo_name))
         
-        # Store in MongoDB
         if commits_data:
             self.mongo_client.store_commits(commits_data)
-        
-        return commits_data
+            if complete:
+                # Everything newer than the old checkpoint is stored now
+                self.mongo_client.set_sync_checkpoint(self.repo_name, commits_data[0]["hash"])
+        return self.mongo_client.get_commits(limit=k, repo_name=self.repo_name)
 
     def get_commits_from_mongo(self, k: int = None, repo_name: str = None):
         """
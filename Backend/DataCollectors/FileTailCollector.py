@@ -0,0 +1,338 @@
+import asyncio
+import datetime
+import glob
+import json
+import os
+import threading
+import time
+from Services.LogParser import LogParser
+
+
+class _TailedFile:
+    __slots__ = ("path", "fd", "dev", "ino", "offset", "partial", "pending", "last_data", "delivered", "generation")
+
+    def __init__(self, path, fd, stat, offset):
+        self.path = path
+        self.fd = fd
+        self.dev = stat.st_dev
+        self.ino = stat.st_ino
+        self.offset = offset
+        self.partial = b""
+        # Last parsed event, held back until we know no continuation lines follow
+        self.pending = None
+        self.last_data = 0.0
+        # End of the bytes whose events the callback has received (set on the event loop)
+        self.delivered = offset
+        # Bumped on truncation so batches read before it cannot move `delivered`
+        self.generation = 0
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileTailCollector:
+    def __init__(self, paths, callback=None, checkpoint_path=None, chunk_size=1024 * 1024,
+                 poll_interval=0.25, checkpoint_interval=5.0, start_at_end=True, max_in_flight=8,
+                 parser=None, multiline_timeout=1.0):
+        """
+        Follow application log files and feed their lines into the ingest path
+
+        A single reader thread polls every file, reads new bytes in large
+        chunks, decodes each chunk once and splits it into lines; complete
+        lines are parsed into records (multi-line stack traces folded into
+        one event) and handed to `callback("log", records)` on the event loop.
+        Rotation (new inode at the path) drains the old file before
+        switching, truncation (size below the offset) restarts at 0.
+        Offsets are checkpointed to a JSON file so a restart resumes
+        where it stopped; a checkpoint only covers events the callback has
+        already received, so a held-back multi-line event or a batch still
+        queued for the event loop is read again after a restart, not lost.
+
+        Args:
+            paths: File paths or glob patterns, re-expanded on every poll
+            callback: Called on the event loop with ("log", [records])
+            checkpoint_path: JSON file holding the offsets (defaults to data/tail_checkpoints.json)
+            chunk_size: Bytes per read
+            poll_interval: Seconds to sleep when no file had new data
+            checkpoint_interval: Seconds between checkpoint writes
+            start_at_end: Files without a checkpoint present at startup start at their end
+            max_in_flight: Batches handed to the event loop but not processed yet; reading
+                           pauses beyond this, so a slow pipeline cannot grow memory
+            parser: LogParser turning lines into records
+            multiline_timeout: Seconds a file may stay quiet in the middle of a stack trace
+                               before the partial event is emitted anyway
+        """
+        self.patterns = list(paths)
+        self.callback = callback
+        if checkpoint_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            checkpoint_path = os.path.join(project_root, "data", "tail_checkpoints.json")
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.start_at_end = start_at_end
+        self.parser = parser or LogParser()
+        self.multiline_timeout = multiline_timeout
+        self.files = {}
+        self.checkpoints = {}
+        self.loop = None
+        self.thread = None
+        self._stop = threading.Event()
+        self.max_in_flight = max_in_flight
+        self._in_flight = threading.Semaphore(max_in_flight)
+        self.stats = {"bytes": 0, "lines": 0, "rotations": 0, "truncations": 0}
+        self._snapshot = {**self.stats, "files": [], "parsing": self.parser.get_stats()}
+
+    # =============== CHECKPOINTS ===============
+
+    def _load_checkpoints(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                self.checkpoints = json.load(f)
+        except (OSError, ValueError):
+            self.checkpoints = {}
+
+    def save_checkpoints(self):
+        """Atomically persist, for every file, the offset up to which events were delivered"""
+        for tailed in list(self.files.values()):
+            self.checkpoints[tailed.path] = {
+                "dev": tailed.dev,
+                "ino": tailed.ino,
+                "offset": tailed.delivered,
+            }
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.checkpoints, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # =============== FILES ===============
+
+    def _expand(self):
+        paths = []
+        for pattern in self.patterns:
+            matches = glob.glob(pattern)
+            paths.extend(matches if matches else [pattern])
+        return paths
+
+    def _open(self, path, initial):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        stat = os.fstat(fd)
+        checkpoint = self.checkpoints.get(path)
+        if checkpoint and checkpoint["dev"] == stat.st_dev and checkpoint["ino"] == stat.st_ino \
+                and checkpoint["offset"] <= stat.st_size:
+            offset = checkpoint["offset"]
+        elif initial and self.start_at_end and not checkpoint:
+            offset = stat.st_size
+        else:
+            # Rotated while we were down, or created after startup: read it all
+            offset = 0
+        os.lseek(fd, offset, os.SEEK_SET)
+        return _TailedFile(path, fd, stat, offset)
+
+    def _check_rotation(self, tailed):
+        """Returns the file to keep reading, reopening it after rotation or truncation"""
+        try:
+            stat = os.stat(tailed.path)
+        except OSError:
+            return tailed  # Renamed away and not recreated yet; keep draining the old inode
+        if stat.st_dev != tailed.dev or stat.st_ino != tailed.ino:
+            # Rotated: finish the old file first, then follow the new one from its start
+            self._read_available(tailed)
+            if tailed.partial:
+                self._deliver(tailed, [tailed.partial.decode("utf-8", errors="replace")])
+                tailed.partial = b""
+            self._deliver_pending(tailed, force=True)
+            tailed.close()
+            self.stats["rotations"] += 1
+            self.checkpoints.pop(tailed.path, None)
+            return self._open(tailed.path, initial=False)
+        if stat.st_size < tailed.offset:
+            # Truncated in place (copytruncate)
+            os.lseek(tailed.fd, 0, os.SEEK_SET)
+            tailed.offset = 0
+            tailed.partial = b""
+            tailed.generation += 1
+            tailed.delivered = 0
+            self.stats["truncations"] += 1
+        return tailed
+
+    def _read_available(self, tailed, max_chunks=None):
+        """Read new bytes in chunks and deliver the complete lines; returns bytes read"""
+        total = 0
+        chunks = 0
+        while not self._stop.is_set() and (max_chunks is None or chunks < max_chunks):
+            data = os.read(tailed.fd, self.chunk_size)
+            if not data:
+                break
+            chunks += 1
+            total += len(data)
+            tailed.last_data = time.monotonic()
+            tailed.offset += len(data)
+            end = data.rfind(b"\n")
+            if end < 0:
+                tailed.partial += data
+                continue
+            complete = tailed.partial + data[:end] if tailed.partial else data[:end]
+            tailed.partial = data[end + 1:]
+            # One decode per chunk; lines are slices of the decoded text
+            lines = complete.decode("utf-8", errors="replace").split("\n")
+            self._deliver(tailed, lines, complete)
+        self.stats["bytes"] += total
+        return total
+
+    def _deliver(self, tailed, lines, complete=None):
+        """Parse complete lines (the bytes `complete` read before the partial line) and emit their events"""
+        self.stats["lines"] += len(lines)
+        previous = tailed.pending
+        records, tailed.pending = self.parser.assemble(
+            [line[:-1] if line.endswith("\r") else line for line in lines], tailed.path, previous)
+        # The emitted events cover the bytes up to the start of the held-back one
+        end = tailed.offset - len(tailed.partial)
+        if tailed.pending is None:
+            covered = end
+        elif tailed.pending is previous or complete is None:
+            covered = None
+        else:
+            covered = self._line_offset(complete, len(lines), tailed.pending["_start_line"], end)
+        self._emit(records, tailed, covered)
+
+    @staticmethod
+    def _line_offset(complete, line_count, index, end):
+        """File offset of line `index` of `complete`, the bytes ending with the newline before `end`"""
+        position = len(complete)
+        for _ in range(line_count - index):
+            position = complete.rfind(b"\n", 0, position)
+        return end - len(complete) + position
+
+    def _deliver_pending(self, tailed, force=False):
+        """Emit the held-back last event once the file has gone quiet"""
+        if tailed.pending is None:
+            return
+        # A writer may still be in the middle of a stack trace
+        if not force and tailed.pending.get("_open_traceback") \
+                and time.monotonic() - tailed.last_data < self.multiline_timeout:
+            return
+        event, tailed.pending = tailed.pending, None
+        self._emit([self.parser.flush(event)], tailed, tailed.offset - len(tailed.partial))
+
+    def _emit(self, records, tailed=None, covered=None):
+        """Hand records to the callback; `covered` becomes the delivered offset of `tailed` once it ran"""
+        if covered is None and not records:
+            return
+        now = datetime.datetime.utcnow().isoformat()
+        for record in records:
+            record.setdefault("timestamp", now)
+        if self.callback is None or self.loop is None:
+            return
+        # Bounded hand-off: block the reader while the event loop is behind
+        while not self._in_flight.acquire(timeout=0.5):
+            if self.loop.is_closed():
+                return
+        self.loop.call_soon_threadsafe(self._run_callback, records, tailed,
+                                       tailed.generation if tailed is not None else None, covered)
+
+    def _run_callback(self, records, tailed=None, generation=None, covered=None):
+        try:
+            if records:
+                self.callback("log", records)
+        except Exception as e:
+            print(f"Error handling tailed logs: {e}")
+        finally:
+            self._in_flight.release()
+            # Batches run in the order they were read, so offsets only move forward
+            if covered is not None and tailed.generation == generation and covered > tailed.delivered:
+                tailed.delivered = covered
+
+    def _wait_delivered(self, timeout=5.0):
+        """Wait until the event loop has run every batch handed to it"""
+        deadline = time.monotonic() + timeout
+        acquired = 0
+        while acquired < self.max_in_flight and self.loop is not None and not self.loop.is_closed() \
+                and self._in_flight.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            acquired += 1
+        for _ in range(acquired):
+            self._in_flight.release()
+
+    # =============== READER THREAD ===============
+
+    def _poll_once(self, initial=False):
+        """One pass over every file; returns bytes read"""
+        total = 0
+        for path in self._expand():
+            tailed = self.files.get(path)
+            if tailed is None:
+                tailed = self._open(path, initial)
+                if tailed is None:
+                    continue
+                self.files[path] = tailed
+            tailed = self._check_rotation(tailed)
+            if tailed is None:
+                self.files.pop(path, None)
+                continue
+            self.files[path] = tailed
+            # A few chunks per file per pass keeps one busy file from starving the rest
+            read = self._read_available(tailed, max_chunks=4)
+            if not read:
+                self._deliver_pending(tailed)
+            total += read
+        return total
+
+    def _run(self):
+        self._load_checkpoints()
+        self._poll_once(initial=True)
+        last_checkpoint = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                read = self._poll_once()
+            except Exception as e:
+                print(f"Error tailing log files: {e}")
+                read = 0
+            self._publish_stats()
+            if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                self._save_checkpoints_safely()
+                last_checkpoint = time.monotonic()
+            if not read:
+                self._stop.wait(self.poll_interval)
+        for tailed in self.files.values():
+            self._deliver_pending(tailed, force=True)
+        self._wait_delivered()
+        self._save_checkpoints_safely()
+        for tailed in self.files.values():
+            tailed.close()
+        self.files = {}
+        self._publish_stats()
+
+    def _publish_stats(self):
+        # Built on the reader thread, which owns files and stats; get_stats only swaps in the reference
+        self._snapshot = {**self.stats, "files": sorted(self.files), "parsing": self.parser.get_stats()}
+
+    def _save_checkpoints_safely(self):
+        try:
+            self.save_checkpoints()
+        except OSError as e:
+            print(f"Error saving tail checkpoints: {e}")
+
+    async def start(self):
+        """Start the reader thread; batches are delivered on the running event loop"""
+        if self.thread is None:
+            self.loop = asyncio.get_running_loop()
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run, name="file-tail", daemon=True)
+            self.thread.start()
+            print(f"Tailing log files: {', '.join(self.patterns)}")
+
+    async def stop(self):
+        """Stop reading and write the final checkpoint"""
+        if self.thread is not None:
+            self._stop.set()
+            await asyncio.get_running_loop().run_in_executor(None, self.thread.join)
+            self.thread = None
+
+    def get_stats(self):
+        """Counters as of the reader thread's last poll"""
+        return self._snapshot
@@ -0,0 +1,323 @@
+import asyncio
+import datetime
+import os
+import socket
+import time
+
+# /proc/meminfo keys read each sample (values in kB)
+MEMINFO_KEYS = (b"MemTotal", b"MemAvailable", b"MemFree", b"Buffers", b"Cached", b"SwapTotal", b"SwapFree")
+
+# Bytes per sector in /proc/diskstats, independent of the device's block size
+SECTOR_BYTES = 512
+
+READ_SIZE = 64 * 1024
+
+
+class _ProcFile:
+    """A /proc file kept open and re-read from offset 0 on every sample"""
+    __slots__ = ("path", "fd")
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        return os.pread(self.fd, READ_SIZE, 0)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Process:
+    __slots__ = ("fd", "start_time", "ticks")
+
+    def __init__(self, fd, start_time, ticks):
+        self.fd = fd
+        self.start_time = start_time
+        self.ticks = ticks
+
+
+def _parse_pid_stat(data):
+    """Returns (name, state fields after the name) from /proc/<pid>/stat"""
+    # The name may contain spaces and parentheses; it ends at the last ')'
+    end = data.rfind(b")")
+    return data[data.find(b"(") + 1:end], data[end + 2:].split(b" ", 22)
+
+
+class HostMetricsCollector:
+    def __init__(self, interval=1.0, callback=None, proc_root="/proc", top_processes=5,
+                 max_process_handles=1024):
+        """
+        Sample real host CPU, memory, disk, network and process stats from /proc
+
+        The system-wide /proc files stay open and are re-read with pread,
+        and per-process stat files are opened once per process and kept
+        until the process exits, so a sample costs a few syscalls per
+        process and no path lookups. Counters are turned into rates from
+        the delta to the previous sample. Each sample is handed to
+        `callback("metric", metric)` in the existing metric schema
+        (cpu_percent, memory_percent, memory_used_mb, memory_total_mb)
+        plus host fields.
+
+        Args:
+            interval: Seconds between samples
+            callback: Called on the event loop with ("metric", metric)
+            proc_root: Mount point of procfs
+            top_processes: Busiest processes included in each sample
+            max_process_handles: Per-process stat files kept open; others are reopened each sample
+        """
+        self.interval = interval
+        self.callback = callback
+        self.proc_root = proc_root
+        self.top_processes = top_processes
+        self.max_process_handles = max_process_handles
+        self.hostname = socket.gethostname()
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        self.files = {}
+        self.processes = {}
+        self.open_handles = 0
+        self.disks = None
+        self.previous = None
+        self.task = None
+        self.stats = {"samples": 0, "errors": 0, "last_sample_ms": 0.0, "cpu_seconds": 0.0}
+        self.started_at = None
+
+    # =============== SYSTEM FILES ===============
+
+    def _read(self, name):
+        proc_file = self.files.get(name)
+        if proc_file is None:
+            proc_file = self.files[name] = _ProcFile(os.path.join(self.proc_root, name))
+        return proc_file.read()
+
+    def _whole_disks(self):
+        """Block devices backed by hardware (no partitions, loop, ram or zram devices)"""
+        try:
+            return {name for name in os.listdir("/sys/block")
+                    if os.path.exists(os.path.join("/sys/block", name, "device"))}
+        except OSError:
+            return None
+
+    def _cpu_times(self):
+        # First line: "cpu  user nice system idle iowait irq softirq steal guest guest_nice"
+        data = self._read("stat")
+        fields = data[:data.find(b"\n")].split()
+        times = [int(value) for value in fields[1:9]]
+        return sum(times), times[3] + times[4], times[4]
+
+    def _memory(self):
+        values = {}
+        for line in self._read("meminfo").split(b"\n"):
+            key, _, rest = line.partition(b":")
+            if key in MEMINFO_KEYS:
+                values[key] = int(rest.split()[0])
+                if len(values) == len(MEMINFO_KEYS):
+                    break
+        return values
+
+    def _disk_bytes(self):
+        if self.disks is None:
+            self.disks = self._whole_disks() or set()
+        read = written = 0
+        for line in self._read("diskstats").split(b"\n"):
+            fields = line.split()
+            if len(fields) < 10:
+                continue
+            name = fields[2].decode()
+            if (name in self.disks) if self.disks else not name.startswith(("loop", "ram", "zram")):
+                read += int(fields[5])
+                written += int(fields[9])
+        return read * SECTOR_BYTES, written * SECTOR_BYTES
+
+    def _network_bytes(self):
+        received = sent = 0
+        # Two header lines, then "iface: rx_bytes ... (8 rx fields) tx_bytes ..."
+        for line in self._read("net/dev").split(b"\n")[2:]:
+            name, _, rest = line.partition(b":")
+            if not rest or name.strip() == b"lo":
+                continue
+            fields = rest.split()
+            received += int(fields[0])
+            sent += int(fields[8])
+        return received, sent
+
+    def _load_average(self):
+        fields = self._read("loadavg").split(b" ", 3)
+        return float(fields[0]), float(fields[1]), float(fields[2])
+
+    # =============== PROCESSES ===============
+
+    def _read_process(self, pid):
+        """Returns (name, fields) for a pid, reusing its open stat file; None once it exited"""
+        process = self.processes.get(pid)
+        if process is not None and process.fd is not None:
+            try:
+                return _parse_pid_stat(os.pread(process.fd, 4096, 0))
+            except OSError:
+                self._forget(pid)
+                process = None
+        try:
+            fd = os.open(os.path.join(self.proc_root, pid, "stat"), os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            data = os.pread(fd, 4096, 0)
+        except OSError:
+            os.close(fd)
+            return None
+        if process is None:
+            process = self.processes[pid] = _Process(None, None, 0)
+        if self.open_handles < self.max_process_handles:
+            process.fd = fd
+            self.open_handles += 1
+        else:
+            os.close(fd)
+        return _parse_pid_stat(data)
+
+    def _forget(self, pid):
+        process = self.processes.pop(pid)
+        if process.fd is not None:
+            os.close(process.fd)
+            self.open_handles -= 1
+
+    def _sample_processes(self, elapsed):
+        """Per-process CPU and RSS; returns (process count, busiest processes)"""
+        seen = set()
+        busiest = []
+        ticks_to_percent = 100.0 / (self.clock_ticks * elapsed) if elapsed else 0.0
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                pid = entry.name
+                if not pid.isdigit():
+                    continue
+                parsed = self._read_process(pid)
+                if parsed is None:
+                    continue
+                name, fields = parsed
+                seen.add(pid)
+                # Fields after the name: state is index 0, utime 11, stime 12, threads 17, starttime 19, rss 21
+                ticks = int(fields[11]) + int(fields[12])
+                start_time = fields[19]
+                process = self.processes[pid]
+                if process.start_time == start_time:
+                    busiest.append(((ticks - process.ticks) * ticks_to_percent, pid, name, fields))
+                process.start_time = start_time
+                process.ticks = ticks
+        for pid in [pid for pid in self.processes if pid not in seen]:
+            self._forget(pid)
+
+        busiest.sort(key=lambda item: item[0], reverse=True)
+        top = [
+            {
+                "pid": int(pid),
+                "name": name.decode("utf-8", errors="replace"),
+                "cpu_percent": round(cpu, 2),
+                "rss_mb": round(int(fields[21]) * self.page_mb, 1),
+                "threads": int(fields[17]),
+            }
+            for cpu, pid, name, fields in busiest[:self.top_processes]
+            if cpu > 0
+        ]
+        return len(seen), top
+
+    # =============== SAMPLING ===============
+
+    def sample(self):
+        """
+        Take one sample
+
+        Returns:
+            Dict: Metric document, or None for the first sample (no rates yet)
+        """
+        started = time.thread_time()
+        now = time.monotonic()
+        total, idle, iowait = self._cpu_times()
+        disk_read, disk_written = self._disk_bytes()
+        net_received, net_sent = self._network_bytes()
+        elapsed = now - self.previous["time"] if self.previous else 0.0
+        process_count, top = self._sample_processes(elapsed)
+        current = {"time": now, "cpu_total": total, "cpu_idle": idle, "cpu_iowait": iowait,
+                   "disk_read": disk_read, "disk_written": disk_written,
+                   "net_received": net_received, "net_sent": net_sent}
+        previous, self.previous = self.previous, current
+        if previous is None or elapsed <= 0:
+            return None
+
+        memory = self._memory()
+        load_1m, load_5m, load_15m = self._load_average()
+        cpu_delta = (total - previous["cpu_total"]) or 1
+        memory_total = memory.get(b"MemTotal", 0)
+        # Older kernels lack MemAvailable; free + buffers + cache approximates it
+        available = memory.get(b"MemAvailable",
+                               memory.get(b"MemFree", 0) + memory.get(b"Buffers", 0) + memory.get(b"Cached", 0))
+        metric = {
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "metric_type": "system",
+            "source": "host",
+            "host": self.hostname,
+            "cpu_percent": round(100.0 * (1 - (idle - previous["cpu_idle"]) / cpu_delta), 2),
+            "cpu_iowait_percent": round(100.0 * (iowait - previous["cpu_iowait"]) / cpu_delta, 2),
+            "memory_percent": round(100.0 * (memory_total - available) / memory_total, 2) if memory_total else 0.0,
+            "memory_used_mb": (memory_total - available) // 1024,
+            "memory_total_mb": memory_total // 1024,
+            "swap_used_mb": (memory.get(b"SwapTotal", 0) - memory.get(b"SwapFree", 0)) // 1024,
+            "load_1m": load_1m,
+            "load_5m": load_5m,
+            "load_15m": load_15m,
+            "disk_read_bytes_per_sec": round((disk_read - previous["disk_read"]) / elapsed),
+            "disk_write_bytes_per_sec": round((disk_written - previous["disk_written"]) / elapsed),
+            "net_rx_bytes_per_sec": round((net_received - previous["net_received"]) / elapsed),
+            "net_tx_bytes_per_sec": round((net_sent - previous["net_sent"]) / elapsed),
+            "process_count": process_count,
+            "top_processes": top,
+        }
+        self.stats["samples"] += 1
+        self.stats["cpu_seconds"] += time.thread_time() - started
+        self.stats["last_sample_ms"] = round((time.monotonic() - now) * 1000, 3)
+        return metric
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Off the event loop: a sample touches every process's stat file
+                metric = await loop.run_in_executor(None, self.sample)
+                if metric is not None and self.callback:
+                    self.callback("metric", metric)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Error sampling host metrics: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self.task is None:
+            self.started_at = time.monotonic()
+            self.task = asyncio.create_task(self._run())
+            print(f"Sampling host metrics every {self.interval}s from {self.proc_root}")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for proc_file in self.files.values():
+            proc_file.close()
+        for pid in list(self.processes):
+            self._forget(pid)
+        self.files = {}
+        self.previous = None
+
+    def get_stats(self):
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            **self.stats,
+            "open_process_files": self.open_handles,
+            # Share of one core spent sampling since start
+            "overhead_percent": round(100.0 * self.stats["cpu_seconds"] / uptime, 3) if uptime else 0.0,
+        }
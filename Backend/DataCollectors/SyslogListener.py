@@ -0,0 +1,289 @@
+import asyncio
+import datetime
+
+# Syslog severity (PRI & 7) -> log level
+SEVERITY_LEVELS = ["ERROR", "ERROR", "ERROR", "ERROR", "WARNING", "INFO", "INFO", "DEBUG"]
+
+MONTHS = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+          "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
+
+# Largest accepted message; longer TCP frames close the connection
+MAX_MESSAGE_BYTES = 64 * 1024
+
+
+def _nil(value):
+    return None if value == "-" else value
+
+
+def _parse_pri(text):
+    """Split '<PRI>rest' into (pri, rest); pri is None when the header is missing"""
+    if not text.startswith("<"):
+        return None, text
+    end = text.find(">", 1, 5)
+    if end < 0 or not text[1:end].isdigit() or int(text[1:end]) > 191:
+        return None, text
+    return int(text[1:end]), text[end + 1:]
+
+
+def _split_structured_data(text):
+    """Split RFC5424 STRUCTURED-DATA off the start of `text`: returns (sd, msg)"""
+    if text.startswith("-"):
+        return None, text[2:]
+    i = 0
+    length = len(text)
+    # Linear scan over [id k="v" ...] elements, honoring \" \] escapes inside values
+    while i < length and text[i] == "[":
+        in_value = False
+        i += 1
+        while i < length:
+            char = text[i]
+            if char == "\\" and in_value:
+                i += 2
+                continue
+            if char == '"':
+                in_value = not in_value
+            elif char == "]" and not in_value:
+                break
+            i += 1
+        i += 1
+    return text[:i], text[i + 1:]
+
+
+def _parse_rfc5424(pri, text):
+    # VERSION SP TIMESTAMP SP HOSTNAME SP APP-NAME SP PROCID SP MSGID SP SD [SP MSG]
+    parts = text.split(" ", 6)
+    if len(parts) < 7:
+        return None
+    _, timestamp, host, app, procid, msgid, rest = parts
+    structured_data, message = _split_structured_data(rest)
+    if message.startswith("\ufeff"):  # UTF-8 BOM
+        message = message[1:]
+    record = {
+        "timestamp": _rfc5424_timestamp(timestamp),
+        "message": message,
+        "host": _nil(host),
+        "app": _nil(app),
+        "procid": _nil(procid),
+        "msgid": _nil(msgid),
+        "structured_data": structured_data,
+    }
+    return record
+
+
+def _rfc5424_timestamp(value):
+    if value == "-":
+        return None
+    try:
+        timestamp = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp.isoformat()
+
+
+def _parse_rfc3164(text):
+    # TIMESTAMP ("Mmm dd hh:mm:ss") SP HOSTNAME SP TAG[PID]: MSG
+    record = {}
+    if len(text) >= 16 and text[3] == " " and text[15] == " " and text[:3] in MONTHS:
+        clock = text[7:15]
+        try:
+            now = datetime.datetime.utcnow()
+            timestamp = datetime.datetime(now.year, MONTHS[text[:3]], int(text[4:6]),
+                                          int(clock[0:2]), int(clock[3:5]), int(clock[6:8]))
+            if timestamp > now + datetime.timedelta(days=1):
+                timestamp = timestamp.replace(year=now.year - 1)  # December message read in January
+            record["timestamp"] = timestamp.isoformat()
+        except ValueError:
+            pass
+        host, _, text = text[16:].partition(" ")
+        record["host"] = host
+    # The tag ends at the first ':' or '[' within a short prefix
+    colon = text.find(":", 0, 64)
+    if colon > 0 and " " not in text[:colon]:
+        tag = text[:colon]
+        bracket = tag.find("[")
+        if bracket > 0 and tag.endswith("]"):
+            record["procid"] = tag[bracket + 1:-1]
+            tag = tag[:bracket]
+        record["app"] = tag
+        text = text[colon + 1:].lstrip(" ")
+    record["message"] = text
+    return record
+
+
+def parse_syslog(data):
+    """
+    Parse one RFC5424 or RFC3164 message into a log record
+
+    Uses fixed-position checks and str.split/find only, so cost is linear
+    in the message length. Messages without a PRI header are kept as
+    plain INFO messages.
+
+    Args:
+        data: Raw message bytes (without framing)
+
+    Returns:
+        Dict: Log record with level, timestamp, message and syslog fields
+    """
+    text = data.decode("utf-8", errors="replace").rstrip("\r\n\x00")
+    pri, rest = _parse_pri(text)
+    record = None
+    if pri is not None and len(rest) > 1 and rest[0].isdigit() and rest[1] == " ":
+        record = _parse_rfc5424(pri, rest)
+    if record is None:
+        record = _parse_rfc3164(rest)
+    if pri is not None:
+        record["facility"] = pri >> 3
+        record["severity"] = pri & 7
+        record["level"] = SEVERITY_LEVELS[pri & 7]
+    else:
+        record["level"] = "INFO"
+    record["source"] = "syslog"
+    return {key: value for key, value in record.items() if value is not None}
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener):
+        self.listener = listener
+
+    def datagram_received(self, data, addr):
+        self.listener.receive(data)
+
+
+class _TcpProtocol(asyncio.Protocol):
+    """
+    RFC6587 framing: octet counting ("LEN SP MSG") or newline-terminated messages
+
+    A message starting with a digit that is not followed by a valid count
+    (e.g. a plain line starting with a date) is read up to the newline.
+    """
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.buffer = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.listener.stats["connections"] += 1
+
+    def data_received(self, data):
+        buffer = self.buffer
+        buffer += data
+        start = 0
+        length = len(buffer)
+        while start < length:
+            if 48 <= buffer[start] <= 57:  # digit: octet counting, unless no count follows
+                space = buffer.find(b" ", start, start + 8)
+                if space < 0 and length - start < 8 and buffer.find(b"\n", start) < 0:
+                    break  # the count may still be arriving
+                if space >= 0 and buffer[start:space].isdigit():
+                    size = int(buffer[start:space])
+                    if size > MAX_MESSAGE_BYTES:
+                        return self._abort("message too large")
+                    end = space + 1 + size
+                    if end > length:
+                        break
+                    self.listener.receive(bytes(buffer[space + 1:end]))
+                    start = end
+                    continue
+                # Not an octet count (e.g. "12a4 ..." or a line starting with a date): newline framing
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                if length - start > MAX_MESSAGE_BYTES:
+                    return self._abort("message too large")
+                break
+            if end > start:
+                self.listener.receive(bytes(buffer[start:end]))
+            start = end + 1
+        del buffer[:start]
+
+    def _abort(self, reason):
+        self.listener.stats["rejected"] += 1
+        print(f"Closing syslog connection: {reason}")
+        self.buffer.clear()
+        self.transport.close()
+
+
+class SyslogListener:
+    def __init__(self, host="0.0.0.0", udp_port=None, tcp_port=None, callback=None,
+                 batch_size=1000, batch_interval=0.1):
+        """
+        Receive syslog messages over UDP and TCP and feed them into the ingest path
+
+        Each message is parsed into the log schema (level from the syslog
+        severity) and collected into batches; a batch is handed to
+        `callback("log", records)` when it reaches batch_size or
+        batch_interval seconds after its first message.
+
+        Args:
+            host: Interface to bind
+            udp_port: UDP port (None disables UDP)
+            tcp_port: TCP port (None disables TCP)
+            callback: Called with ("log", [records]) on the event loop
+            batch_size: Maximum records per batch
+            batch_interval: Maximum seconds a record waits for its batch
+        """
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.callback = callback
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.pending = []
+        self.flush_handle = None
+        self.udp_transport = None
+        self.tcp_server = None
+        self.stats = {"received": 0, "batches": 0, "connections": 0, "rejected": 0, "errors": 0}
+
+    def receive(self, data):
+        try:
+            self.pending.append(parse_syslog(data))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error parsing syslog message: {e}")
+            return
+        self.stats["received"] += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.batch_interval, self.flush)
+
+    def flush(self):
+        """Hand the pending batch to the callback"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.stats["batches"] += 1
+        if self.callback:
+            try:
+                self.callback("log", batch)
+            except Exception as e:
+                print(f"Error handling syslog batch: {e}")
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.udp_port:
+            self.udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UdpProtocol(self), local_addr=(self.host, self.udp_port))
+            print(f"Syslog listening on udp://{self.host}:{self.udp_port}")
+        if self.tcp_port:
+            self.tcp_server = await loop.create_server(lambda: _TcpProtocol(self), self.host, self.tcp_port)
+            print(f"Syslog listening on tcp://{self.host}:{self.tcp_port}")
+
+    async def stop(self):
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+            self.udp_transport = None
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            await self.tcp_server.wait_closed()
+            self.tcp_server = None
+        self.flush()
+
+    def get_stats(self):
+        return dict(self.stats)
@@ -1,12 +1,23 @@
 import asyncio
 import websockets
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
 import random
 import datetime
 import json
+import time
+import numpy as np
 from faker import Faker
+from .BoundedBuffer import BoundedBuffer, DROP_OLDEST
+
+# Character positions of a formatted UUID (8-4-4-4-12)
+UUID_DASHES = [8, 13, 18, 23]
+UUID_HEX = [i for i in range(36) if i not in UUID_DASHES]
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
 
 class TelemetryGenerator:
-    def __init__(self, host="localhost", port=8765, min_delay=0.3, max_delay=1.5, callback=None):
+    def __init__(self, host="localhost", port=8765, min_delay=0.3, max_delay=1.5, callback=None,
+                 buffer_size=1000, buffer_policy=DROP_OLDEST, batch_window=1.0, max_batch=1000,
+                 compression="deflate", deflate_window_bits=15, deflate_mem_level=8, deflate_level=6):
         self.host = host
         self.port = port
         self.min_delay = min_delay
@@ -14,10 +25,34 @@ class TelemetryGenerator:
         self.fake = Faker()
         self.server = None
         self.callback = callback
-        self.log_buffer = asyncio.Queue()
-        self.metric_buffer = asyncio.Queue()
+        # Hand-off from the generation loops to the callback (ingest); bounded,
+        # so when ingest falls behind the policy blocks or drops instead of growing
+        self.log_buffer = BoundedBuffer(buffer_size, buffer_policy)
+        self.metric_buffer = BoundedBuffer(buffer_size, buffer_policy)
+        self.delivery_tasks = None
+        self.delivered = {"log": 0, "metric": 0}
+        self.delivery_batches = 0
         self.is_running = False
         self.generator_task = None
+        self.rng = np.random.default_rng()
+        self.load_tables = None
+        self.load_task = None
+        self.load_stats = {"running": False}
+
+        # WebSocket server: one generated stream shared by every connection,
+        # sent as a batch frame every batch_window seconds (or max_batch events)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.compression = compression  # "deflate" negotiates permessage-deflate, None disables it
+        # Batch frames are large and repeat the same keys, and only a few collectors connect:
+        # a full 32 KB window (the websockets default is 4 KB) buys ratio for little memory
+        self.deflate_settings = {"window_bits": deflate_window_bits, "mem_level": deflate_mem_level,
+                                 "level": deflate_level}
+        self.connections = set()
+        self.pending_logs = []
+        self.pending_metrics = []
+        self.frames_sent = 0
+        self.events_sent = 0
 
         # Users for logs
         self.users = [{"username": self.fake.user_name(), "ip": self.fake.ipv4_public()} for _ in range(20)]
@@ -34,6 +69,9 @@ class TelemetryGenerator:
             ("/", ["GET"]),
         ]
 
+        # Occasional error keywords in messages (low probability)
+        self.error_keywords = ["error", "failed", "exception", "critical"]
+
 
     def _choose_log_level(self, status):
         if status >= 500:
@@ -43,20 +81,9 @@ class TelemetryGenerator:
         else:
             return random.choices(["INFO", "DEBUG"], weights=[0.8, 0.2], k=1)[0]
 
-    async def _generate_log(self):
-        user = random.choice(self.users)
-        endpoint, methods = random.choice(self.endpoints)
-        method = random.choice(methods)
-        status = random.choice(self.status_codes)
-
-        # Correlate CPU spike with errors
-        cpu_spike = status >= 500
-        
-        # Generate message with occasional error keywords (low probability)
-        error_keywords = ["error", "failed", "exception", "critical"]
-        
-        # Base messages for different scenarios
-        base_messages = [
+    def _base_messages(self, user, endpoint, method):
+        """Base messages for different scenarios"""
+        return [
             f"Request to {endpoint} completed",
             f"Processing {method} request",
             f"User {user['username']} accessed {endpoint}",
@@ -66,9 +93,20 @@ class TelemetryGenerator:
             f"API response sent",
             f"Service request completed"
         ]
+
+    async def _generate_log(self):
+        user = random.choice(self.users)
+        endpoint, methods = random.choice(self.endpoints)
+        method = random.choice(methods)
+        status = random.choice(self.status_codes)
+
+        # Correlate CPU spike with errors
+        cpu_spike = status >= 500
+        
+        base_messages = self._base_messages(user, endpoint, method)
         
         if random.random() < 0.10:
-            error_word = random.choice(error_keywords)
+            error_word = random.choice(self.error_keywords)
             message = f"{random.choice(base_messages)} - {error_word} occurred"
         else:
             message = random.choice(base_messages)
@@ -106,31 +144,357 @@ class TelemetryGenerator:
         return metric
 
 
-    async def _generator_loop(self, websocket, log_interval=0.5, metric_interval=0.3):
-        while self.is_running:
-            # Generate log
-            log = await self._generate_log()
-            await self.log_buffer.put(log)
-            if self.callback:
-                self.callback("log", log)
-            if websocket:
-                await websocket.send(json.dumps({"type": "log", "data": log}))
+    # =============== LOAD GENERATION ===============
 
-            # Generate metric (correlate CPU spike with log)
-            metric = await self._generate_metric(correlate_cpu=log["cpu_spike"])
-            await self.metric_buffer.put(metric)
-            if self.callback:
-                self.callback("metric", metric)
-            if websocket:
-                await websocket.send(json.dumps({"type": "metric", "data": metric}))
+    def _build_load_tables(self):
+        """Precompute the lookup tables sampled by generate_log_batch"""
+        pairs = [(endpoint, method) for endpoint, methods in self.endpoints for method in methods]
+        # Same distribution as _generate_log: endpoint first, then one of its methods
+        pair_weights = np.array([1 / len(self.endpoints) / len(methods)
+                                 for _, methods in self.endpoints for _ in methods])
+
+        # messages[user, pair] = base messages followed by every "<base> - <keyword> occurred"
+        n_base = len(self._base_messages(self.users[0], *pairs[0]))
+        n_keywords = len(self.error_keywords)
+        messages = np.empty((len(self.users), len(pairs), n_base * (1 + n_keywords)), dtype=object)
+        for u, user in enumerate(self.users):
+            for p, (endpoint, method) in enumerate(pairs):
+                base = self._base_messages(user, endpoint, method)
+                messages[u, p, :n_base] = base
+                messages[u, p, n_base:] = [f"{message} - {word} occurred"
+                                           for message in base for word in self.error_keywords]
+        message_weights = np.concatenate([np.full(n_base, 0.9 / n_base),
+                                          np.full(n_base * n_keywords, 0.1 / (n_base * n_keywords))])
+
+        self.load_tables = {
+            "usernames": np.array([user["username"] for user in self.users], dtype=object),
+            "ips": np.array([user["ip"] for user in self.users], dtype=object),
+            "endpoints": np.array([endpoint for endpoint, _ in pairs], dtype=object),
+            "methods": np.array([method for _, method in pairs], dtype=object),
+            "pair_weights": pair_weights / pair_weights.sum(),
+            "status_codes": np.array(self.status_codes),
+            "messages": messages,
+            "message_weights": message_weights / message_weights.sum(),
+        }
+        return self.load_tables
+
+    def _request_ids(self, count):
+        """Random version 4 UUID strings, formatted without a per-event uuid4() call"""
+        raw = self.rng.integers(0, 256, (count, 16), dtype=np.uint8)
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        chars = np.full((count, 36), ord("-"), dtype=np.uint8)
+        chars[:, UUID_HEX] = HEX_DIGITS[np.stack([raw >> 4, raw & 0x0F], axis=-1).reshape(count, 32)]
+        return chars.view("S36").ravel().astype("U36").tolist()
+
+    def generate_log_batch(self, count, timestamps=None):
+        """
+        Generate `count` logs at once with vectorized sampling
+        
+        Follows the same distributions as _generate_log.
+        
+        Args:
+            count: Number of logs
+            timestamps: datetime64[us] array of event times (defaults to now)
+        
+        Returns:
+            List[Dict]: Generated logs
+        """
+        tables = self.load_tables or self._build_load_tables()
+        rng = self.rng
+        if timestamps is None:
+            timestamps = np.full(count, np.datetime64(datetime.datetime.utcnow(), "us"))
 
+        users = rng.integers(0, len(tables["usernames"]), count)
+        pairs = rng.choice(len(tables["endpoints"]), count, p=tables["pair_weights"])
+        statuses = tables["status_codes"][rng.integers(0, len(tables["status_codes"]), count)]
+        spikes = statuses >= 500
+        levels = np.where(spikes, "ERROR",
+                          np.where(statuses >= 400, "WARNING",
+                                   np.where(rng.random(count) < 0.8, "INFO", "DEBUG")))
+        latencies = np.maximum(1, (rng.normal(120, 40, count) + 50 * spikes).astype(np.int64))
+        message_index = rng.choice(tables["messages"].shape[2], count, p=tables["message_weights"])
+        messages = tables["messages"][users, pairs, message_index]
+
+        return [
+            {
+                "timestamp": timestamp,
+                "level": level,
+                "user": user,
+                "ip": ip,
+                "method": method,
+                "endpoint": endpoint,
+                "status_code": status,
+                "request_id": request_id,
+                "latency_ms": latency,
+                "cpu_spike": spike,
+                "message": message
+            }
+            for timestamp, level, user, ip, method, endpoint, status, request_id, latency, spike, message in zip(
+                np.datetime_as_string(timestamps, unit="us").tolist(),
+                levels.tolist(),
+                tables["usernames"][users].tolist(),
+                tables["ips"][users].tolist(),
+                tables["methods"][pairs].tolist(),
+                tables["endpoints"][pairs].tolist(),
+                statuses.tolist(),
+                self._request_ids(count),
+                latencies.tolist(),
+                spikes.tolist(),
+                messages.tolist(),
+            )
+        ]
+
+    def generate_metric_batch(self, count, timestamps=None, cpu_spikes=None):
+        """Generate `count` metrics at once; cpu_spikes correlates CPU with error logs"""
+        rng = self.rng
+        if timestamps is None:
+            timestamps = np.full(count, np.datetime64(datetime.datetime.utcnow(), "us"))
+        cpu = rng.normal(30, 10, count)
+        if cpu_spikes is not None:
+            cpu += cpu_spikes * rng.integers(20, 31, count)  # spike during errors
+        memory = rng.normal(50, 15, count)
+        return [
+            {
+                "timestamp": timestamp,
+                "cpu_percent": cpu_percent,
+                "memory_percent": memory_percent,
+                "memory_used_mb": used,
+                "memory_total_mb": 8192
+            }
+            for timestamp, cpu_percent, memory_percent, used in zip(
+                np.datetime_as_string(timestamps, unit="us").tolist(),
+                np.clip(cpu, 0, 100).tolist(),
+                np.clip(memory, 0, 100).tolist(),
+                rng.integers(2000, 8001, count).tolist(),
+            )
+        ]
+
+    def start_load(self, rate=50000, duration=10.0, batch_size=1000, metric_ratio=0.1):
+        """
+        Start generating synthetic load into the callback
+        
+        Pacing is open loop: event i is due at start + i / rate regardless
+        of how long the callback takes, and carries that scheduled time as
+        its timestamp. When the pipeline falls behind, due events are sent
+        in catch-up batches and the lag is reported instead of silently
+        lowering the rate.
+        
+        Args:
+            rate: Target log events per second
+            duration: Seconds to run (None runs until stop_load)
+            batch_size: Maximum logs per callback batch
+            metric_ratio: Metrics generated per log
+        """
+        if self.load_task is not None and not self.load_task.done():
+            raise RuntimeError("Load generation is already running")
+        self.load_task = asyncio.create_task(self._load_loop(rate, duration, batch_size, metric_ratio))
+
+    async def stop_load(self):
+        """Stop load generation and return the final throughput report"""
+        if self.load_task is not None:
+            self.load_task.cancel()
+            try:
+                await self.load_task
+            except asyncio.CancelledError:
+                pass
+            self.load_task = None
+        return self.get_load_stats()
+
+    def get_load_stats(self):
+        """Achieved vs target throughput of the current or last load run"""
+        return dict(self.load_stats)
+
+    async def _load_loop(self, rate, duration, batch_size, metric_ratio):
+        total = int(rate * duration) if duration else None
+        start = time.perf_counter()
+        start_time = np.datetime64(datetime.datetime.utcnow(), "us")
+        micros_per_event = 1e6 / rate
+        # Longest a due event waits for its batch to fill up
+        max_wait = 0.05
+        stats = self.load_stats = {
+            "running": True,
+            "target_rate": rate,
+            "achieved_rate": 0.0,
+            "events": 0,
+            "metrics": 0,
+            "elapsed_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "generate_seconds": 0.0,
+            "batch_size": batch_size,
+        }
+        sent = 0
+        metrics_sent = 0
+        try:
+            while total is None or sent < total:
+                now = time.perf_counter() - start
+                # Event i is due at i / rate
+                due = int(now * rate) + 1 - sent
+                remaining = total - sent if total is not None else batch_size
+                if due <= 0:
+                    # Nothing is due yet: sleep until the next event is
+                    await asyncio.sleep(max(sent / rate - now, 0))
+                    continue
+                if due < min(batch_size, remaining):
+                    # Wait for a full batch, but not longer than max_wait past the oldest due event
+                    wait = min((sent + batch_size - 1) / rate - now, max_wait - (now - sent / rate))
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                        continue
+                due = min(due, remaining)
+                count = min(due, batch_size)
+                stats["max_lag_seconds"] = max(stats["max_lag_seconds"], now - sent / rate)
+
+                generate_start = time.perf_counter()
+                offsets = ((sent + np.arange(count)) * micros_per_event).astype("timedelta64[us]")
+                timestamps = start_time + offsets
+                logs = self.generate_log_batch(count, timestamps)
+                metric_count = int((sent + count) * metric_ratio) - metrics_sent
+                metrics = None
+                if metric_count > 0:
+                    picks = np.linspace(0, count - 1, metric_count).astype(np.int64)
+                    spikes = np.fromiter((logs[i]["cpu_spike"] for i in picks), dtype=bool, count=metric_count)
+                    metrics = self.generate_metric_batch(metric_count, timestamps[picks], spikes)
+                stats["generate_seconds"] += time.perf_counter() - generate_start
+
+                await self.emit(logs, metrics)
+                self._queue_frame_events(logs, metrics or [])
+                sent += count
+                metrics_sent += metric_count if metrics else 0
+
+                elapsed = time.perf_counter() - start
+                stats.update(events=sent, metrics=metrics_sent, elapsed_seconds=elapsed,
+                             achieved_rate=sent / elapsed if elapsed else 0.0)
+                # Yield to the event loop between catch-up batches
+                await asyncio.sleep(0)
+            # The last event is due 1/rate before the end of the run
+            await asyncio.sleep(max(total / rate - (time.perf_counter() - start), 0))
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.update(running=False, elapsed_seconds=elapsed,
+                         achieved_rate=sent / elapsed if elapsed else 0.0)
+            print(f"Load generation finished: {sent} events in {elapsed:.2f}s "
+                  f"({stats['achieved_rate']:.0f}/s, target {rate}/s)")
+
+    # =============== HAND-OFF TO THE CALLBACK ===============
+
+    async def emit(self, logs, metrics=None):
+        """
+        Queue generated events for the callback
+
+        Every producer (generation loops, load mode) goes through the
+        bounded buffers; one consumer task per buffer hands events to the
+        callback in batches of up to max_batch. When the callback falls
+        behind, the buffer policy decides: block slows the producer down,
+        the other policies drop and count.
+        """
+        if not self.callback:
+            return
+        if self.delivery_tasks is None:
+            self.delivery_tasks = [asyncio.create_task(self._deliver_loop("log", self.log_buffer)),
+                                   asyncio.create_task(self._deliver_loop("metric", self.metric_buffer))]
+        if logs:
+            await self.log_buffer.put_many(logs)
+        if metrics:
+            await self.metric_buffer.put_many(metrics)
+
+    async def _deliver_loop(self, kind, buffer):
+        while True:
+            self._deliver(kind, await buffer.get_batch(self.max_batch))
+            # Let producers run between batches
+            await asyncio.sleep(0)
+
+    def _deliver(self, kind, batch):
+        try:
+            self.callback(kind, batch)
+        except Exception as e:
+            print(f"Error delivering generated {kind}s: {e}")
+        self.delivered[kind] += len(batch)
+        self.delivery_batches += 1
+
+    async def stop_delivery(self):
+        """Stop the consumer tasks and hand the events still buffered to the callback"""
+        if self.delivery_tasks is None:
+            return
+        for task in self.delivery_tasks:
+            task.cancel()
+        await asyncio.gather(*self.delivery_tasks, return_exceptions=True)
+        self.delivery_tasks = None
+        for kind, buffer in (("log", self.log_buffer), ("metric", self.metric_buffer)):
+            while not buffer.empty():
+                self._deliver(kind, await buffer.get_batch(self.max_batch))
+
+    # =============== WEBSOCKET SERVER ===============
+
+    def _queue_frame_events(self, logs, metrics):
+        """Hold events for the next batch frame (only while collectors are connected)"""
+        if not self.connections:
+            return
+        self.pending_logs.extend(logs)
+        self.pending_metrics.extend(metrics)
+        if len(self.pending_logs) + len(self.pending_metrics) >= self.max_batch:
+            self._flush_frame()
+
+    def _flush_frame(self):
+        """Serialize pending events once and broadcast them to every connection"""
+        if not self.pending_logs and not self.pending_metrics:
+            return
+        logs, metrics = self.pending_logs, self.pending_metrics
+        self.pending_logs, self.pending_metrics = [], []
+        if not self.connections:
+            return
+        frame = json.dumps({"type": "batch", "logs": logs, "metrics": metrics})
+        # Skips connections that are closing or whose write buffer is full
+        websockets.broadcast(self.connections, frame)
+        self.frames_sent += 1
+        self.events_sent += len(logs) + len(metrics)
+
+    async def _generator_loop(self):
+        """Single generation loop shared by every websocket connection"""
+        while True:
+            if not self.is_running:
+                await asyncio.sleep(0.1)
+                continue
+
+            log = await self._generate_log()
+            # Correlate CPU spike with the log
+            metric = await self._generate_metric(correlate_cpu=log["cpu_spike"])
+            await self.emit([log], [metric])
+            self._queue_frame_events([log], [metric])
             await asyncio.sleep(random.uniform(self.min_delay, self.max_delay))
 
-  
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.batch_window)
+            self._flush_frame()
+
+    async def _handle_connection(self, websocket, path=None):
+        self.connections.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.connections.discard(websocket)
+
+    def _extensions(self):
+        """permessage-deflate with the configured window and memory level (None without compression)"""
+        if self.compression != "deflate":
+            return None
+        return [ServerPerMessageDeflateFactory(
+            server_max_window_bits=self.deflate_settings["window_bits"],
+            compress_settings={"memLevel": self.deflate_settings["mem_level"],
+                               "level": self.deflate_settings["level"]},
+        )]
+
     async def _start_async(self):
-        self.server = await websockets.serve(self._generator_loop, self.host, self.port)
+        self.server = await websockets.serve(self._handle_connection, self.host, self.port,
+                                             compression=self.compression, extensions=self._extensions())
         print(f"Telemetry generator started at ws://{self.host}:{self.port}")
-        await self.server.wait_closed()
+        tasks = [asyncio.create_task(self._generator_loop()), asyncio.create_task(self._flush_loop())]
+        try:
+            await self.server.wait_closed()
+        finally:
+            for task in tasks:
+                task.cancel()
 
     def start(self):
         asyncio.run(self._start_async())
@@ -152,11 +516,24 @@ class TelemetryGenerator:
         return self.is_running
 
 
-    async def get_log(self):
-        return await self.log_buffer.get()
+    def get_stream_stats(self):
+        """Connections and frame counters of the websocket server"""
+        return {
+            "connections": len(self.connections),
+            "frames_sent": self.frames_sent,
+            "events_sent": self.events_sent,
+            "events_per_frame": self.events_sent / self.frames_sent if self.frames_sent else 0.0,
+            "compression": self.compression,
+            "deflate": self.deflate_settings if self.compression == "deflate" else None,
+        }
 
-    async def get_metric(self):
-        return await self.metric_buffer.get()
+    def get_buffer_stats(self):
+        """Depth and drop counters of the generator -> callback buffers"""
+        return {
+            "logs": {**self.log_buffer.get_stats(), "delivered": self.delivered["log"]},
+            "metrics": {**self.metric_buffer.get_stats(), "delivered": self.delivered["metric"]},
+            "delivery_batches": self.delivery_batches,
+        }
 
 
 
@@ -0,0 +1,303 @@
+import math
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .MetricsRollup import to_utc_datetime, EPOCH
+
+# Metric fields watched by default
+DEFAULT_FIELDS = ("cpu_percent", "memory_percent")
+
+# Quantiles reported with each anomaly, from the rolling window
+QUANTILES = (0.05, 0.5, 0.95)
+
+# EWMA recurrences are solved in closed form over blocks of this many samples;
+# decay ** -BLOCK must stay far from float64 overflow
+BLOCK = 256
+
+# Batches up to this size per series are updated with scalar math; NumPy call
+# overhead only pays off above it
+SCALAR_BATCH = 32
+
+
+def _ewma_block(values: np.ndarray, start: float, alpha: float) -> np.ndarray:
+    """
+    y[t] = (1 - alpha) * y[t-1] + alpha * values[t] for a whole block at once
+
+    Uses y[t] = d^t * (y0 + alpha * cumsum(values[i] / d^i)) with d = 1 - alpha.
+    """
+    decay = 1.0 - alpha
+    powers = decay ** np.arange(1, len(values) + 1)
+    return powers * (start + alpha * np.cumsum(values / powers))
+
+
+class _Series:
+    """Constant-memory state of one metric series"""
+
+    def __init__(self, window: int, season_bins: int):
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.window = np.full(window, np.nan)
+        self.window_next = 0
+        self.season_mean = np.zeros(season_bins)
+        self.season_var = np.zeros(season_bins)
+        self.season_count = np.zeros(season_bins, dtype=np.int64)
+
+    def push_window(self, values: np.ndarray):
+        size = len(self.window)
+        if len(values) >= size:
+            self.window[:] = values[-size:]
+            self.window_next = 0
+            return
+        end = self.window_next + len(values)
+        if end <= size:
+            self.window[self.window_next:end] = values
+        else:
+            split = size - self.window_next
+            self.window[self.window_next:] = values[:split]
+            self.window[:end - size] = values[split:]
+        self.window_next = end % size
+
+    def push_values(self, values: List[float]):
+        size = len(self.window)
+        for value in values:
+            self.window[self.window_next] = value
+            self.window_next = (self.window_next + 1) % size
+
+    def rolling(self) -> Dict[str, float]:
+        values = self.window[~np.isnan(self.window)]
+        if not len(values):
+            return {}
+        stats = {"rolling_mean": float(values.mean()), "rolling_std": float(values.std())}
+        for quantile, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+            stats[f"p{int(quantile * 100):02d}"] = float(value)
+        return stats
+
+
+class AnomalyDetector:
+    def __init__(self, fields=DEFAULT_FIELDS, alpha: float = 0.05, z_threshold: float = 4.0,
+                 warmup: int = 30, window: int = 256, season_period: int = 86400, season_bins: int = 24,
+                 season_alpha: float = 0.1, season_threshold: float = 4.0, season_warmup: int = 5,
+                 min_std: float = 0.5):
+        """
+        Streaming anomaly detection for metric series
+
+        Each (host, field) series keeps an EWMA mean/variance, a fixed-size
+        window of recent values (rolling mean/std and quantiles) and an
+        EWMA mean/variance per seasonal bin (hour of day by default), so
+        memory per series is constant. A batch is processed per series with
+        NumPy: the EWMA recurrences are solved in closed form over the
+        batch, so a sample costs O(1) and no Python loop runs per sample.
+        A sample is anomalous when its z-score against the EWMA, or against
+        its seasonal bin, exceeds the threshold; scores use the state from
+        before the sample.
+
+        Args:
+            fields: Metric fields to watch
+            alpha: EWMA weight of a new sample
+            z_threshold: |z| above which a sample is flagged
+            warmup: Samples a series needs before it can flag anything
+            window: Values kept for rolling statistics
+            season_period: Seconds in one seasonal cycle
+            season_bins: Bins per cycle
+            season_alpha: EWMA weight of a new sample within its bin
+            season_threshold: |seasonal z| above which a sample is flagged
+            season_warmup: Samples a bin needs before it can flag anything
+            min_std: Standard deviation floor, so flat series do not flag noise
+        """
+        self.fields = tuple(fields)
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.window = window
+        self.season_period = season_period
+        self.season_bins = season_bins
+        self.season_alpha = season_alpha
+        self.season_threshold = season_threshold
+        self.season_warmup = season_warmup
+        self.min_std = min_std
+        self.series: Dict[Tuple[str, str], _Series] = {}
+        self.samples = 0
+        self.anomalies = 0
+
+    def _bin(self, epoch: float) -> int:
+        return int((epoch % self.season_period) * self.season_bins // self.season_period)
+
+    def _update_scalar(self, state: _Series, values: List[float], epochs: List[float]) -> Tuple[List[float], ...]:
+        """Sample-by-sample version of _update for small batches (returns lists)"""
+        alpha = self.alpha
+        decay = 1.0 - alpha
+        season_alpha = self.season_alpha
+        mean, var, seen = state.mean, state.var, state.count
+        if seen == 0:
+            mean = values[0]
+        expected, stds, z, seasonal_z = [], [], [], []
+        for value, epoch in zip(values, epochs):
+            std = max(math.sqrt(var / max(1.0 - decay ** seen, alpha)), self.min_std)
+            expected.append(mean)
+            stds.append(std)
+            z.append((value - mean) / std if seen >= self.warmup else 0.0)
+            diff = value - mean
+            mean += alpha * diff
+            var = decay * (var + alpha * diff * diff)
+            seen += 1
+
+            b = self._bin(epoch)
+            bin_count = int(state.season_count[b])
+            bin_mean = float(state.season_mean[b]) if bin_count else value
+            bin_var = float(state.season_var[b])
+            seasonal_z.append((value - bin_mean) / max(math.sqrt(bin_var), self.min_std)
+                              if bin_count >= self.season_warmup else 0.0)
+            bin_diff = value - bin_mean
+            state.season_mean[b] = bin_mean + season_alpha * bin_diff
+            state.season_var[b] = (1.0 - season_alpha) * (bin_var + season_alpha * bin_diff * bin_diff)
+            state.season_count[b] = bin_count + 1
+
+        state.mean, state.var, state.count = mean, var, seen
+        state.push_values(values)
+        return expected, stds, z, seasonal_z
+
+    def _update(self, state: _Series, values: np.ndarray, epochs: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Advance one series over a batch; returns (expected, std, z, seasonal z) per sample"""
+        count = len(values)
+        alpha = self.alpha
+        decay = 1.0 - alpha
+        means_before = np.empty(count)
+        vars_before = np.empty(count)
+        mean, var = state.mean, state.var
+        if state.count == 0:
+            mean = values[0]
+
+        for start in range(0, count, BLOCK):
+            block = values[start:start + BLOCK]
+            means = _ewma_block(block, mean, alpha)
+            previous_means = np.concatenate(([mean], means[:-1]))
+            # Incremental EW variance: var[t] = d * var[t-1] + a * (d * diff^2), diff against the previous mean
+            diff = block - previous_means
+            variances = _ewma_block(decay * diff * diff, var, alpha)
+            means_before[start:start + len(block)] = previous_means
+            vars_before[start:start + len(block)] = np.concatenate(([var], variances[:-1]))
+            mean, var = float(means[-1]), float(variances[-1])
+
+        seen = state.count + np.arange(count)
+        # The variance EWMA starts at 0; divide out that bias like the scalar path does
+        std = np.maximum(np.sqrt(vars_before / np.maximum(1.0 - decay ** seen, alpha)), self.min_std)
+        z = np.where(seen >= self.warmup, (values - means_before) / std, 0.0)
+
+        # Seasonal bins: scored against the state before the batch, then updated per bin
+        bins = ((epochs % self.season_period) * self.season_bins // self.season_period).astype(np.int64)
+        bin_count = state.season_count[bins]
+        season_std = np.maximum(np.sqrt(state.season_var[bins]), self.min_std)
+        seasonal_z = np.where(bin_count >= self.season_warmup,
+                              (values - state.season_mean[bins]) / season_std, 0.0)
+        self._update_seasons(state, bins, values)
+
+        state.mean, state.var = mean, var
+        state.count += count
+        state.push_window(values)
+        return means_before, std, z, seasonal_z
+
+    def _update_seasons(self, state: _Series, bins: np.ndarray, values: np.ndarray):
+        touched, inverse, counts = np.unique(bins, return_inverse=True, return_counts=True)
+        sums = np.bincount(inverse, weights=values)
+        batch_mean = sums / counts
+        # k samples in a bin move its EWMA as far as k equal samples at the batch mean would
+        weight = 1.0 - (1.0 - self.season_alpha) ** counts
+        fresh = state.season_count[touched] == 0
+        old_mean = np.where(fresh, batch_mean, state.season_mean[touched])
+        diff = batch_mean - old_mean
+        new_mean = old_mean + weight * diff
+        square_sums = np.bincount(inverse, weights=(values - batch_mean[inverse]) ** 2)
+        batch_var = square_sums / counts
+        state.season_var[touched] = (1.0 - weight) * (state.season_var[touched] + weight * diff * diff) \
+            + weight * batch_var
+        state.season_mean[touched] = new_mean
+        state.season_count[touched] += counts
+
+    def process(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score a batch of metric samples and update the series state
+
+        Args:
+            metrics: Metric documents (timestamp plus numeric fields)
+
+        Returns:
+            List[Dict]: Anomaly documents for the flagged samples
+        """
+        groups: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+        for metric in metrics:
+            timestamp = to_utc_datetime(metric.get("timestamp"))
+            if timestamp is None:
+                continue
+            host = metric.get("host") or metric.get("source") or "default"
+            groups.setdefault(host, []).append(((timestamp - EPOCH).total_seconds(), metric))
+
+        anomalies = []
+        for host, samples in groups.items():
+            for field in self.fields:
+                values, epochs = [], []
+                for epoch, metric in samples:
+                    value = metric.get(field)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                        values.append(float(value))
+                        epochs.append(epoch)
+                if not values:
+                    continue
+                state = self.series.get((host, field))
+                if state is None:
+                    state = self.series[(host, field)] = _Series(self.window, self.season_bins)
+                if len(values) <= SCALAR_BATCH:
+                    expected, std, z, seasonal_z = self._update_scalar(state, values, epochs)
+                else:
+                    expected, std, z, seasonal_z = self._update(state, np.array(values), np.array(epochs))
+                self.samples += len(values)
+
+                if isinstance(z, np.ndarray):
+                    flagged = np.flatnonzero((np.abs(z) > self.z_threshold)
+                                             | (np.abs(seasonal_z) > self.season_threshold)).tolist()
+                else:
+                    flagged = [i for i in range(len(z))
+                               if abs(z[i]) > self.z_threshold or abs(seasonal_z[i]) > self.season_threshold]
+                if not flagged:
+                    continue
+                rolling = state.rolling()
+                for i in flagged:
+                    kinds = []
+                    if abs(z[i]) > self.z_threshold:
+                        kinds.append("zscore")
+                    if abs(seasonal_z[i]) > self.season_threshold:
+                        kinds.append("seasonal")
+                    anomalies.append({
+                        "timestamp": EPOCH + timedelta(seconds=epochs[i]),
+                        "host": host,
+                        "field": field,
+                        "value": values[i],
+                        "expected": round(float(expected[i]), 4),
+                        "std": round(float(std[i]), 4),
+                        "z_score": round(float(z[i]), 3),
+                        "seasonal_score": round(float(seasonal_z[i]), 3),
+                        "score": round(max(abs(float(z[i])), abs(float(seasonal_z[i]))), 3),
+                        "kinds": kinds,
+                        **rolling,
+                    })
+        self.anomalies += len(anomalies)
+        return anomalies
+
+    def get_state(self, host: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Current statistics of every series (optionally one host)"""
+        states = []
+        for (series_host, field), state in self.series.items():
+            if host is not None and series_host != host:
+                continue
+            states.append({
+                "host": series_host,
+                "field": field,
+                "count": state.count,
+                "ewma": state.mean,
+                "ewm_std": float(np.sqrt(state.var)),
+                **state.rolling(),
+            })
+        return states
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"series": len(self.series), "samples": self.samples, "anomalies": self.anomalies}
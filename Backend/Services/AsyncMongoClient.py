@@ -0,0 +1,152 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+import logging
+from .MongoClient import MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+class AsyncMongoDBClient:
+    def __init__(self, mongo_client: Optional[MongoDBClient] = None, max_workers: int = 8):
+        """
+        Async counterpart of MongoDBClient for use inside FastAPI handlers
+
+        pymongo is synchronous, so every call is dispatched to a bounded
+        thread pool and awaited. The event loop keeps serving other
+        requests while a slow query runs, and at most max_workers
+        queries hit MongoDB concurrently.
+
+        Args:
+            mongo_client: Synchronous MongoDBClient to wrap
+            max_workers: Maximum number of concurrent database calls
+        """
+        self.mongo_client = mongo_client or MongoDBClient()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo")
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run any blocking callable on the database executor
+
+        Args:
+            func: Callable to run
+            *args, **kwargs: Arguments passed to func
+
+        Returns:
+            Any: Return value of func
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    # =============== LOGS OPERATIONS ===============
+
+    async def store_log(self, log_data: Dict[str, Any]) -> str:
+        return await self.run(self.mongo_client.store_log, log_data)
+
+    async def store_logs(self, logs_data: List[Dict[str, Any]]) -> List[str]:
+        return await self.run(self.mongo_client.store_logs, logs_data)
+
+    async def get_logs(self, limit: int = 1000, level: Optional[str] = None,
+                       start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                       fields: Optional[List[str]] = None, after: Optional[str] = None,
+                       before: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_logs, limit=limit, level=level,
+                              start_time=start_time, end_time=end_time, fields=fields,
+                              after=after, before=before)
+
+    async def get_filtered_logs(self, levels: List[str] = ['ERROR', 'WARNING'], limit: int = 1000,
+                                fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_filtered_logs, levels=levels, limit=limit, fields=fields)
+
+    async def get_logs_since(self, since: Optional[int] = None, limit: int = 1000,
+                             fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        return await self.run(self.mongo_client.get_logs_since, since=since, limit=limit, fields=fields)
+
+    async def clear_logs(self) -> bool:
+        return await self.run(self.mongo_client.clear_logs)
+
+    # =============== METRICS OPERATIONS ===============
+
+    async def store_metric(self, metric_data: Dict[str, Any]) -> str:
+        return await self.run(self.mongo_client.store_metric, metric_data)
+
+    async def store_metrics(self, metrics_data: List[Dict[str, Any]]) -> List[str]:
+        return await self.run(self.mongo_client.store_metrics, metrics_data)
+
+    async def get_metrics(self, limit: int = 1000, metric_type: Optional[str] = None,
+                          start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                          fields: Optional[List[str]] = None, after: Optional[str] = None,
+                          before: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_metrics, limit=limit, metric_type=metric_type,
+                              start_time=start_time, end_time=end_time, fields=fields,
+                              after=after, before=before)
+
+    async def get_metrics_since(self, since: Optional[int] = None, limit: int = 1000,
+                                fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        return await self.run(self.mongo_client.get_metrics_since, since=since, limit=limit, fields=fields)
+
+    async def get_metric_rollups(self, resolution: str, start_time: datetime, end_time: datetime,
+                                 limit: int = 10000) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_metric_rollups, resolution, start_time, end_time, limit=limit)
+
+    async def get_anomalies(self, limit: int = 100, field: Optional[str] = None, host: Optional[str] = None,
+                            start_time: Optional[datetime] = None,
+                            end_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_anomalies, limit=limit, field=field, host=host,
+                              start_time=start_time, end_time=end_time)
+
+    async def get_template_counts(self, start_time: datetime, end_time: datetime, template_id: Optional[int] = None,
+                                  limit: int = 10000) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_template_counts, start_time, end_time,
+                              template_id=template_id, limit=limit)
+
+    async def clear_metrics(self) -> bool:
+        return await self.run(self.mongo_client.clear_metrics)
+
+    # =============== COMMITS OPERATIONS ===============
+
+    async def store_commit(self, commit_data: Dict[str, Any]) -> str:
+        return await self.run(self.mongo_client.store_commit, commit_data)
+
+    async def store_commits(self, commits_data: List[Dict[str, Any]]) -> List[str]:
+        return await self.run(self.mongo_client.store_commits, commits_data)
+
+    async def get_commits(self, limit: int = 100, repo_name: Optional[str] = None,
+                          fields: Optional[List[str]] = None, after: Optional[str] = None,
+                          before: Optional[str] = None, include_diff: bool = True) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_commits, limit=limit, repo_name=repo_name,
+                              fields=fields, after=after, before=before, include_diff=include_diff)
+
+    async def clear_commits(self) -> bool:
+        return await self.run(self.mongo_client.clear_commits)
+
+    # =============== GENERAL OPERATIONS ===============
+
+    async def get_collection_stats(self) -> Dict[str, int]:
+        return await self.run(self.mongo_client.get_collection_stats)
+
+    async def search_logs(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                          levels: Optional[List[str]] = None, status_codes: Optional[List[int]] = None,
+                          endpoints: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                          limit: int = 1000) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.search_logs, start_time=start_time, end_time=end_time,
+                              levels=levels, status_codes=status_codes, endpoints=endpoints,
+                              fields=fields, limit=limit)
+
+    async def search_metrics(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                             metric_type: Optional[str] = None, fields: Optional[List[str]] = None,
+                             limit: int = 1000) -> List[Dict[str, Any]]:
+        return await self.run(self.mongo_client.search_metrics, start_time=start_time, end_time=end_time,
+                              metric_type=metric_type, fields=fields, limit=limit)
+
+    async def get_storage_stats(self) -> Dict[str, Dict[str, Any]]:
+        return await self.run(self.mongo_client.get_storage_stats)
+
+    async def check_index_usage(self) -> Dict[str, Dict[str, Any]]:
+        return await self.run(self.mongo_client.check_index_usage)
+
+    def close(self):
+        """Shut down the executor; the wrapped client stays open"""
+        self.executor.shutdown(wait=True)
+        logger.info("Async MongoDB executor shut down")
@@ -0,0 +1,157 @@
+import asyncio
+from collections import deque
+from typing import List, Dict, Optional, Any, Tuple
+from .Serialization import dumps
+
+
+class SlowConsumerError(Exception):
+    """Raised to a subscriber that fell further behind than the topic retains"""
+
+
+class _Topic:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # One chunk per publish() call: (event count, comma-joined encoded events)
+        self.chunks = deque()
+        self.first_seq = 0
+        self.next_seq = 0
+        self.held = 0
+        self.published = 0
+        self.changed = asyncio.Event()
+        # Last built frame; subscribers at the same cursor share it
+        self.frame_cache = (None, None, None)
+
+    def append(self, count: int, payload: bytes):
+        self.chunks.append((count, payload))
+        self.next_seq += 1
+        self.held += count
+        self.published += count
+        while self.held > self.capacity and len(self.chunks) > 1:
+            dropped, _ = self.chunks.popleft()
+            self.first_seq += 1
+            self.held -= dropped
+        # Wake everyone waiting on the previous event, then arm a fresh one
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def frame(self, start: int, max_events: int) -> Tuple[bytes, int]:
+        """JSON array of the chunks from `start`, capped near max_events; returns (frame, next cursor)"""
+        cached_start, cached_end, cached_frame = self.frame_cache
+        end = start
+        count = 0
+        while end < self.next_seq and count < max_events:
+            count += self.chunks[end - self.first_seq][0]
+            end += 1
+        if cached_start == start and cached_end == end:
+            return cached_frame, end
+        frame = b"[" + b",".join(self.chunks[seq - self.first_seq][1] for seq in range(start, end)) + b"]"
+        self.frame_cache = (start, end, frame)
+        return frame, end
+
+
+class Subscription:
+    def __init__(self, hub: "BroadcastHub", topics: List[str]):
+        self.hub = hub
+        # Only events published after subscribing are delivered
+        self.cursors = {topic: hub.topics[topic].next_seq for topic in topics}
+        self.closed = False
+
+    def _pending(self) -> bool:
+        return any(cursor < self.hub.topics[topic].next_seq for topic, cursor in self.cursors.items())
+
+    async def next_frames(self, timeout: Optional[float] = None) -> List[Tuple[str, bytes]]:
+        """
+        Wait for new events and return them as batched frames
+
+        Args:
+            timeout: Seconds to wait for events (None waits forever)
+
+        Returns:
+            List of (topic, JSON array frame); empty on timeout
+
+        Raises:
+            SlowConsumerError: The subscriber lagged more than the topic capacity
+        """
+        if not self._pending():
+            waiters = [asyncio.ensure_future(self.hub.topics[topic].changed.wait()) for topic in self.cursors]
+            try:
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+            if not self._pending():
+                return []
+        if self.hub.batch_window:
+            # Coalesce events arriving shortly after the first one into the same frame
+            await asyncio.sleep(self.hub.batch_window)
+
+        frames = []
+        for topic, cursor in self.cursors.items():
+            state = self.hub.topics[topic]
+            if cursor < state.first_seq:
+                self.close()
+                self.hub.evictions += 1
+                raise SlowConsumerError(f"Subscriber fell more than {state.capacity} {topic} events behind")
+            if cursor < state.next_seq:
+                frame, self.cursors[topic] = state.frame(cursor, self.hub.max_frame_events)
+                frames.append((topic, frame))
+        self.hub.frames_sent += len(frames)
+        return frames
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub.subscribers.discard(self)
+
+
+class BroadcastHub:
+    def __init__(self, topics=("logs", "metrics"), capacity: int = 10000, max_frame_events: int = 500,
+                 batch_window: float = 0.05):
+        """
+        Fan-out of ingested telemetry to live stream subscribers
+
+        Each event is serialized once at publish time into a shared
+        per-topic ring. Subscribers only hold a cursor into the ring and
+        receive batched JSON-array frames, so the cost of a new
+        subscriber is a join of already-encoded bytes, not another
+        serialization. A subscriber that falls more than `capacity`
+        events behind is evicted instead of holding memory.
+
+        Args:
+            topics: Topic names accepted by publish()
+            capacity: Encoded events retained per topic
+            max_frame_events: Soft limit of events per frame
+            batch_window: Seconds to coalesce events before a frame is built
+        """
+        self.topics = {topic: _Topic(capacity) for topic in topics}
+        self.max_frame_events = max_frame_events
+        self.batch_window = batch_window
+        self.subscribers = set()
+        self.evictions = 0
+        self.frames_sent = 0
+
+    def publish(self, topic: str, documents: List[Dict[str, Any]]):
+        """Encode documents once and make them visible to every subscriber (event loop thread only)"""
+        if not documents:
+            return
+        payload = b",".join(dumps(document) for document in documents)
+        self.topics[topic].append(len(documents), payload)
+
+    def subscribe(self, topics: Optional[List[str]] = None) -> Subscription:
+        topics = [topic for topic in (topics or self.topics) if topic in self.topics]
+        if not topics:
+            raise ValueError(f"Unknown topics, expected any of {', '.join(self.topics)}")
+        subscription = Subscription(self, topics)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "evictions": self.evictions,
+            "frames_sent": self.frames_sent,
+            "topics": {
+                name: {"published": topic.published, "held": topic.held, "capacity": topic.capacity}
+                for name, topic in self.topics.items()
+            },
+        }
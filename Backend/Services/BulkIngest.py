@@ -0,0 +1,355 @@
+import asyncio
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterable, Dict, List, Optional, Tuple
+import numpy as np
+from pymongo.errors import BulkWriteError
+from .LogParser import normalize_level
+from .MetricsRollup import to_utc_datetime
+from .Serialization import loads
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Timestamps further ahead than this are rejected as clock skew
+MAX_FUTURE_SKEW = timedelta(days=1)
+
+# Epoch numbers above this are milliseconds, below it seconds
+EPOCH_MS_THRESHOLD = 1e11
+
+# Fields owned by the server, never taken from the client
+RESERVED_FIELDS = ("_id", "_seq")
+
+# Per-request error messages reported back to the client
+MAX_REPORTED_ERRORS = 10
+
+
+class IngestLimitError(Exception):
+    """Raised when a request body exceeds the configured size limits"""
+
+
+def _has_utc_offset(value: str) -> bool:
+    # The date part has '-' at fixed positions; a sign after it is a UTC offset
+    return value.find("+", 10) > 0 or value.find("-", 10) > 0
+
+
+def normalize_timestamps(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Convert the timestamps of a batch to naive UTC datetimes in bulk
+
+    Epoch seconds/milliseconds and ISO strings without a UTC offset are
+    converted with one NumPy call per kind; strings with an offset (and
+    anything NumPy rejects) go through datetime.fromisoformat one by one.
+    Records without a timestamp get the current time.
+
+    Args:
+        records: Decoded records, updated in place
+
+    Returns:
+        Tuple: (records with a valid timestamp, number rejected)
+    """
+    now = datetime.utcnow()
+    upper = now + MAX_FUTURE_SKEW
+    parsed: List[Optional[datetime]] = [None] * len(records)
+    numeric_index, numeric_values = [], []
+    text_index, text_values = [], []
+
+    for i, record in enumerate(records):
+        value = record.get("timestamp")
+        if value is None:
+            parsed[i] = now
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            numeric_index.append(i)
+            numeric_values.append(value)
+        elif isinstance(value, str):
+            if value.endswith("Z"):
+                value = value[:-1]
+            if _has_utc_offset(value):
+                parsed[i] = to_utc_datetime(value)
+            else:
+                text_index.append(i)
+                text_values.append(value)
+        else:
+            parsed[i] = to_utc_datetime(value)
+
+    if numeric_values:
+        epochs = np.asarray(numeric_values, dtype=np.float64)
+        micros = np.where(epochs > EPOCH_MS_THRESHOLD, epochs * 1e3, epochs * 1e6)
+        valid = np.isfinite(micros) & (micros >= 0) & (micros < 2 ** 62)
+        converted = np.where(valid, micros, 0).astype(np.int64).astype("datetime64[us]").tolist()
+        for i, ok, timestamp in zip(numeric_index, valid.tolist(), converted):
+            if ok:
+                parsed[i] = timestamp
+
+    if text_values:
+        try:
+            converted = np.array(text_values, dtype="datetime64[us]").tolist()
+        except ValueError:
+            # At least one malformed string: parse the batch one by one
+            converted = [to_utc_datetime(value) for value in text_values]
+        for i, timestamp in zip(text_index, converted):
+            parsed[i] = timestamp
+
+    accepted = []
+    for record, timestamp in zip(records, parsed):
+        if isinstance(timestamp, datetime) and timestamp <= upper:
+            record["timestamp"] = timestamp
+            accepted.append(record)
+    return accepted, len(records) - len(accepted)
+
+
+class NdjsonDecoder:
+    def __init__(self, max_bytes: int, max_line_bytes: int = 1024 * 1024, inflate_chunk: int = 1024 * 1024):
+        """
+        Incremental NDJSON decoder for (optionally gzip-compressed) request bodies
+
+        Bytes are fed as they arrive; gzip is detected from the magic
+        bytes and inflated in bounded steps, so a small compressed body
+        cannot expand past max_bytes in memory. Only the trailing partial
+        line is carried between chunks.
+
+        Args:
+            max_bytes: Maximum decompressed body size
+            max_line_bytes: Maximum length of one line
+            inflate_chunk: Decompressed bytes produced per inflate step
+        """
+        self.max_bytes = max_bytes
+        self.max_line_bytes = max_line_bytes
+        self.inflate_chunk = inflate_chunk
+        self.head = b""
+        self.inflater = None
+        self.compressed = None
+        self.partial = b""
+        self.total = 0
+        self.line_number = 0
+        # Line number of every decoded record not yet collected with take_lines()
+        self.record_lines: List[int] = []
+        self.rejected = 0
+        self.errors: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Decode the complete lines available after `chunk`"""
+        if self.compressed is None:
+            # Need two bytes to tell gzip from plain NDJSON
+            self.head += chunk
+            if len(self.head) < 2:
+                return []
+            chunk, self.head = self.head, b""
+            self.compressed = chunk.startswith(GZIP_MAGIC)
+            if self.compressed:
+                self.inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if not self.compressed:
+            return self._split(chunk)
+
+        records = []
+        data = chunk
+        while data:
+            inflated = self.inflater.decompress(data, self.inflate_chunk)
+            records.extend(self._split(inflated))
+            if self.inflater.unconsumed_tail:
+                data = self.inflater.unconsumed_tail
+            elif self.inflater.eof and self.inflater.unused_data:
+                # Concatenated gzip members
+                data = self.inflater.unused_data
+                self.inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                data = b""
+        return records
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Decode the last line once the body has ended"""
+        records = []
+        if self.head:
+            self.compressed = False
+            records.extend(self._split(self.head))
+            self.head = b""
+        if self.inflater is not None and not self.inflater.eof:
+            raise zlib.error("truncated gzip stream")
+        if self.partial:
+            records.extend(self._parse([self.partial]))
+            self.partial = b""
+        return records
+
+    def _split(self, data: bytes) -> List[Dict[str, Any]]:
+        if not data:
+            return []
+        self.total += len(data)
+        if self.total > self.max_bytes:
+            raise IngestLimitError(f"Body exceeds {self.max_bytes} bytes")
+        end = data.rfind(b"\n")
+        if end < 0:
+            self.partial += data
+            if len(self.partial) > self.max_line_bytes:
+                raise IngestLimitError(f"Line {self.line_number + 1} exceeds {self.max_line_bytes} bytes")
+            return []
+        complete = self.partial + data[:end] if self.partial else data[:end]
+        self.partial = data[end + 1:]
+        return self._parse(complete.split(b"\n"))
+
+    def _parse(self, lines: List[bytes]) -> List[Dict[str, Any]]:
+        records = []
+        for line in lines:
+            self.line_number += 1
+            if not line.strip():
+                continue
+            if len(line) > self.max_line_bytes:
+                raise IngestLimitError(f"Line {self.line_number} exceeds {self.max_line_bytes} bytes")
+            try:
+                record = loads(line)
+            except ValueError:
+                self._reject("invalid JSON")
+                continue
+            if not isinstance(record, dict):
+                self._reject("not a JSON object")
+                continue
+            records.append(record)
+            self.record_lines.append(self.line_number)
+        return records
+
+    def take_lines(self) -> List[int]:
+        """Line numbers of the records returned since the last call, in order"""
+        lines, self.record_lines = self.record_lines, []
+        return lines
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {self.line_number}: {reason}")
+
+
+class BulkIngest:
+    def __init__(self, async_mongo, metrics_collector=None, hot_tier=None, hub=None,
+                 batch_size: int = 5000, max_bytes: int = 256 * 1024 * 1024, log_filter=None):
+        """
+        Bulk ingest of NDJSON logs/metrics pushed by external agents
+
+        Records are decoded while the body streams in and stored in
+        batches of batch_size with one insert_many each. One batch write
+        overlaps with decoding the next; the body is not read further
+        until the previous write finished, so a slow database slows the
+        client down instead of growing memory.
+
+        Args:
+            async_mongo: AsyncMongoDBClient used for the batch inserts
+            metrics_collector: Feeds ingested metrics into rollups, hot tier and stream
+            hot_tier: Recent-window store for ingested logs
+            hub: BroadcastHub for live log subscribers
+            batch_size: Records per insert
+            max_bytes: Maximum decompressed body size per request
+            log_filter: Stamps log templates on ingested logs (records are stored unfiltered)
+        """
+        self.async_mongo = async_mongo
+        self.metrics_collector = metrics_collector
+        self.hot_tier = hot_tier
+        self.hub = hub
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.log_filter = log_filter
+
+    def _prepare_logs(self, logs: List[Dict[str, Any]]):
+        for log in logs:
+            log["level"] = normalize_level(log.get("level") or "INFO")
+            log.setdefault("source", "ingest")
+        if self.log_filter is not None:
+            self.log_filter.observe_logs(logs)
+        if self.hot_tier is not None:
+            self.hot_tier.add_logs(logs)
+        if self.hub is not None:
+            self.hub.publish("logs", logs)
+
+    async def _store(self, kind: str, batch: List[Dict[str, Any]]):
+        if kind == "logs":
+            self._prepare_logs(batch)
+            await self.async_mongo.store_logs(batch)
+        else:
+            if self.metrics_collector is not None:
+                self.metrics_collector.observe_metrics(batch)
+            await self.async_mongo.store_metrics(batch)
+
+    async def ingest(self, kind: str, body: AsyncIterable[bytes],
+                     stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Decode and store one request body
+
+        Progress is kept in `stats` while the body is processed: `stored`
+        records are in MongoDB, and every record from line `resume_line`
+        on is not. When a request fails halfway, the caller reports these
+        so the client can re-send from resume_line without duplicates.
+
+        Args:
+            kind: "logs" or "metrics"
+            body: Async iterator over the raw body chunks
+            stats: Dict updated in place with the counts (created if omitted)
+
+        Returns:
+            Dict: accepted/rejected/stored counts, number of batches, resume_line and the first errors
+
+        Raises:
+            IngestLimitError: The body or a line is larger than allowed
+            zlib.error: The gzip stream is corrupt or truncated
+            Exception: A batch could not be stored
+        """
+        decoder = NdjsonDecoder(self.max_bytes)
+        if stats is None:
+            stats = {}
+        stats.update({"accepted": 0, "rejected": 0, "stored": 0, "batches": 0, "resume_line": 1})
+        pending: List[Dict[str, Any]] = []
+        pending_lines: List[int] = []
+        writing = None
+
+        async def write(batch, lines, last_line):
+            try:
+                await self._store(kind, batch)
+            except BulkWriteError as e:
+                # Inserts are ordered: the first nInserted records are stored
+                inserted = (e.details or {}).get("nInserted", 0)
+                stats["stored"] += inserted
+                if inserted:
+                    stats["resume_line"] = lines[inserted - 1] + 1
+                raise
+            stats["stored"] += len(batch)
+            # Records of the batch rejected for their timestamp are behind the client too
+            stats["resume_line"] = last_line + 1
+
+        async def submit(records, lines):
+            nonlocal writing
+            for record in records:
+                for field in RESERVED_FIELDS:
+                    record.pop(field, None)
+            batch, rejected = normalize_timestamps(records)
+            stats["rejected"] += rejected
+            last_line = lines[-1]
+            if rejected:
+                kept = {id(record) for record in batch}
+                lines = [line for record, line in zip(records, lines) if id(record) in kept]
+                if len(decoder.errors) < MAX_REPORTED_ERRORS:
+                    decoder.errors.append(f"{rejected} record(s) near line {decoder.line_number}: invalid timestamp")
+            if not batch:
+                return
+            if writing is not None:
+                await writing
+            writing = asyncio.ensure_future(write(batch, lines, last_line))
+            stats["accepted"] += len(batch)
+            stats["batches"] += 1
+
+        try:
+            async for chunk in body:
+                pending.extend(decoder.feed(chunk))
+                pending_lines.extend(decoder.take_lines())
+                while len(pending) >= self.batch_size:
+                    await submit(pending[:self.batch_size], pending_lines[:self.batch_size])
+                    del pending[:self.batch_size]
+                    del pending_lines[:self.batch_size]
+            pending.extend(decoder.finish())
+            pending_lines.extend(decoder.take_lines())
+            if pending:
+                await submit(pending, pending_lines)
+            if writing is not None:
+                await writing
+        finally:
+            if writing is not None and not writing.done():
+                # Let an in-flight batch land even if the body failed halfway
+                await asyncio.shield(writing)
+
+        stats["rejected"] += decoder.rejected
+        stats["errors"] = decoder.errors
+        return stats
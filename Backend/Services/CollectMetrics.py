@@ -1,10 +1,17 @@
 from datetime import datetime
 import os
 from .MongoClient import MongoDBClient
+from .MetricsRollup import MetricsRollup
 
 class MetricsCollector:
-    def __init__(self, mongo_client=None):
+    def __init__(self, mongo_client=None, write_buffer=None, rollup=None, hot_tier=None, hub=None,
+                 anomaly_detector=None):
         self.mongo_client = mongo_client or MongoDBClient()
+        self.write_buffer = write_buffer
+        self.rollup = rollup or MetricsRollup()
+        self.hot_tier = hot_tier
+        self.hub = hub
+        self.anomaly_detector = anomaly_detector
 
     def collect_metric(self, metrics):
         """Collect and store a metric"""
@@ -21,19 +28,89 @@ class MetricsCollector:
     def store_metrics(self, metrics):
         """Store metrics to MongoDB"""
         try:
-            # Ensure all metrics have required fields
-            for metric in metrics:
-                if 'metric_type' not in metric:
-                    metric['metric_type'] = 'system'
-                if 'timestamp' not in metric:
-                    metric['timestamp'] = datetime.utcnow()
+            self.observe_metrics(metrics)
             
+            if self.write_buffer is not None:
+                # Batched write-behind; flushed from the buffer's background task
+                self.write_buffer.add("metrics", metrics)
+                return
+
             # Store in MongoDB
             self.mongo_client.store_metrics(metrics)
                 
         except Exception as e:
             print(f"Error storing metrics to MongoDB: {e}")
     
+    def observe_metrics(self, metrics):
+        """Fill defaults and feed rollups, hot tier and live stream; the caller stores the metrics"""
+        # Ensure all metrics have required fields
+        for metric in metrics:
+            if 'metric_type' not in metric:
+                metric['metric_type'] = 'system'
+            if 'timestamp' not in metric:
+                metric['timestamp'] = datetime.utcnow()
+        
+        # Fold samples into the 10s/1m/1h rollups as they arrive
+        self._store_rollups(self.rollup.add_samples(metrics))
+        
+        if self.anomaly_detector is not None:
+            # Score samples against each series' running statistics
+            self._store_anomalies(metrics)
+        
+        if self.hot_tier is not None:
+            # Keep the newest samples in memory for recent-window reads
+            self.hot_tier.add_metrics(metrics)
+        
+        if self.hub is not None:
+            # Push to live stream subscribers (encoded once for all of them)
+            self.hub.publish("metrics", metrics)
+    
+    def _store_rollups(self, updates):
+        """Persist closed rollup buckets"""
+        if not updates:
+            return
+        try:
+            if self.write_buffer is not None:
+                self.write_buffer.add("metric_rollups", updates)
+            else:
+                self.mongo_client.store_metric_rollups(updates)
+        except Exception as e:
+            print(f"Error storing metric rollups to MongoDB: {e}")
+
+    def _store_anomalies(self, metrics):
+        """Run the anomaly detector and persist what it flags"""
+        try:
+            anomalies = self.anomaly_detector.process(metrics)
+            if not anomalies:
+                return
+            if self.hub is not None and "anomalies" in self.hub.topics:
+                self.hub.publish("anomalies", anomalies)
+            if self.write_buffer is not None:
+                self.write_buffer.add("anomalies", anomalies)
+            else:
+                self.mongo_client.store_anomalies(anomalies)
+        except Exception as e:
+            print(f"Error storing metric anomalies to MongoDB: {e}")
+
+    def flush_rollups(self):
+        """Persist the partially filled rollup buckets (call before shutdown)"""
+        self._store_rollups(self.rollup.drain())
+
+    def get_series(self, start, end, points=300, resolution=None):
+        """
+        Get a downsampled metrics series from the rollup tiers
+        
+        Uses the given resolution, or the coarsest one that still yields
+        `points` buckets for the range. Raw samples are never scanned.
+        """
+        resolution = resolution or self.rollup.choose_resolution(start, end, points)
+        try:
+            buckets = self.mongo_client.get_metric_rollups(resolution, start, end)
+        except Exception as e:
+            print(f"Error retrieving metric rollups from MongoDB: {e}")
+            buckets = []
+        return resolution, [self.rollup.summarize(bucket) for bucket in buckets]
+
     def get_metrics(self, limit=1000, metric_type=None):
         """Get metrics from MongoDB"""
         try:
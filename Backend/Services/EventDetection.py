@@ -1,10 +1,38 @@
 from DataCollectors.Telemenetry import TelemetryGenerator
+from .KeywordMatcher import KeywordMatcher
 
 class EventDetection:
-    def __init__(self):
+    def __init__(self, signatures=None):
         self.cpu_threshold = 85
         self.memory_threshold = 90
         self.error_keywords = ["error", "failed", "exception", "critical"]
+        # One automaton over every keyword/signature; a message is scanned once
+        self.keyword_matcher = KeywordMatcher(self.error_keywords)
+        if signatures:
+            self.add_signatures(signatures)
+    
+    def add_signatures(self, signatures, whole_word=None):
+        """
+        Add error signatures (exception names, customer-specific terms) to match in log messages
+        
+        Args:
+            signatures: Patterns, or {pattern: signature name}
+            whole_word: Only match the patterns as whole words (defaults to substring matching)
+        """
+        if not isinstance(signatures, dict):
+            signatures = {pattern: pattern for pattern in signatures}
+        for pattern, name in signatures.items():
+            self.keyword_matcher.add(pattern, name, whole_word=whole_word)
+    
+    def remove_signature(self, pattern):
+        return self.keyword_matcher.remove(pattern)
+    
+    def match_log(self, log):
+        """Names of the keywords/signatures found in a log message"""
+        message = log.get("message")
+        if not isinstance(message, str):
+            return []
+        return self.keyword_matcher.matches(message)
     
     def detect_from_metric(self, metric):
         """Detect events from a single metric entry"""
@@ -16,7 +44,7 @@ class EventDetection:
     
     def detect_from_log(self, log):
         """Detect events from a single log entry"""
-        message = log.get("message", "").lower()
-        if any(keyword in message for keyword in self.error_keywords):
-            return True
-        return False
\ No newline at end of file
+        message = log.get("message")
+        if not isinstance(message, str):
+            return False
+        return self.keyword_matcher.search(message)
\ No newline at end of file
@@ -0,0 +1,366 @@
+import json
+import os
+import re
+import time
+from bisect import bisect_left, bisect_right
+from fnmatch import translate
+from typing import Any, Dict, List, Optional
+
+KEEP = "keep"
+DROP = "drop"
+
+# Used when no config file exists: the historical ERROR/WARNING filter
+DEFAULT_CONFIG = {
+    "default": DROP,
+    "rules": [
+        {"name": "errors_and_warnings", "action": KEEP, "levels": ["ERROR", "WARNING"]},
+    ],
+}
+
+RULE_KEYS = {"name", "action", "levels", "status", "endpoints", "min_latency_ms", "max_latency_ms",
+             "message_contains"}
+
+# Distinct endpoints remembered with their rule mask before the cache is reset
+ENDPOINT_CACHE_SIZE = 10000
+
+# HTTP status codes below this are resolved from a precomputed table
+STATUS_TABLE_SIZE = 600
+
+
+def _status_ranges(spec) -> List[tuple]:
+    """[404, [500, 599]] -> [(404, 404), (500, 599)]"""
+    ranges = []
+    for item in spec:
+        if isinstance(item, (list, tuple)):
+            low, high = item
+        else:
+            low = high = item
+        ranges.append((int(low), int(high)))
+    return ranges
+
+
+class _CompiledRules:
+    """Bitmask indexes over one rule set; bit i is rule i, lower bits win"""
+
+    def __init__(self, rules: List[Dict[str, Any]], default: str):
+        self.rules = rules
+        self.default_keep = default == KEEP
+        self.keep_mask = 0
+        all_rules = (1 << len(rules)) - 1
+        self.all_rules = all_rules
+
+        self.levels = {}
+        self.any_level = all_rules
+        self.status_ranges = []
+        self.any_status = all_rules
+        self.endpoint_exact = {}
+        self.endpoint_globs = []
+        self.any_endpoint = all_rules
+        self.min_latency = []
+        self.max_latency = []
+        self.any_min_latency = all_rules
+        self.any_max_latency = all_rules
+        self.substrings = {}
+        self.any_message = all_rules
+
+        for index, rule in enumerate(rules):
+            bit = 1 << index
+            if rule.get("action", KEEP) == KEEP:
+                self.keep_mask |= bit
+            if "levels" in rule:
+                self.any_level &= ~bit
+                for level in rule["levels"]:
+                    level = str(level).upper()
+                    self.levels[level] = self.levels.get(level, 0) | bit
+            if "status" in rule:
+                self.any_status &= ~bit
+                for low, high in _status_ranges(rule["status"]):
+                    self.status_ranges.append((low, high, bit))
+            if "endpoints" in rule:
+                self.any_endpoint &= ~bit
+                for pattern in rule["endpoints"]:
+                    if any(char in pattern for char in "*?["):
+                        self.endpoint_globs.append((re.compile(translate(pattern)), bit))
+                    else:
+                        self.endpoint_exact[pattern] = self.endpoint_exact.get(pattern, 0) | bit
+            if "min_latency_ms" in rule:
+                self.any_min_latency &= ~bit
+                self.min_latency.append((float(rule["min_latency_ms"]), bit))
+            if "max_latency_ms" in rule:
+                self.any_max_latency &= ~bit
+                self.max_latency.append((float(rule["max_latency_ms"]), bit))
+            if "message_contains" in rule:
+                self.any_message &= ~bit
+                for substring in rule["message_contains"]:
+                    substring = str(substring).lower()
+                    self.substrings[substring] = self.substrings.get(substring, 0) | bit
+
+        # Status: one lookup per record for ordinary HTTP codes
+        self.status_table = [self._status_mask_slow(code) for code in range(STATUS_TABLE_SIZE)] \
+            if self.status_ranges else None
+
+        # Latency thresholds: sorted, with prefix/suffix ORs so a bisect yields the mask
+        self.min_thresholds, self.min_masks = self._cumulative(sorted(self.min_latency), prefix=True)
+        self.max_thresholds, self.max_masks = self._cumulative(sorted(self.max_latency), prefix=False)
+
+        # Substrings: one regex scan finds the longest alternative at each position; every
+        # shorter alternative starting there is a substring of it, so fold those masks in
+        if self.substrings:
+            alternatives = sorted(self.substrings, key=len, reverse=True)
+            self.substring_regex = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))")
+            self.substring_masks = {found: self._fold(found) for found in alternatives}
+        else:
+            self.substring_regex = None
+
+        self.endpoint_cache = {}
+        # Dimensions no rule constrains are skipped entirely
+        self.checks = [check for check, used in (
+            (self._level_mask, bool(self.levels)),
+            (self._status_mask, bool(self.status_ranges)),
+            (self._endpoint_mask, bool(self.endpoint_exact or self.endpoint_globs)),
+            (self._latency_mask, bool(self.min_latency or self.max_latency)),
+            (self._message_mask, self.substring_regex is not None),
+        ) if used]
+
+    @staticmethod
+    def _cumulative(thresholds, prefix):
+        values = [value for value, _ in thresholds]
+        masks = []
+        if prefix:
+            accumulated = 0
+            for _, bit in thresholds:
+                accumulated |= bit
+                masks.append(accumulated)
+        else:
+            accumulated = 0
+            for _, bit in reversed(thresholds):
+                accumulated |= bit
+                masks.append(accumulated)
+            masks.reverse()
+        return values, masks
+
+    def _fold(self, found):
+        mask = 0
+        for substring, bits in self.substrings.items():
+            if substring in found:
+                mask |= bits
+        return mask
+
+    def _status_mask_slow(self, code):
+        mask = self.any_status
+        for low, high, bit in self.status_ranges:
+            if low <= code <= high:
+                mask |= bit
+        return mask
+
+    # =============== PER-DIMENSION MASKS ===============
+
+    def _level_mask(self, record):
+        level = record.get("level")
+        if not isinstance(level, str):
+            return self.any_level
+        mask = self.levels.get(level)
+        if mask is None:
+            mask = self.levels.get(level.upper(), 0)
+        return mask | self.any_level
+
+    def _status_mask(self, record):
+        code = record.get("status_code")
+        if not isinstance(code, int):
+            return self.any_status
+        if 0 <= code < STATUS_TABLE_SIZE:
+            return self.status_table[code]
+        return self._status_mask_slow(code)
+
+    def _endpoint_mask(self, record):
+        endpoint = record.get("endpoint")
+        if not isinstance(endpoint, str):
+            return self.any_endpoint
+        mask = self.endpoint_cache.get(endpoint)
+        if mask is None:
+            mask = self.endpoint_exact.get(endpoint, 0) | self.any_endpoint
+            for regex, bit in self.endpoint_globs:
+                if not mask & bit and regex.match(endpoint):
+                    mask |= bit
+            if len(self.endpoint_cache) >= ENDPOINT_CACHE_SIZE:
+                self.endpoint_cache.clear()
+            self.endpoint_cache[endpoint] = mask
+        return mask
+
+    def _latency_mask(self, record):
+        latency = record.get("latency_ms")
+        if not isinstance(latency, (int, float)):
+            return self.any_min_latency & self.any_max_latency
+        mask = self.any_min_latency
+        if self.min_thresholds:
+            index = bisect_right(self.min_thresholds, latency) - 1
+            if index >= 0:
+                mask |= self.min_masks[index]
+        upper = self.any_max_latency
+        if self.max_thresholds:
+            index = bisect_left(self.max_thresholds, latency)
+            if index < len(self.max_masks):
+                upper |= self.max_masks[index]
+        return mask & upper
+
+    def _message_mask(self, record):
+        message = record.get("message")
+        mask = self.any_message
+        if not isinstance(message, str):
+            return mask
+        substring_masks = self.substring_masks
+        for match in self.substring_regex.finditer(message.lower()):
+            mask |= substring_masks[match.group(1)]
+        return mask
+
+    def match(self, record) -> int:
+        """Index of the first matching rule, -1 if none"""
+        candidates = self.all_rules
+        for check in self.checks:
+            candidates &= check(record)
+            if not candidates:
+                return -1
+        return (candidates & -candidates).bit_length() - 1
+
+    def keeps(self, index: int) -> bool:
+        return self.default_keep if index < 0 else bool(self.keep_mask >> index & 1)
+
+
+class FilterRuleEngine:
+    def __init__(self, config_path: Optional[str] = None, extra_rules: Optional[List[Dict[str, Any]]] = None,
+                 reload_interval: float = 1.0):
+        """
+        Declarative keep/drop rules for incoming logs
+
+        Rules are read from a JSON config ({"default": "drop", "rules": [...]}),
+        checked in order, and the first match decides. A rule may constrain
+        levels, status codes/ranges, endpoint globs, latency bounds and
+        message substrings; conditions within a rule must all hold, values
+        within a condition are alternatives. Rules are compiled into one
+        bitmask index per condition, so a record costs one lookup per
+        condition in use regardless of how many rules there are. The file
+        is re-read when its mtime changes; an invalid file keeps the
+        previous rules.
+
+        Args:
+            config_path: JSON rules file (defaults to Config/filter_rules.json next to main.py)
+            extra_rules: Rules evaluated before the configured ones
+            reload_interval: Seconds between config mtime checks
+        """
+        if config_path is None:
+            backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            config_path = os.path.join(backend_root, "Config", "filter_rules.json")
+        self.config_path = config_path
+        self.extra_rules = list(extra_rules or [])
+        self.reload_interval = reload_interval
+        self.mtime = None
+        self.next_check = 0.0
+        self.reloads = 0
+        self.compiled = None
+        self.hits = []
+        self.load()
+
+    @staticmethod
+    def validate(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Check a config and return its rules; raises ValueError if it is malformed"""
+        if not isinstance(config, dict) or not isinstance(config.get("rules", []), list):
+            raise ValueError("Config must be an object with a 'rules' list")
+        if config.get("default", DROP) not in (KEEP, DROP):
+            raise ValueError("'default' must be 'keep' or 'drop'")
+        rules = config.get("rules", [])
+        for index, rule in enumerate(rules):
+            if not isinstance(rule, dict):
+                raise ValueError(f"Rule {index} is not an object")
+            unknown = set(rule) - RULE_KEYS
+            if unknown:
+                raise ValueError(f"Rule {index} has unknown keys: {', '.join(sorted(unknown))}")
+            if rule.get("action", KEEP) not in (KEEP, DROP):
+                raise ValueError(f"Rule {index} action must be 'keep' or 'drop'")
+            for key in ("levels", "status", "endpoints", "message_contains"):
+                if key in rule and not isinstance(rule[key], list):
+                    raise ValueError(f"Rule {index} '{key}' must be a list")
+            if "status" in rule:
+                _status_ranges(rule["status"])
+            if not all(isinstance(pattern, str) for pattern in rule.get("endpoints", [])):
+                raise ValueError(f"Rule {index} 'endpoints' must be strings")
+            for key in ("min_latency_ms", "max_latency_ms"):
+                if key in rule and (not isinstance(rule[key], (int, float)) or isinstance(rule[key], bool)):
+                    raise ValueError(f"Rule {index} '{key}' must be a number")
+        return rules
+
+    def load(self):
+        """(Re)compile the rules from the config file, or the defaults when it does not exist"""
+        try:
+            mtime = os.stat(self.config_path).st_mtime
+        except OSError:
+            mtime = None
+        try:
+            if mtime is None:
+                config = DEFAULT_CONFIG
+            else:
+                with open(self.config_path) as f:
+                    config = json.load(f)
+                self.validate(config)
+            rules = self.extra_rules + list(config.get("rules", []))
+            compiled = _CompiledRules(rules, config.get("default", DROP))
+        except (OSError, ValueError, TypeError, re.error) as e:
+            print(f"Error loading filter rules from {self.config_path}: {e}")
+            # Keep the current rules; the file is retried once its mtime changes again
+            self.mtime = mtime
+            if self.compiled is not None:
+                return
+            rules = self.extra_rules + list(DEFAULT_CONFIG["rules"])
+            compiled = _CompiledRules(rules, DEFAULT_CONFIG.get("default", DROP))
+        self.compiled = compiled
+        self.hits = [0] * len(rules)
+        self.mtime = mtime
+        self.reloads += 1
+
+    def maybe_reload(self):
+        """Reload if the config file changed (checked at most every reload_interval seconds)"""
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + self.reload_interval
+        try:
+            mtime = os.stat(self.config_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self.mtime:
+            self.load()
+
+    def filter(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Evaluate a batch and return the records the rules keep
+
+        Args:
+            records: Log records
+
+        Returns:
+            List: Kept records, in input order
+        """
+        self.maybe_reload()
+        compiled = self.compiled
+        match = compiled.match
+        keeps = compiled.keeps
+        hits = self.hits
+        kept = []
+        for record in records:
+            index = match(record)
+            if index >= 0:
+                hits[index] += 1
+            if keeps(index):
+                kept.append(record)
+        return kept
+
+    def get_stats(self) -> Dict[str, Any]:
+        compiled = self.compiled
+        return {
+            "config_path": self.config_path,
+            "reloads": self.reloads,
+            "default": KEEP if compiled.default_keep else DROP,
+            "rules": [
+                {"name": rule.get("name", f"rule_{index}"), "action": rule.get("action", KEEP), "hits": hits}
+                for index, (rule, hits) in enumerate(zip(compiled.rules, self.hits))
+            ],
+        }
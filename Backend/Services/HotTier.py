@@ -0,0 +1,239 @@
+import heapq
+from array import array
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+from bson import ObjectId
+from .MetricsRollup import to_utc_datetime, EPOCH
+
+# Log schema fields held in dedicated slots; anything else goes to `extra`
+LOG_FIELDS = ("timestamp", "level", "user", "ip", "method", "endpoint", "status_code",
+              "request_id", "latency_ms", "cpu_spike", "message")
+
+# Numeric metric fields stored column-wise in typed arrays
+METRIC_FIELDS = ("cpu_percent", "memory_percent", "memory_used_mb", "memory_total_mb")
+
+
+def _epoch(timestamp: datetime) -> float:
+    return (timestamp - EPOCH).total_seconds()
+
+
+def _to_millis(timestamp: datetime) -> datetime:
+    """Truncate to the millisecond precision MongoDB stores, so cursors built from either side agree"""
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+class LogRecord:
+    __slots__ = ("_id", "epoch", "extra") + LOG_FIELDS
+
+    def __init__(self, log: Dict[str, Any], timestamp: datetime):
+        self._id = str(log["_id"])
+        self.epoch = _epoch(timestamp)
+        extra = None
+        for key, value in log.items():
+            if key in LOG_FIELDS:
+                continue
+            if key != "_id":
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self.extra = extra
+        for field in LOG_FIELDS:
+            setattr(self, field, log.get(field))
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        document = {"_id": self._id}
+        for field in LOG_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                document[field] = value
+        if self.extra:
+            document.update(self.extra)
+        return document
+
+
+class _Ring:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.next = 0
+        # Every record timestamped after this instant is still held: it is
+        # the newest timestamp evicted so far (or the startup time)
+        self.covered_since = _epoch(datetime.utcnow())
+
+    def _advance(self) -> int:
+        slot = self.next
+        self.next = (slot + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        return slot
+
+    def _newest_first(self):
+        for offset in range(1, self.size + 1):
+            yield (self.next - offset) % self.capacity
+
+
+class LogRing(_Ring):
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.records = [None] * capacity
+
+    def append(self, record: LogRecord):
+        slot = self._advance()
+        evicted = self.records[slot]
+        if evicted is not None:
+            self.covered_since = max(self.covered_since, evicted.epoch)
+        self.records[slot] = record
+
+    def newest_first(self):
+        for slot in self._newest_first():
+            yield self.records[slot]
+
+
+class MetricRing(_Ring):
+    def __init__(self, capacity: int, fields=METRIC_FIELDS):
+        super().__init__(capacity)
+        self.fields = fields
+        nan = float("nan")
+        self.epochs = array("d", [0.0]) * capacity
+        self.columns = {field: array("d", [nan]) * capacity for field in fields}
+        self.ids = [None] * capacity
+        self.timestamps = [None] * capacity
+        self.extras = [None] * capacity
+
+    def append(self, metric: Dict[str, Any], timestamp: datetime):
+        slot = self._advance()
+        if self.ids[slot] is not None:
+            self.covered_since = max(self.covered_since, self.epochs[slot])
+        self.epochs[slot] = _epoch(timestamp)
+        self.ids[slot] = str(metric["_id"])
+        self.timestamps[slot] = timestamp
+        extra = None
+        for key, value in metric.items():
+            column = self.columns.get(key)
+            if column is not None and isinstance(value, (int, float)):
+                column[slot] = value
+            elif key not in ("_id", "timestamp"):
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        for field, column in self.columns.items():
+            if field not in metric:
+                column[slot] = float("nan")
+        self.extras[slot] = extra
+
+    def to_dict(self, slot: int) -> Dict[str, Any]:
+        document = {"_id": self.ids[slot], "timestamp": self.timestamps[slot]}
+        for field, column in self.columns.items():
+            value = column[slot]
+            if value == value:  # skip NaN (field absent)
+                document[field] = value
+        if self.extras[slot]:
+            document.update(self.extras[slot])
+        return document
+
+
+class HotTier:
+    def __init__(self, log_capacity: int = 10000, metric_capacity: int = 10000):
+        """
+        Bounded in-process store of the most recently ingested logs and metrics
+
+        Recent-window reads are answered from fixed-capacity ring buffers
+        without touching MongoDB. A query returns None when the rings
+        cannot prove they hold the complete answer, and the caller falls
+        through to MongoDBClient.
+
+        Args:
+            log_capacity: Number of log records kept
+            metric_capacity: Number of metric samples kept
+        """
+        self.logs = LogRing(log_capacity)
+        self.metrics = MetricRing(metric_capacity)
+
+    def add_logs(self, logs: List[Dict[str, Any]]):
+        """Record ingested logs; assigns their _id so MongoDB stores the same one"""
+        for log in logs:
+            timestamp = to_utc_datetime(log.get("timestamp"))
+            if timestamp is None:
+                continue
+            log.setdefault("_id", ObjectId())
+            self.logs.append(LogRecord(log, _to_millis(timestamp)))
+
+    def add_metrics(self, metrics: List[Dict[str, Any]]):
+        """Record ingested metrics; assigns their _id so MongoDB stores the same one"""
+        for metric in metrics:
+            timestamp = to_utc_datetime(metric.get("timestamp"))
+            if timestamp is None:
+                continue
+            metric.setdefault("_id", ObjectId())
+            self.metrics.append(metric, _to_millis(timestamp))
+
+    @staticmethod
+    def _complete(found: List[tuple], limit: int, ring: _Ring, start_time: Optional[datetime]) -> bool:
+        """
+        Whether the newest `limit` matches held in memory are the true newest ones
+
+        Records arrive out of timestamp order (file tails, syslog, bulk
+        ingest), so an evicted record may be newer than one still held;
+        only records strictly newer than every evicted one are known to
+        be complete.
+        """
+        if len(found) >= limit and found[-1][0] > ring.covered_since:
+            return True
+        return start_time is not None and _epoch(start_time) > ring.covered_since
+
+    @staticmethod
+    def _project(document: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        if not fields:
+            return document
+        keep = set(fields) | {"_id", "timestamp"}
+        return {key: value for key, value in document.items() if key in keep}
+
+    def recent_logs(self, limit: int = 1000, levels: Optional[List[str]] = None,
+                    start_time: Optional[datetime] = None,
+                    fields: Optional[List[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the newest logs from memory
+
+        Args:
+            limit: Maximum number of logs to return
+            levels: Only return logs with one of these levels
+            start_time: Only return logs at or after this time
+            fields: Only return these fields (plus _id and timestamp)
+
+        Returns:
+            List[Dict] newest first, or None if older data is needed from MongoDB
+        """
+        cutoff = _epoch(start_time) if start_time else None
+        # Ring order is ingest order; pages are ordered by (timestamp, _id) like MongoDB's
+        found = heapq.nlargest(limit, (
+            (record.epoch, record._id, record) for record in self.logs.newest_first()
+            if (cutoff is None or record.epoch >= cutoff) and (not levels or record.level in levels)
+        ), key=lambda item: item[:2])
+        if not self._complete(found, limit, self.logs, start_time):
+            return None
+        return [self._project(record.to_dict(), fields) for _, _, record in found]
+
+    def recent_metrics(self, limit: int = 1000, start_time: Optional[datetime] = None,
+                       fields: Optional[List[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the newest metric samples from memory
+
+        Returns:
+            List[Dict] newest first, or None if older data is needed from MongoDB
+        """
+        cutoff = _epoch(start_time) if start_time else None
+        epochs, ids = self.metrics.epochs, self.metrics.ids
+        found = heapq.nlargest(limit, (
+            (epochs[slot], ids[slot], slot) for slot in self.metrics._newest_first()
+            if cutoff is None or epochs[slot] >= cutoff
+        ), key=lambda item: item[:2])
+        if not self._complete(found, limit, self.metrics, start_time):
+            return None
+        return [self._project(self.metrics.to_dict(slot), fields) for _, _, slot in found]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "logs": {"size": self.logs.size, "capacity": self.logs.capacity},
+            "metrics": {"size": self.metrics.size, "capacity": self.metrics.capacity},
+        }
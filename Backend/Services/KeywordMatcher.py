@@ -0,0 +1,181 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    def __init__(self, patterns: Union[Iterable[str], Dict[str, str], None] = None,
+                 case_sensitive: bool = False, whole_words: bool = False):
+        """
+        Aho-Corasick multi-pattern matcher
+
+        All patterns live in one trie with failure links, so a message is
+        scanned once, left to right, whatever the number of patterns: the
+        cost is linear in the message length plus the number of matches.
+        Transitions are memoized per state the first time a character is
+        seen there, so steady-state scanning is one dict lookup per
+        character. Adding or removing patterns only touches the trie; the
+        failure links are recomputed lazily on the next scan.
+
+        Args:
+            patterns: Patterns to match, or {pattern: signature name}
+            case_sensitive: Match case exactly (default folds case)
+            whole_words: Only report matches not surrounded by word characters
+        """
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+        self.children: List[Dict[str, int]] = [{}]
+        self.terminal: List[List[int]] = [[]]
+        self.entries: List[Optional[Tuple[str, str, bool, int]]] = []
+        self.index: Dict[str, int] = {}
+        self.dirty = True
+        if isinstance(patterns, dict):
+            self.update(patterns)
+        elif patterns is not None:
+            self.update({pattern: pattern for pattern in patterns})
+
+    def _key(self, pattern: str) -> str:
+        return pattern if self.case_sensitive else pattern.lower()
+
+    def add(self, pattern: str, name: Optional[str] = None, whole_word: Optional[bool] = None):
+        """
+        Add (or replace) one pattern
+
+        Args:
+            pattern: Text to find
+            name: Signature reported for matches (defaults to the pattern)
+            whole_word: Override the matcher's whole_words mode for this pattern
+        """
+        key = self._key(pattern)
+        if not key:
+            raise ValueError("Empty patterns cannot be matched")
+        entry = (pattern, name or pattern, self.whole_words if whole_word is None else whole_word, len(key))
+        if key in self.index:
+            self.entries[self.index[key]] = entry
+            return
+        state = 0
+        for char in key:
+            next_state = self.children[state].get(char)
+            if next_state is None:
+                next_state = len(self.children)
+                self.children.append({})
+                self.terminal.append([])
+                self.children[state][char] = next_state
+            state = next_state
+        self.index[key] = len(self.entries)
+        self.terminal[state].append(len(self.entries))
+        self.entries.append(entry)
+        self.dirty = True
+
+    def update(self, patterns: Dict[str, str]):
+        """Add several {pattern: name} entries"""
+        for pattern, name in patterns.items():
+            self.add(pattern, name)
+
+    def remove(self, pattern: str) -> bool:
+        """Stop matching a pattern; returns False if it was not present"""
+        entry_id = self.index.pop(self._key(pattern), None)
+        if entry_id is None:
+            return False
+        self.entries[entry_id] = None
+        for ids in self.terminal:
+            if entry_id in ids:
+                ids.remove(entry_id)
+                break
+        self.dirty = True
+        return True
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, pattern: str) -> bool:
+        return self._key(pattern) in self.index
+
+    def _compile(self):
+        """Breadth-first failure and output links over the current trie"""
+        count = len(self.children)
+        fail = [0] * count
+        # Nearest state on the failure chain that ends a pattern (-1: none)
+        output_link = [-1] * count
+        queue = deque(self.children[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.children[state].items():
+                fallback = fail[state]
+                while fallback and char not in self.children[fallback]:
+                    fallback = fail[fallback]
+                target = self.children[fallback].get(char, 0)
+                fail[child] = target if target != child else 0
+                output_link[child] = fail[child] if self.terminal[fail[child]] else output_link[fail[child]]
+                queue.append(child)
+        self.fail = fail
+        self.output_link = output_link
+        self.has_output = [bool(self.terminal[state]) or output_link[state] >= 0 for state in range(count)]
+        self.delta = [dict(children) for children in self.children]
+        self.dirty = False
+
+    def _transition(self, state: int, char: str) -> int:
+        current = state
+        while True:
+            next_state = self.children[current].get(char)
+            if next_state is not None or current == 0:
+                break
+            current = self.fail[current]
+        next_state = next_state or 0
+        self.delta[state][char] = next_state
+        return next_state
+
+    def find_all(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Every occurrence of every pattern
+
+        Args:
+            text: Message to scan
+
+        Returns:
+            List of (signature name, start, end) in order of their end position
+        """
+        return self._scan(text, first_only=False)
+
+    def _scan(self, text: str, first_only: bool) -> List[Tuple[str, int, int]]:
+        if self.dirty:
+            self._compile()
+        if not self.case_sensitive:
+            text = text.lower()
+        delta = self.delta
+        has_output = self.has_output
+        terminal = self.terminal
+        output_link = self.output_link
+        entries = self.entries
+        found = []
+        state = 0
+        for position, char in enumerate(text):
+            next_state = delta[state].get(char)
+            state = self._transition(state, char) if next_state is None else next_state
+            if not has_output[state]:
+                continue
+            end = position + 1
+            match_state = state
+            while match_state >= 0:
+                for entry_id in terminal[match_state]:
+                    _, name, whole_word, length = entries[entry_id]
+                    start = end - length
+                    if whole_word and ((start > 0 and _is_word_char(text[start - 1]))
+                                       or (end < len(text) and _is_word_char(text[end]))):
+                        continue
+                    found.append((name, start, end))
+                    if first_only:
+                        return found
+                match_state = output_link[match_state]
+        return found
+
+    def matches(self, text: str) -> List[str]:
+        """Distinct signature names found in text, in order of first match"""
+        return list(dict.fromkeys(name for name, _, _ in self.find_all(text)))
+
+    def search(self, text: str) -> bool:
+        """True if any pattern occurs in text"""
+        return bool(self._scan(text, first_only=True))
@@ -3,22 +3,42 @@ import json
 import os
 from datetime import datetime
 from .MongoClient import MongoDBClient
+from .FilterRuleEngine import FilterRuleEngine
 
 class LogFilter:
-    def __init__(self, status_filter=None, mongo_client=None):
+    def __init__(self, status_filter=None, mongo_client=None, write_buffer=None, hot_tier=None, hub=None,
+                 rules_path=None, template_miner=None):
         self.status_filter = status_filter or []
         self.mongo_client = mongo_client or MongoDBClient()
+        self.write_buffer = write_buffer
+        self.hot_tier = hot_tier
+        self.hub = hub
+        self.template_miner = template_miner
+        self.template_task = None
+        # Keep/drop rules from the JSON config (hot reloaded); status_filter entries are checked first
+        self.rules = FilterRuleEngine(config_path=rules_path, extra_rules=self._status_filter_rules())
+    
+    def _status_filter_rules(self):
+        """Keep rules for status_filter: level names and HTTP status codes or [low, high] ranges"""
+        levels = [entry for entry in self.status_filter if isinstance(entry, str)]
+        codes = [entry for entry in self.status_filter if not isinstance(entry, str)]
+        rules = []
+        if levels:
+            rules.append({"name": "status_filter_levels", "action": "keep", "levels": levels})
+        if codes:
+            rules.append({"name": "status_filter_codes", "action": "keep", "status": codes})
+        return rules
     
     def filter_logs(self, logs):
         
         if isinstance(logs, dict):
             logs = [logs]
         
-        # Filter logs for ERROR and WARNING levels
-        filtered_logs = []
-        for log in logs:
-            if isinstance(log, dict) and log.get('level') in ['ERROR', 'WARNING']:
-                filtered_logs.append(log)
+        logs = [log for log in logs if isinstance(log, dict)]
+        self.observe_logs(logs)
+        
+        # Keep the logs selected by the filter rules (ERROR and WARNING by default)
+        filtered_logs = self.rules.filter(logs)
         
         # Save filtered logs to MongoDB
         if filtered_logs:
@@ -26,9 +46,66 @@ class LogFilter:
             
         return filtered_logs
     
+    def observe_logs(self, logs):
+        """Stamp template_id/template_params on every incoming log (kept or not) and count its template"""
+        if self.template_miner is None:
+            return
+        try:
+            self.template_miner.add_logs(logs)
+        except Exception as e:
+            print(f"Error mining log templates: {e}")
+    
+    def _store_templates(self, templates, counts):
+        """Persist changed templates and per-minute template counts"""
+        try:
+            if self.write_buffer is not None:
+                self.write_buffer.add("log_templates", templates)
+                self.write_buffer.add("template_counts", counts)
+                return
+            self.mongo_client.store_log_templates(templates)
+            self.mongo_client.store_template_counts(counts)
+        except Exception as e:
+            print(f"Error storing log templates to MongoDB: {e}")
+    
+    def flush_templates(self):
+        """Persist template changes and counts not yet drained"""
+        if self.template_miner is not None:
+            self._store_templates(*self.template_miner.drain(force=True))
+    
+    async def start(self):
+        """Persist mined templates every flush_interval, whether or not logs keep arriving"""
+        if self.template_miner is not None and self.template_task is None:
+            self.template_task = asyncio.create_task(self._template_loop())
+    
+    async def stop(self):
+        """Stop the template task and persist what it has not drained yet"""
+        if self.template_task is not None:
+            self.template_task.cancel()
+            try:
+                await self.template_task
+            except asyncio.CancelledError:
+                pass
+            self.template_task = None
+        self.flush_templates()
+    
+    async def _template_loop(self):
+        while True:
+            await asyncio.sleep(self.template_miner.flush_interval)
+            self.flush_templates()
+    
     def _save_filtered_logs(self, filtered_logs):
         """Save filtered logs to MongoDB"""
         try:
+            if self.hot_tier is not None:
+                # Keep the newest logs in memory for recent-window reads
+                self.hot_tier.add_logs(filtered_logs)
+            if self.hub is not None:
+                # Push to live stream subscribers (encoded once for all of them)
+                self.hub.publish("logs", filtered_logs)
+            if self.write_buffer is not None:
+                # Batched write-behind; flushed from the buffer's background task
+                self.write_buffer.add("logs", filtered_logs)
+                return
             # Store logs in MongoDB
             self.mongo_client.store_logs(filtered_logs)
         except Exception as e:
@@ -0,0 +1,426 @@
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .Serialization import loads
+
+# Level tokens looked up in the start of plain-text lines, most severe first
+LEVEL_TOKENS = [
+    ("CRITICAL", "ERROR"),
+    ("FATAL", "ERROR"),
+    ("ERROR", "ERROR"),
+    ("WARN", "WARNING"),
+    ("DEBUG", "DEBUG"),
+]
+
+# Level spellings normalized to the levels LogFilter knows
+LEVEL_ALIASES = {"WARN": "WARNING", "ERR": "ERROR", "CRITICAL": "ERROR", "FATAL": "ERROR"}
+
+# Only this many leading characters are scanned for a level token
+LEVEL_SCAN_CHARS = 120
+
+# Grok building blocks; %{NAME} or %{NAME:field} in a pattern expands to these
+GROK_PATTERNS = {
+    "INT": r"[+-]?\d+",
+    "NUMBER": r"[+-]?\d+(?:\.\d+)?",
+    "WORD": r"\w+",
+    "NOTSPACE": r"\S+",
+    "DATA": r".*?",
+    "GREEDYDATA": r".*",
+    "QUOTED": r'[^"]*',
+    "IP": r"[0-9A-Fa-f:.]+",
+    "HTTPDATE": r"\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4}",
+    "TIMESTAMP_ISO8601": r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?",
+    "LOGLEVEL": r"(?i:TRACE|DEBUG|INFO|NOTICE|WARN(?:ING)?|ERR(?:OR)?|CRITICAL|FATAL)",
+}
+
+GROK_REFERENCE = re.compile(r"%\{(\w+)(?::(\w+))?\}")
+
+MONTHS = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+          "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
+
+# key=value keys mapped onto the log schema
+KV_FIELD_ALIASES = {
+    "lvl": "level", "severity": "level",
+    "msg": "message",
+    "ts": "timestamp", "time": "timestamp",
+    "status": "status_code", "code": "status_code",
+    "path": "endpoint", "uri": "endpoint", "url": "endpoint",
+    "latency": "latency_ms", "duration_ms": "latency_ms",
+    "request": "request_id", "req_id": "request_id",
+    "client": "ip", "remote_addr": "ip",
+}
+
+KV_PAIR = re.compile(r'(\w[\w.]*)=("(?:[^"\\]|\\.)*"|\S*)')
+
+# Lines that continue the previous event instead of starting one
+TRACEBACK_START = "Traceback (most recent call last):"
+CHAINED_TRACEBACK = ("During handling of the above exception", "The above exception was the direct cause")
+
+# Python exception line closing a traceback: "pkg.Name: message", or a bare name
+# with an exception suffix ("KeyboardInterrupt"); a bare word like "Killed" is not one
+EXCEPTION_NAME = r"(?:[A-Za-z_]\w*\.)*(?=[A-Z])\w*"
+EXCEPTION_LINE = re.compile(
+    rf"^(?={EXCEPTION_NAME}(?:: |(?:Error|Exception|Exit|Interrupt|Warning|Iteration)$))({EXCEPTION_NAME})(?:: (.*))?$"
+)
+
+
+def compile_grok(pattern: str) -> "re.Pattern":
+    """Expand %{NAME:field} references into named groups and compile the result"""
+    def expand(match):
+        name, field = match.group(1), match.group(2)
+        body = GROK_PATTERNS[name]
+        return f"(?P<{field}>{body})" if field else f"(?:{body})"
+    return re.compile(GROK_REFERENCE.sub(expand, pattern))
+
+
+def infer_level(line):
+    head = line[:LEVEL_SCAN_CHARS].upper()
+    for token, level in LEVEL_TOKENS:
+        if token in head:
+            return level
+    return "INFO"
+
+
+def normalize_level(value):
+    level = str(value).upper()
+    return LEVEL_ALIASES.get(level, level)
+
+
+def level_from_status(status_code):
+    if status_code >= 500:
+        return "ERROR"
+    if status_code >= 400:
+        return "WARNING"
+    return "INFO"
+
+
+_httpdate_cache = (None, None)
+
+
+def parse_httpdate(value: str) -> Optional[str]:
+    """'10/Oct/2023:13:55:36 -0700' -> naive UTC ISO string, without strptime"""
+    global _httpdate_cache
+    # Access logs repeat the same second many times; remember the last conversion
+    cached_value, cached_result = _httpdate_cache
+    if value == cached_value:
+        return cached_result
+    try:
+        timestamp = datetime(int(value[7:11]), MONTHS[value[3:6]], int(value[0:2]),
+                             int(value[12:14]), int(value[15:17]), int(value[18:20]))
+        sign = -1 if value[21] == "-" else 1
+        offset = timedelta(hours=int(value[22:24]), minutes=int(value[24:26]))
+        result = (timestamp - sign * offset).isoformat()
+    except (ValueError, KeyError, IndexError):
+        result = None
+    _httpdate_cache = (value, result)
+    return result
+
+
+class Parser:
+    def __init__(self, name: str, parse: Callable[[str], Optional[Dict[str, Any]]]):
+        """
+        One named parser with hit/miss/latency counters
+
+        Args:
+            name: Reported in the stats
+            parse: Returns a log record for the line, or None when it does not match
+        """
+        self.name = name
+        self.parse = parse
+        self.hits = 0
+        self.misses = 0
+        self.total_ns = 0
+
+    def __call__(self, line: str) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter_ns()
+        record = self.parse(line)
+        self.total_ns += time.perf_counter_ns() - started
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "avg_us": round(self.total_ns / calls / 1000, 3) if calls else 0.0,
+        }
+
+
+# =============== PARSERS ===============
+
+ACCESS_LOG = compile_grok(
+    r'^%{IP:ip} \S+ %{NOTSPACE:user} \[%{HTTPDATE:timestamp}\] '
+    r'"%{WORD:method} %{NOTSPACE:endpoint}(?: HTTP/[\d.]+)?" %{INT:status_code} (?:%{INT:bytes}|-)'
+    r'(?: "%{QUOTED:referrer}" "%{QUOTED:user_agent}")?(?: %{NUMBER:request_time})?'
+)
+
+LEVELED_LINE = compile_grok(
+    r"^%{TIMESTAMP_ISO8601:timestamp}\s+(?:\[[^\]]*\]\s+)?\[?%{LOGLEVEL:level}\]?[\s:]+%{GREEDYDATA:message}$"
+)
+
+
+def parse_access_log(line):
+    """nginx/apache common and combined formats; nginx $request_time appended at the end"""
+    match = ACCESS_LOG.match(line)
+    if match is None:
+        return None
+    fields = match.groupdict()
+    status_code = int(fields["status_code"])
+    record = {
+        "level": level_from_status(status_code),
+        "ip": fields["ip"],
+        "method": fields["method"],
+        "endpoint": fields["endpoint"],
+        "status_code": status_code,
+        "message": line,
+    }
+    timestamp = parse_httpdate(fields["timestamp"])
+    if timestamp:
+        record["timestamp"] = timestamp
+    if fields["user"] != "-":
+        record["user"] = fields["user"]
+    if fields["bytes"]:
+        record["bytes"] = int(fields["bytes"])
+    if fields["user_agent"]:
+        record["user_agent"] = fields["user_agent"]
+    if fields["request_time"]:
+        record["latency_ms"] = round(float(fields["request_time"]) * 1000, 3)
+    return record
+
+
+def coerce_numbers(record):
+    """Turn textual status_code/latency_ms ("500", "12ms", "1.5s") into numbers; other values are kept"""
+    status = record.get("status_code")
+    if isinstance(status, str) and status.strip().isdigit():
+        record["status_code"] = int(status)
+    elif isinstance(status, float) and status.is_integer():
+        record["status_code"] = int(status)
+    latency = record.get("latency_ms")
+    if isinstance(latency, str):
+        value, scale = latency.strip(), 1
+        if value.endswith("ms"):
+            value = value[:-2]
+        elif value.endswith("s"):
+            value, scale = value[:-1], 1000
+        try:
+            record["latency_ms"] = float(value) * scale
+        except ValueError:
+            pass
+    return record
+
+
+def parse_json_line(line):
+    try:
+        record = loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    record.setdefault("message", line)
+    coerce_numbers(record)
+    if "level" in record:
+        record["level"] = normalize_level(record["level"])
+    elif isinstance(record.get("status_code"), int):
+        record["level"] = level_from_status(record["status_code"])
+    else:
+        record["level"] = infer_level(str(record["message"]))
+    return record
+
+
+def _kv_value(value):
+    if value.startswith('"'):
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def parse_key_value(line):
+    """logfmt-style `key=value key2="quoted value"` lines"""
+    pairs = KV_PAIR.findall(line)
+    if len(pairs) < 2:
+        return None
+    record = {}
+    for key, value in pairs:
+        record[KV_FIELD_ALIASES.get(key, key)] = _kv_value(value)
+    coerce_numbers(record)
+    if "level" in record:
+        record["level"] = normalize_level(record["level"])
+    elif isinstance(record.get("status_code"), int):
+        record["level"] = level_from_status(record["status_code"])
+    else:
+        record["level"] = infer_level(line)
+    record.setdefault("message", line)
+    return record
+
+
+def parse_leveled_line(line):
+    """'2024-05-01 12:00:00,123 ERROR [worker] message' style application logs"""
+    match = LEVELED_LINE.match(line)
+    if match is None:
+        return None
+    timestamp = match.group("timestamp").replace(",", ".")
+    return {
+        "timestamp": timestamp,
+        "level": normalize_level(match.group("level")),
+        "message": line,
+    }
+
+
+def parse_plain(line):
+    return {"level": infer_level(line), "message": line}
+
+
+class LogParser:
+    def __init__(self):
+        """
+        Turn raw log lines into records in the log schema
+
+        A constant-time pre-classifier looks at the first character and a
+        few fixed positions of each line and picks the one parser that can
+        match it (JSON, access log, timestamped application line or
+        key=value), so at most one regex runs per line before the plain
+        fallback. Continuation lines (Python tracebacks, indented stack
+        frames) are folded into the preceding event by `assemble`.
+        """
+        self.parsers = {
+            "json": Parser("json", parse_json_line),
+            "access": Parser("access", parse_access_log),
+            "leveled": Parser("leveled", parse_leveled_line),
+            "key_value": Parser("key_value", parse_key_value),
+            "plain": Parser("plain", parse_plain),
+        }
+        self.multiline_events = 0
+
+    def classify(self, line: str) -> str:
+        """Name of the parser to try first for a line"""
+        first = line[0]
+        if first == "{":
+            return "json"
+        if first.isdigit():
+            # "1.2.3.4 - - [..." vs "2024-05-01 ..."
+            if line[4:5] == "-" and line[7:8] == "-":
+                return "leveled"
+            return "access"
+        if ":" in line[:5] and " - " in line[:48]:
+            return "access"  # IPv6 client address
+        equals = line.find("=", 0, 64)
+        if equals > 0 and " " not in line[:equals]:
+            return "key_value"
+        return "plain"
+
+    def parse(self, line: str, source: Optional[str] = None) -> Dict[str, Any]:
+        """Parse one line (never fails; unmatched lines become plain records)"""
+        record = None
+        if line:
+            name = self.classify(line)
+            if name != "plain":
+                record = self.parsers[name](line)
+        if record is None:
+            record = self.parsers["plain"](line)
+        if source is not None:
+            record["source"] = source
+        return record
+
+    @staticmethod
+    def is_continuation(line: str, previous: Optional[Dict[str, Any]]) -> bool:
+        """True if the line belongs to the event before it rather than starting a new one"""
+        if previous is None or not line:
+            return False
+        if line[0] in " \t":
+            return True
+        if line.startswith(TRACEBACK_START) or line.startswith(CHAINED_TRACEBACK):
+            return True
+        # "ValueError: ..." right after the frames closes the traceback
+        return previous.get("_open_traceback", False) and EXCEPTION_LINE.match(line) is not None
+
+    def assemble(self, lines: List[str], source: Optional[str] = None,
+                 pending: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Parse lines and fold multi-line events (stack traces) into single records
+
+        The last event may still receive continuation lines from the next
+        read, so it is returned separately instead of being emitted. Blank
+        lines after a traceback are held back: Python puts them around the
+        "During handling of the above exception" line of chained tracebacks.
+
+        Args:
+            lines: Raw lines without their line terminator
+            source: Stored as the `source` field
+            pending: Unfinished event returned by the previous call
+
+        Returns:
+            Tuple: (complete records, unfinished last event or None); an
+            unfinished event that starts in `lines` carries the index of its
+            first line as `_start_line`
+        """
+        records = []
+        current = pending
+        continuation = None
+        blank_lines = current.pop("_blank_lines", 0) if current is not None else 0
+        for index, line in enumerate(lines):
+            if not line and current is not None and "_open_traceback" in current:
+                blank_lines += 1
+                continue
+            if self.is_continuation(line, current):
+                if continuation is None:
+                    continuation = [current["message"]]
+                if blank_lines:
+                    continuation.extend([""] * blank_lines)
+                    blank_lines = 0
+                continuation.append(line)
+                if line.startswith(TRACEBACK_START):
+                    current["_open_traceback"] = True
+                elif current.get("_open_traceback") and line[0] not in " \t":
+                    self._close_traceback(current, line)
+                continue
+            if current is not None:
+                records.append(self._finish(current, continuation))
+            continuation = None
+            blank_lines = 0
+            current = self.parse(line, source) if line else None
+            if current is not None:
+                current["_start_line"] = index
+                if line.startswith(TRACEBACK_START):
+                    current["_open_traceback"] = True
+        if current is not None and continuation is not None:
+            current["message"] = "\n".join(continuation)
+            current["_multiline"] = True
+        if blank_lines:
+            current["_blank_lines"] = blank_lines
+        return records, current
+
+    def _close_traceback(self, event, line):
+        match = EXCEPTION_LINE.match(line)
+        event["exception_type"] = match.group(1)
+        if match.group(2):
+            event["exception_message"] = match.group(2)
+        event["_open_traceback"] = False
+
+    def _finish(self, event, continuation):
+        if continuation is not None:
+            event["message"] = "\n".join(continuation)
+            event["_multiline"] = True
+        return self.flush(event)
+
+    def flush(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Finalize an event returned as pending by `assemble`"""
+        event.pop("_start_line", None)
+        event.pop("_blank_lines", None)
+        if event.pop("_multiline", False):
+            self.multiline_events += 1
+        if "_open_traceback" in event or "exception_type" in event:
+            event.pop("_open_traceback", None)
+            # A traceback makes the event an error whatever its first line said
+            if event.get("level") in (None, "INFO", "DEBUG"):
+                event["level"] = "ERROR"
+        return event
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "multiline_events": self.multiline_events,
+            "parsers": {name: parser.get_stats() for name, parser in self.parsers.items()},
+        }
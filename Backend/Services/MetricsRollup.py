@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Any
+
+# Bucket width in seconds per resolution, finest first
+RESOLUTIONS = {"10s": 10, "1m": 60, "1h": 3600}
+
+# Numeric fields summarized in every bucket
+ROLLUP_FIELDS = ["cpu_percent", "memory_percent"]
+
+# Percent values are histogrammed in 1% bins for the p95 approximation
+HISTOGRAM_BINS = 100
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_utc_datetime(value) -> Optional[datetime]:
+    """Convert an ISO string or datetime into a naive UTC datetime"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def histogram_quantile(hist: Dict[str, int], count: int, quantile: float) -> Optional[float]:
+    """Approximate a quantile from a {bin: count} histogram, interpolating inside the bin"""
+    if not count:
+        return None
+    target = quantile * count
+    seen = 0
+    for bin_index in sorted(int(b) for b in hist):
+        bin_count = hist[str(bin_index)]
+        if seen + bin_count >= target:
+            return bin_index + (target - seen) / bin_count
+        seen += bin_count
+    return float(HISTOGRAM_BINS)
+
+
+class _FieldStats:
+    __slots__ = ("count", "total", "minimum", "maximum", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.hist = {}
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        bin_index = str(min(max(int(value), 0), HISTOGRAM_BINS - 1))
+        self.hist[bin_index] = self.hist.get(bin_index, 0) + 1
+
+    def to_update(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.minimum,
+            "max": self.maximum,
+            "hist": self.hist,
+        }
+
+
+class MetricsRollup:
+    def __init__(self, fields: List[str] = None, resolutions: Dict[str, int] = None):
+        """
+        Incrementally aggregate metric samples into fixed time buckets
+
+        One bucket per resolution is kept open in memory. When a sample
+        lands in a later bucket the open one is closed and returned as a
+        mergeable update (count/sum/min/max/histogram), so partial
+        buckets written at shutdown or by late samples combine correctly
+        in MongoDB.
+
+        Args:
+            fields: Numeric metric fields to summarize
+            resolutions: Resolution name -> bucket width in seconds
+        """
+        self.fields = fields or ROLLUP_FIELDS
+        self.resolutions = resolutions or RESOLUTIONS
+        self._open = {}
+
+    def _bucket_start(self, timestamp: datetime, width: int) -> datetime:
+        seconds = int((timestamp - EPOCH).total_seconds())
+        return EPOCH + timedelta(seconds=seconds - seconds % width)
+
+    def _new_bucket(self):
+        return {field: _FieldStats() for field in self.fields}
+
+    def _bucket_update(self, resolution: str, start: datetime, bucket) -> Dict[str, Any]:
+        return {
+            "resolution": resolution,
+            "timestamp": start,
+            "fields": {field: stats.to_update() for field, stats in bucket.items() if stats.count},
+        }
+
+    def add_samples(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fold metric samples into the open buckets
+
+        Args:
+            metrics: Metric documents with a timestamp and numeric fields
+
+        Returns:
+            List[Dict]: Bucket updates that are ready to be persisted
+        """
+        ready = []
+        # Late samples of already closed buckets, merged per bucket within this batch
+        late = {}
+        for metric in metrics:
+            timestamp = to_utc_datetime(metric.get("timestamp"))
+            if timestamp is None:
+                continue
+            values = [(field, metric[field]) for field in self.fields
+                      if isinstance(metric.get(field), (int, float))]
+            if not values:
+                continue
+
+            for resolution, width in self.resolutions.items():
+                start = self._bucket_start(timestamp, width)
+                current = self._open.get(resolution)
+
+                if current is None or start > current[0]:
+                    if current is not None:
+                        ready.append(self._bucket_update(resolution, *current))
+                    current = (start, self._new_bucket())
+                    self._open[resolution] = current
+                    bucket = current[1]
+                elif start < current[0]:
+                    # Late sample for an already closed bucket: one merged update per bucket
+                    bucket = late.get((resolution, start))
+                    if bucket is None:
+                        bucket = late[(resolution, start)] = self._new_bucket()
+                else:
+                    bucket = current[1]
+
+                for field, value in values:
+                    bucket[field].add(value)
+        ready.extend(self._bucket_update(resolution, start, bucket) for (resolution, start), bucket in late.items())
+        return [update for update in ready if update["fields"]]
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Close every open bucket and return its update (used on shutdown)"""
+        ready = [self._bucket_update(resolution, start, bucket)
+                 for resolution, (start, bucket) in self._open.items()]
+        self._open = {}
+        return [update for update in ready if update["fields"]]
+
+    def choose_resolution(self, start: datetime, end: datetime, points: int) -> str:
+        """
+        Pick the coarsest resolution that still yields at least `points` buckets
+
+        Falls back to the finest resolution for short ranges.
+        """
+        seconds_per_point = max((end - start).total_seconds(), 0) / max(points, 1)
+        finest_first = sorted(self.resolutions.items(), key=lambda item: item[1])
+        chosen = finest_first[0][0]
+        for resolution, width in finest_first:
+            if width <= seconds_per_point:
+                chosen = resolution
+        return chosen
+
+    def summarize(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a stored rollup document into a chart point"""
+        point = {"timestamp": document["timestamp"]}
+        for field in self.fields:
+            stats = document.get(field)
+            if not stats or not stats.get("count"):
+                continue
+            count = stats["count"]
+            p95 = histogram_quantile(stats.get("hist", {}), count, 0.95)
+            if p95 is not None and stats.get("min") is not None:
+                # Bin interpolation can overshoot the observed range
+                p95 = min(max(p95, stats["min"]), stats["max"])
+            point[field] = {
+                "min": stats.get("min"),
+                "max": stats.get("max"),
+                "avg": stats["sum"] / count,
+                "count": count,
+                "p95": p95,
+            }
+        return point
@@ -1,11 +1,32 @@
-from pymongo import MongoClient
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Tuple, Iterator
+import base64
+import hashlib
+import json
 import logging
+import threading
+from .TemplateMiner import render_template
 
 logger = logging.getLogger(__name__)
 
 class MongoDBClient:
+    # Newest first, with _id breaking timestamp ties so keyset pages are stable
+    KEYSET_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+    # Seconds each metrics rollup resolution is kept before its TTL index expires it
+    ROLLUP_RETENTION = {"10s": 2 * 86400, "1m": 30 * 86400, "1h": 400 * 86400}
+    
+    # Seconds detected metric anomalies are kept
+    ANOMALY_RETENTION = 30 * 86400
+    
+    # Seconds per-minute log template counts are kept
+    TEMPLATE_COUNT_RETENTION = 30 * 86400
+    
+    # Fields from which the message of a compacted log is rebuilt
+    TEMPLATE_FIELDS = ('template_id', 'template_version', 'template_params')
+
     def __init__(self, connection_string="mongodb://localhost:27017/", database_name="logagent"):
         """
         Initialize MongoDB client
@@ -26,6 +47,29 @@ class MongoDBClient:
             self.logs_collection = self.db.logs
             self.metrics_collection = self.db.metrics
             self.commits_collection = self.db.commits
+            self.counters_collection = self.db.counters
+            self.commit_blobs_collection = self.db.commit_blobs
+            self.sync_checkpoints_collection = self.db.sync_checkpoints
+            self.anomalies_collection = self.db.anomalies
+            self.log_templates_collection = self.db.log_templates
+            self.template_counts_collection = self.db.template_counts
+            self.rollup_collections = {
+                resolution: self.db[f"metrics_{resolution}"] for resolution in self.ROLLUP_RETENTION
+            }
+            
+            # Held while reserving ingest sequence numbers and inserting, so
+            # documents become visible in sequence order
+            self._sequence_locks = {'logs': threading.Lock(), 'metrics': threading.Lock()}
+            
+            # Optional cold tier (ParquetArchive) consulted by search_logs/search_metrics
+            self.archive = None
+            
+            # Store logs without their message when a persisted template version rebuilds it
+            self.compact_messages = False
+            # Set once get_log_templates() has read every persisted template; compaction waits for it
+            self.templates_loaded = False
+            # template_id -> persisted template versions, for compacting and rebuilding messages
+            self._template_versions = {}
             
             # Create indexes for better performance
             self._create_indexes()
@@ -37,24 +81,292 @@ class MongoDBClient:
     def _create_indexes(self):
         """Create indexes for better query performance"""
         try:
-            # Index for logs collection
+            # Index for logs collection; (level, timestamp, _id) serves level
+            # filters sorted by time and keyset pages without an in-memory sort
             self.logs_collection.create_index("timestamp")
-            self.logs_collection.create_index("level")
+            self.logs_collection.create_index(self.KEYSET_SORT)
+            self.logs_collection.create_index([("level", ASCENDING)] + self.KEYSET_SORT)
             self.logs_collection.create_index("status_code")
+            self.logs_collection.create_index("_seq")
             
             # Index for metrics collection
             self.metrics_collection.create_index("timestamp")
-            self.metrics_collection.create_index("metric_type")
+            self.metrics_collection.create_index(self.KEYSET_SORT)
+            self.metrics_collection.create_index([("metric_type", ASCENDING)] + self.KEYSET_SORT)
+            self.metrics_collection.create_index("_seq")
             
             # Index for commits collection
             self.commits_collection.create_index("timestamp")
-            self.commits_collection.create_index("repo_name")
+            self.commits_collection.create_index(self.KEYSET_SORT)
+            self.commits_collection.create_index([("repo_name", ASCENDING)] + self.KEYSET_SORT)
+            
+            # One document per rollup bucket, expired per resolution
+            for resolution, collection in self.rollup_collections.items():
+                collection.create_index("timestamp", unique=True,
+                                        expireAfterSeconds=self.ROLLUP_RETENTION[resolution])
+            
+            # Anomalies: expired after ANOMALY_RETENTION, read newest first per field
+            self.anomalies_collection.create_index("timestamp", expireAfterSeconds=self.ANOMALY_RETENTION)
+            self.anomalies_collection.create_index([("field", ASCENDING), ("timestamp", DESCENDING)])
+            
+            # One document per log template, and per template and minute for the counts
+            self.log_templates_collection.create_index("template_id", unique=True)
+            self.template_counts_collection.create_index([("template_id", ASCENDING), ("timestamp", ASCENDING)],
+                                                         unique=True)
+            self.template_counts_collection.create_index("timestamp",
+                                                         expireAfterSeconds=self.TEMPLATE_COUNT_RETENTION)
             
         except Exception as e:
             logger.warning(f"Failed to create some indexes: {e}")
+        
+        try:
+            # One document per commit; fails if older duplicate commits are still stored.
+            # Sparse, so imported commits without a hash do not collide on null
+            self.commits_collection.create_index("hash", unique=True, sparse=True)
+        except Exception as e:
+            logger.warning(f"Failed to create unique commit hash index (remove duplicate commits): {e}")
+
+    @staticmethod
+    def _projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+        """Build a find() projection from a list of field names (None = all fields)"""
+        if not fields:
+            return None
+        projection = {field: 1 for field in fields}
+        # Pagination cursors are built from timestamp and _id
+        projection['timestamp'] = 1
+        return projection
+
+    # =============== PAGINATION ===============
+
+    @staticmethod
+    def encode_cursor(document: Dict[str, Any]) -> str:
+        """
+        Build an opaque keyset cursor from a document's (timestamp, _id)
+        
+        Args:
+            document: Document returned by one of the get_* methods
+            
+        Returns:
+            str: URL-safe cursor string
+        """
+        timestamp = document['timestamp']
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        payload = json.dumps({'t': timestamp, 'id': str(document['_id'])}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+        """
+        Decode a cursor produced by encode_cursor
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(payload['t']), ObjectId(payload['id'])
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    def _keyset_find(self, collection, query: Dict[str, Any], limit: int,
+                     fields: Optional[List[str]] = None, after: Optional[str] = None,
+                     before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run a newest-first query, optionally resuming from a keyset cursor
+        
+        before returns the page of documents older than the cursor, after
+        returns the page newer than it. Both seek through the
+        (timestamp, _id) index, so deep pages cost the same as the first.
+        """
+        sort = self.KEYSET_SORT
+        forward = bool(after) and not before
+        if after or before:
+            timestamp, object_id = self.decode_cursor(before or after)
+            if before:
+                # Bound the index scan on timestamp, break ties on _id
+                keyset = {'timestamp': {'$lte': timestamp},
+                          '$or': [{'timestamp': {'$lt': timestamp}}, {'_id': {'$lt': object_id}}]}
+            else:
+                keyset = {'timestamp': {'$gte': timestamp},
+                          '$or': [{'timestamp': {'$gt': timestamp}}, {'_id': {'$gt': object_id}}]}
+                # Walk forward from the cursor, then flip back to newest first
+                sort = [(key, ASCENDING) for key, _ in self.KEYSET_SORT]
+            query = {'$and': [query, keyset]} if query else keyset
+        
+        cursor = collection.find(query, self._projection(fields)).sort(sort).limit(limit)
+        documents = list(cursor)
+        if forward:
+            documents.reverse()
+        
+        # Convert ObjectId to string for JSON serialization
+        for document in documents:
+            document['_id'] = str(document['_id'])
+        return documents
+
+    def _iter_batches(self, collection, query: Dict[str, Any], fields: Optional[List[str]] = None,
+                      batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield newest-first query results in lists of at most batch_size
+        
+        Documents are yielded as returned by the driver (ObjectId _id,
+        datetime timestamp) and only one batch is held in memory at a time.
+        """
+        cursor = collection.find(query, self._projection(fields)).sort(self.KEYSET_SORT).batch_size(batch_size)
+        try:
+            batch = []
+            for document in cursor:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _time_range(start_time: Optional[datetime], end_time: Optional[datetime]) -> Optional[Dict[str, datetime]]:
+        """Build a timestamp range condition (None when unbounded)"""
+        if not (start_time or end_time):
+            return None
+        timestamp_query = {}
+        if start_time:
+            timestamp_query['$gte'] = start_time
+        if end_time:
+            timestamp_query['$lte'] = end_time
+        return timestamp_query
+
+    # =============== INGEST SEQUENCE ===============
+
+    def _reserve_sequence(self, name: str, count: int) -> int:
+        """
+        Reserve a block of ingest sequence numbers
+        
+        Args:
+            name: Counter name (one per collection)
+            count: Number of sequence numbers to reserve
+            
+        Returns:
+            int: First sequence number of the reserved block
+        """
+        counter = self.counters_collection.find_one_and_update(
+            {'_id': name},
+            {'$inc': {'seq': count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['seq'] - count + 1
+
+    def _insert_sequenced(self, name: str, collection, documents: List[Dict[str, Any]]):
+        """Stamp documents with consecutive _seq values and insert them"""
+        with self._sequence_locks[name]:
+            first = self._reserve_sequence(name, len(documents))
+            for offset, document in enumerate(documents):
+                document['_seq'] = first + offset
+            return collection.insert_many(documents)
+
+    def _changes_since(self, collection, since: Optional[int], limit: int,
+                       fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return documents ingested after a watermark
+        
+        Args:
+            collection: Collection to read
+            since: Last _seq the caller has seen; None returns the newest documents
+            limit: Maximum number of documents to return
+            fields: Only return these fields (plus _id, _seq and timestamp)
+            
+        Returns:
+            Dict: {'items': newest first, 'watermark': int, 'has_more': bool}
+        """
+        projection = self._projection(fields)
+        if projection:
+            projection['_seq'] = 1
+        
+        if since is None:
+            cursor = collection.find({'_seq': {'$exists': True}}, projection).sort('_seq', DESCENDING).limit(limit)
+            items = list(cursor)
+            watermark = items[0]['_seq'] if items else 0
+            has_more = False
+        else:
+            cursor = collection.find({'_seq': {'$gt': since}}, projection).sort('_seq', ASCENDING).limit(limit + 1)
+            items = list(cursor)
+            has_more = len(items) > limit
+            items = items[:limit]
+            watermark = items[-1]['_seq'] if items else since
+            items.reverse()
+        
+        for item in items:
+            item['_id'] = str(item['_id'])
+        return {'items': items, 'watermark': watermark, 'has_more': has_more}
 
     # =============== LOGS OPERATIONS ===============
     
+    def _compact_messages(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Documents to insert for logs, without the message where it can be rebuilt
+        
+        A log loses its message only if its template version is already
+        persisted and rebuilds the message exactly, so no stored log refers
+        to a template that a crash could lose. Nothing is compacted before
+        the persisted templates were loaded, since a miner restarted
+        without them could reuse their ids.
+        """
+        if not self.compact_messages or not self.templates_loaded or not self._template_versions:
+            return logs
+        documents = []
+        for log in logs:
+            versions = self._template_versions.get(log.get('template_id'))
+            version = log.get('template_version')
+            if versions is not None and isinstance(version, int) and 0 <= version < len(versions) \
+                    and isinstance(log.get('message'), str) \
+                    and render_template(versions[version], log.get('template_params') or []) == log['message']:
+                # The same _id on every attempt, so a retried batch cannot store a log twice
+                log.setdefault('_id', ObjectId())
+                log = {key: value for key, value in log.items() if key != 'message'}
+            documents.append(log)
+        return documents
+    
+    def _log_fields(self, fields: Optional[List[str]]) -> Optional[List[str]]:
+        """Projected log fields, plus what is needed to rebuild a requested message"""
+        if fields and 'message' in fields:
+            return list(fields) + [field for field in self.TEMPLATE_FIELDS if field not in fields]
+        return fields
+    
+    def _rebuild_messages(self, logs: List[Dict[str, Any]],
+                          fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Fill in the message of logs stored without it, from their template version"""
+        extra = [field for field in self.TEMPLATE_FIELDS if field not in fields] \
+            if fields and 'message' in fields else []
+        for log in logs:
+            if 'message' not in log and 'template_version' in log:
+                versions = self._get_template_versions(log.get('template_id'), log['template_version'])
+                version = log['template_version']
+                if versions is not None and 0 <= version < len(versions):
+                    message = render_template(versions[version], log.get('template_params') or [])
+                    if message is not None:
+                        log['message'] = message
+            for field in extra:
+                log.pop(field, None)
+        return logs
+    
+    def _get_template_versions(self, template_id: Any, version: int) -> Optional[List[str]]:
+        """Persisted versions of a template, read from MongoDB when the cache does not have `version`"""
+        versions = self._template_versions.get(template_id)
+        if versions is None or version >= len(versions):
+            try:
+                document = self.log_templates_collection.find_one({'template_id': template_id},
+                                                                  {'_id': 0, 'template': 1, 'versions': 1})
+            except Exception as e:
+                logger.error(f"Failed to retrieve log template {template_id}: {e}")
+                return versions
+            if document:
+                versions = document.get('versions') or [document.get('template', '')]
+                self._template_versions[template_id] = versions
+        return versions
+    
     def store_log(self, log_data: Dict[str, Any]) -> str:
         """
         Store a single log entry
@@ -76,8 +388,8 @@ class MongoDBClient:
                 except:
                     log_data['timestamp'] = datetime.utcnow()
                     
-            result = self.logs_collection.insert_one(log_data)
-            return str(result.inserted_id)
+            result = self._insert_sequenced('logs', self.logs_collection, [log_data])
+            return str(result.inserted_ids[0])
         except Exception as e:
             logger.error(f"Failed to store log: {e}")
             raise
@@ -103,14 +415,16 @@ class MongoDBClient:
                     except:
                         log['timestamp'] = datetime.utcnow()
                         
-            result = self.logs_collection.insert_many(logs_data)
+            result = self._insert_sequenced('logs', self.logs_collection, self._compact_messages(logs_data))
             return [str(id) for id in result.inserted_ids]
         except Exception as e:
             logger.error(f"Failed to store logs: {e}")
             raise
 
     def get_logs(self, limit: int = 1000, level: Optional[str] = None, 
-                 start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+                 start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                 fields: Optional[List[str]] = None, after: Optional[str] = None,
+                 before: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Retrieve logs with optional filtering
         
@@ -119,10 +433,16 @@ class MongoDBClient:
             level: Filter by log level (ERROR, WARNING, INFO, etc.)
             start_time: Filter logs after this time
             end_time: Filter logs before this time
+            fields: Only return these fields (plus _id and timestamp)
+            after: Cursor; return the page of logs newer than it
+            before: Cursor; return the page of logs older than it
             
         Returns:
-            List[Dict]: List of log documents
+            List[Dict]: List of log documents, newest first
         """
+        if after or before:
+            # Surface malformed cursors to the caller instead of an empty page
+            self.decode_cursor(after or before)
         try:
             query = {}
             
@@ -137,30 +457,72 @@ class MongoDBClient:
                     timestamp_query['$lte'] = end_time
                 query['timestamp'] = timestamp_query
             
-            cursor = self.logs_collection.find(query).sort("timestamp", -1).limit(limit)
-            logs = list(cursor)
-            
-            # Convert ObjectId to string for JSON serialization
-            for log in logs:
-                log['_id'] = str(log['_id'])
-                
-            return logs
+            logs = self._keyset_find(self.logs_collection, query, limit, self._log_fields(fields), after, before)
+            return self._rebuild_messages(logs, fields)
         except Exception as e:
             logger.error(f"Failed to retrieve logs: {e}")
             return []
 
-    def get_filtered_logs(self, levels: List[str] = ['ERROR', 'WARNING'], limit: int = 1000) -> List[Dict[str, Any]]:
+    def iter_logs(self, level: Optional[str] = None, start_time: Optional[datetime] = None,
+                  end_time: Optional[datetime] = None, fields: Optional[List[str]] = None,
+                  batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream logs in batches for exports
+        
+        Args:
+            level: Filter by log level
+            start_time: Filter logs after this time
+            end_time: Filter logs before this time
+            fields: Only return these fields (plus _id and timestamp)
+            batch_size: Number of documents per yielded batch
+            
+        Yields:
+            List[Dict]: Raw log documents, newest first
+        """
+        query = {}
+        if level:
+            query['level'] = level
+        timestamp_query = self._time_range(start_time, end_time)
+        if timestamp_query:
+            query['timestamp'] = timestamp_query
+        batches = self._iter_batches(self.logs_collection, query, self._log_fields(fields), batch_size)
+        return (self._rebuild_messages(batch, fields) for batch in batches)
+
+    def get_filtered_logs(self, levels: List[str] = ['ERROR', 'WARNING'], limit: int = 1000,
+                          fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Get logs filtered by levels (typically ERROR and WARNING)
         
         Args:
             levels: List of log levels to filter by
             limit: Maximum number of logs to return
+            fields: Only return these fields (plus _id and timestamp)
             
         Returns:
             List[Dict]: List of filtered log documents
         """
-        return self.get_logs(limit=limit, level={'$in': levels} if len(levels) > 1 else levels[0])
+        return self.get_logs(limit=limit, level={'$in': levels} if len(levels) > 1 else levels[0], fields=fields)
+
+    def get_logs_since(self, since: Optional[int] = None, limit: int = 1000,
+                       fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Get logs stored after an ingest watermark
+        
+        Args:
+            since: Watermark returned by a previous call (None for the latest logs)
+            limit: Maximum number of logs to return
+            fields: Only return these fields
+            
+        Returns:
+            Dict: {'items': newest first, 'watermark': int, 'has_more': bool}
+        """
+        try:
+            changes = self._changes_since(self.logs_collection, since, limit, self._log_fields(fields))
+            self._rebuild_messages(changes['items'], fields)
+            return changes
+        except Exception as e:
+            logger.error(f"Failed to retrieve log changes: {e}")
+            return {'items': [], 'watermark': since or 0, 'has_more': False}
 
     def clear_logs(self) -> bool:
         """
@@ -197,8 +559,8 @@ class MongoDBClient:
                 except:
                     metric_data['timestamp'] = datetime.utcnow()
                     
-            result = self.metrics_collection.insert_one(metric_data)
-            return str(result.inserted_id)
+            result = self._insert_sequenced('metrics', self.metrics_collection, [metric_data])
+            return str(result.inserted_ids[0])
         except Exception as e:
             logger.error(f"Failed to store metric: {e}")
             raise
@@ -223,14 +585,16 @@ class MongoDBClient:
                     except:
                         metric['timestamp'] = datetime.utcnow()
                         
-            result = self.metrics_collection.insert_many(metrics_data)
+            result = self._insert_sequenced('metrics', self.metrics_collection, metrics_data)
             return [str(id) for id in result.inserted_ids]
         except Exception as e:
             logger.error(f"Failed to store metrics: {e}")
             raise
 
     def get_metrics(self, limit: int = 1000, metric_type: Optional[str] = None,
-                   start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+                   start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                   fields: Optional[List[str]] = None, after: Optional[str] = None,
+                   before: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Retrieve metrics with optional filtering
         
@@ -239,10 +603,15 @@ class MongoDBClient:
             metric_type: Filter by metric type (cpu, memory, etc.)
             start_time: Filter metrics after this time
             end_time: Filter metrics before this time
+            fields: Only return these fields (plus _id and timestamp)
+            after: Cursor; return the page of metrics newer than it
+            before: Cursor; return the page of metrics older than it
             
         Returns:
-            List[Dict]: List of metric documents
+            List[Dict]: List of metric documents, newest first
         """
+        if after or before:
+            self.decode_cursor(after or before)
         try:
             query = {}
             
@@ -257,18 +626,162 @@ class MongoDBClient:
                     timestamp_query['$lte'] = end_time
                 query['timestamp'] = timestamp_query
             
-            cursor = self.metrics_collection.find(query).sort("timestamp", -1).limit(limit)
-            metrics = list(cursor)
-            
-            # Convert ObjectId to string for JSON serialization
-            for metric in metrics:
-                metric['_id'] = str(metric['_id'])
-                
-            return metrics
+            return self._keyset_find(self.metrics_collection, query, limit, fields, after, before)
         except Exception as e:
             logger.error(f"Failed to retrieve metrics: {e}")
             return []
 
+    def get_metrics_since(self, since: Optional[int] = None, limit: int = 1000,
+                          fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Get metrics stored after an ingest watermark
+        
+        Args:
+            since: Watermark returned by a previous call (None for the latest metrics)
+            limit: Maximum number of metrics to return
+            fields: Only return these fields
+            
+        Returns:
+            Dict: {'items': newest first, 'watermark': int, 'has_more': bool}
+        """
+        try:
+            return self._changes_since(self.metrics_collection, since, limit, fields)
+        except Exception as e:
+            logger.error(f"Failed to retrieve metric changes: {e}")
+            return {'items': [], 'watermark': since or 0, 'has_more': False}
+
+    def iter_metrics(self, metric_type: Optional[str] = None, start_time: Optional[datetime] = None,
+                     end_time: Optional[datetime] = None, fields: Optional[List[str]] = None,
+                     batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream metrics in batches for exports
+        
+        Args:
+            metric_type: Filter by metric type
+            start_time: Filter metrics after this time
+            end_time: Filter metrics before this time
+            fields: Only return these fields (plus _id and timestamp)
+            batch_size: Number of documents per yielded batch
+            
+        Yields:
+            List[Dict]: Raw metric documents, newest first
+        """
+        query = {}
+        if metric_type:
+            query['metric_type'] = metric_type
+        timestamp_query = self._time_range(start_time, end_time)
+        if timestamp_query:
+            query['timestamp'] = timestamp_query
+        return self._iter_batches(self.metrics_collection, query, fields, batch_size)
+
+    def store_metric_rollups(self, updates: List[Dict[str, Any]]) -> int:
+        """
+        Merge rollup bucket updates into the per-resolution collections
+        
+        Args:
+            updates: Bucket updates from MetricsRollup ({resolution, timestamp, fields})
+            
+        Returns:
+            int: Number of bucket updates applied
+        """
+        try:
+            operations = {}
+            for update in updates:
+                increments, minimums, maximums = {}, {}, {}
+                for field, stats in update['fields'].items():
+                    increments[f"{field}.count"] = stats['count']
+                    increments[f"{field}.sum"] = stats['sum']
+                    for bin_index, bin_count in stats['hist'].items():
+                        increments[f"{field}.hist.{bin_index}"] = bin_count
+                    minimums[f"{field}.min"] = stats['min']
+                    maximums[f"{field}.max"] = stats['max']
+                operations.setdefault(update['resolution'], []).append(UpdateOne(
+                    {'timestamp': update['timestamp']},
+                    {'$inc': increments, '$min': minimums, '$max': maximums},
+                    upsert=True
+                ))
+            
+            for resolution, ops in operations.items():
+                self.rollup_collections[resolution].bulk_write(ops, ordered=False)
+            return len(updates)
+        except Exception as e:
+            logger.error(f"Failed to store metric rollups: {e}")
+            raise
+
+    def get_metric_rollups(self, resolution: str, start_time: datetime, end_time: datetime,
+                           limit: int = 10000) -> List[Dict[str, Any]]:
+        """
+        Retrieve rollup buckets of one resolution in a time range
+        
+        Args:
+            resolution: Rollup resolution (10s, 1m, 1h)
+            start_time: First bucket start to include
+            end_time: Last bucket start to include
+            limit: Maximum number of buckets to return
+            
+        Returns:
+            List[Dict]: Rollup documents, oldest first
+        """
+        try:
+            cursor = self.rollup_collections[resolution].find(
+                {'timestamp': {'$gte': start_time, '$lte': end_time}},
+                {'_id': 0}
+            ).sort('timestamp', ASCENDING).limit(limit)
+            return list(cursor)
+        except Exception as e:
+            logger.error(f"Failed to retrieve {resolution} metric rollups: {e}")
+            return []
+
+    def store_anomalies(self, anomalies: List[Dict[str, Any]]) -> int:
+        """
+        Store detected metric anomalies
+        
+        Args:
+            anomalies: Anomaly documents from AnomalyDetector
+            
+        Returns:
+            int: Number of anomalies stored
+        """
+        try:
+            if not anomalies:
+                return 0
+            result = self.anomalies_collection.insert_many(anomalies, ordered=False)
+            return len(result.inserted_ids)
+        except Exception as e:
+            logger.error(f"Failed to store anomalies: {e}")
+            raise
+
+    def get_anomalies(self, limit: int = 100, field: Optional[str] = None, host: Optional[str] = None,
+                      start_time: Optional[datetime] = None,
+                      end_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve detected metric anomalies
+        
+        Args:
+            limit: Maximum number of anomalies to return
+            field: Filter by metric field
+            host: Filter by host
+            start_time: Filter anomalies after this time
+            end_time: Filter anomalies before this time
+            
+        Returns:
+            List[Dict]: Anomalies, newest first
+        """
+        try:
+            query = {}
+            if field:
+                query['field'] = field
+            if host:
+                query['host'] = host
+            timestamp_query = self._time_range(start_time, end_time)
+            if timestamp_query:
+                query['timestamp'] = timestamp_query
+            cursor = self.anomalies_collection.find(query, {'_id': 0}).sort('timestamp', DESCENDING).limit(limit)
+            return list(cursor)
+        except Exception as e:
+            logger.error(f"Failed to retrieve anomalies: {e}")
+            return []
+
     def clear_metrics(self) -> bool:
         """
         Clear all metrics from the collection
@@ -283,6 +796,100 @@ class MongoDBClient:
             logger.error(f"Failed to clear metrics: {e}")
             return False
 
+    # =============== LOG TEMPLATES ===============
+
+    def store_log_templates(self, templates: List[Dict[str, Any]]) -> int:
+        """
+        Upsert mined log templates by template_id
+        
+        Args:
+            templates: Template documents from TemplateMiner.drain()
+            
+        Returns:
+            int: Number of templates written
+        """
+        try:
+            if not templates:
+                return 0
+            operations = []
+            for template in templates:
+                update = {'$set': {key: value for key, value in template.items() if key != 'first_seen'}}
+                if template.get('first_seen') is not None:
+                    # Keep the earliest first_seen across restarts and late logs
+                    update['$min'] = {'first_seen': template['first_seen']}
+                operations.append(UpdateOne({'template_id': template['template_id']}, update, upsert=True))
+            self.log_templates_collection.bulk_write(operations, ordered=False)
+            for template in templates:
+                self._template_versions[template['template_id']] = list(
+                    template.get('versions') or [template['template']])
+            return len(templates)
+        except Exception as e:
+            logger.error(f"Failed to store log templates: {e}")
+            raise
+
+    def store_template_counts(self, counts: List[Dict[str, Any]]) -> int:
+        """
+        Add per-minute template counts ({template_id, timestamp, count})
+        
+        Returns:
+            int: Number of count increments applied
+        """
+        try:
+            if not counts:
+                return 0
+            self.template_counts_collection.bulk_write([
+                UpdateOne({'template_id': count['template_id'], 'timestamp': count['timestamp']},
+                          {'$inc': {'count': count['count']}}, upsert=True)
+                for count in counts
+            ], ordered=False)
+            return len(counts)
+        except Exception as e:
+            logger.error(f"Failed to store template counts: {e}")
+            raise
+
+    def get_log_templates(self) -> List[Dict[str, Any]]:
+        """
+        All persisted log templates (loaded into the miner at startup)
+        
+        Raises instead of returning an empty list: a miner started without
+        the persisted templates would hand out their ids again.
+        """
+        try:
+            templates = list(self.log_templates_collection.find({}, {'_id': 0}))
+        except Exception as e:
+            logger.error(f"Failed to retrieve log templates: {e}")
+            raise
+        for template in templates:
+            self._template_versions[template['template_id']] = \
+                template.get('versions') or [template.get('template', '')]
+        self.templates_loaded = True
+        return templates
+
+    def get_template_counts(self, start_time: datetime, end_time: datetime, template_id: Optional[int] = None,
+                            limit: int = 10000) -> List[Dict[str, Any]]:
+        """
+        Per-minute message counts of log templates in a time range
+        
+        Args:
+            start_time: First minute to include
+            end_time: Last minute to include
+            template_id: Only this template (default all)
+            limit: Maximum number of documents to return
+            
+        Returns:
+            List[Dict]: {template_id, timestamp, count}, oldest first
+        """
+        try:
+            query = {'timestamp': {'$gte': start_time, '$lte': end_time}}
+            if template_id is not None:
+                query['template_id'] = template_id
+            cursor = self.template_counts_collection.find(query, {'_id': 0}).sort(
+                [('timestamp', ASCENDING), ('template_id', ASCENDING)]).limit(limit)
+            return list(cursor)
+        except Exception as e:
+            logger.error(f"Failed to retrieve template counts: {e}")
+            return []
+
     # =============== COMMITS OPERATIONS ===============
     
     def store_commit(self, commit_data: Dict[str, Any]) -> str:
@@ -293,32 +900,67 @@ class MongoDBClient:
             commit_data: Dictionary containing commit information
             
         Returns:
-            str: ID of the inserted document
+            str: ID of the inserted document (empty if the commit was already stored)
         """
-        try:
-            if 'timestamp' not in commit_data:
-                commit_data['timestamp'] = datetime.utcnow()
-            elif isinstance(commit_data['timestamp'], str):
-                try:
-                    commit_data['timestamp'] = datetime.fromisoformat(commit_data['timestamp'].replace('Z', '+00:00'))
-                except:
-                    commit_data['timestamp'] = datetime.utcnow()
-                    
-            result = self.commits_collection.insert_one(commit_data)
-            return str(result.inserted_id)
-        except Exception as e:
-            logger.error(f"Failed to store commit: {e}")
-            raise
+        ids = self.store_commits([commit_data])
+        return ids[0] if ids else ""
+
+    def _store_commit_blobs(self, commits_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Move file diffs into the content-addressed blob collection
+        
+        Each file's diff is replaced by the SHA-256 of its content
+        (diff_blob); a blob is written only the first time that content is
+        seen, so identical diffs (cherry-picks, re-applied patches, the same
+        commit in several repositories) are stored once.
+        
+        Returns:
+            List[Dict]: Copies of the commits referencing their blobs (the input is left intact)
+        """
+        blobs = {}
+        documents = []
+        for commit in commits_data:
+            files = []
+            for file in commit.get('files', []):
+                file = dict(file)
+                diff = file.pop('diff', None)
+                if diff is not None:
+                    digest = hashlib.sha256(diff.encode('utf-8', 'surrogatepass')).hexdigest()
+                    file['diff_blob'] = digest
+                    blobs[digest] = diff
+                files.append(file)
+            documents.append({**commit, 'files': files} if 'files' in commit else commit)
+        
+        if blobs:
+            self.commit_blobs_collection.bulk_write([
+                UpdateOne({'_id': digest}, {'$setOnInsert': {'content': diff, 'size': len(diff)}}, upsert=True)
+                for digest, diff in blobs.items()
+            ], ordered=False)
+        return documents
+
+    def _resolve_diffs(self, commits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace each file's diff_blob with its diff (one blob query for all commits)"""
+        files = [file for commit in commits for file in commit.get('files', []) or []
+                 if isinstance(file, dict) and 'diff_blob' in file]
+        if files:
+            blobs = self.get_commit_blobs([file['diff_blob'] for file in files])
+            for file in files:
+                file['diff'] = blobs.get(file.pop('diff_blob'))
+        return commits
 
     def store_commits(self, commits_data: List[Dict[str, Any]]) -> List[str]:
         """
-        Store multiple commit entries
+        Store multiple commit entries, skipping commits that are already stored
+        
+        Commits are upserted on their hash and file diffs are stored
+        once in commit_blobs, so re-fetching a repository does not grow
+        the database.
         
         Args:
             commits_data: List of dictionaries containing commit information
             
         Returns:
-            List[str]: List of IDs of the inserted documents
+            List[str]: List of IDs of the newly inserted documents
         """
         try:
             for commit in commits_data:
@@ -329,42 +971,100 @@ class MongoDBClient:
                         commit['timestamp'] = datetime.fromisoformat(commit['timestamp'].replace('Z', '+00:00'))
                     except:
                         commit['timestamp'] = datetime.utcnow()
-                        
-            result = self.commits_collection.insert_many(commits_data)
-            return [str(id) for id in result.inserted_ids]
+            
+            commits_data = self._store_commit_blobs(commits_data)
+            
+            operations = [
+                UpdateOne({'hash': commit['hash']},
+                          {'$setOnInsert': {key: value for key, value in commit.items() if key != 'hash'}},
+                          upsert=True)
+                for commit in commits_data if commit.get('hash')
+            ]
+            unhashed = [commit for commit in commits_data if not commit.get('hash')]
+            
+            ids = []
+            if operations:
+                result = self.commits_collection.bulk_write(operations, ordered=False)
+                ids.extend(str(id) for id in result.upserted_ids.values())
+            if unhashed:
+                result = self.commits_collection.insert_many(unhashed)
+                ids.extend(str(id) for id in result.inserted_ids)
+            return ids
         except Exception as e:
             logger.error(f"Failed to store commits: {e}")
             raise
 
-    def get_commits(self, limit: int = 100, repo_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_commit_blobs(self, digests: List[str]) -> Dict[str, str]:
+        """
+        Resolve blob digests to their content
+        
+        Returns:
+            Dict: Digest -> diff
+        """
+        cursor = self.commit_blobs_collection.find({'_id': {'$in': list(set(digests))}})
+        return {blob['_id']: blob.get('content') for blob in cursor}
+
+    def get_sync_checkpoint(self, repo_name: str) -> Optional[str]:
+        """Hash of the newest commit already synced for a repository"""
+        checkpoint = self.sync_checkpoints_collection.find_one({'_id': repo_name})
+        return checkpoint['last_hash'] if checkpoint else None
+
+    def set_sync_checkpoint(self, repo_name: str, last_hash: str):
+        """Record the newest commit synced for a repository"""
+        self.sync_checkpoints_collection.update_one(
+            {'_id': repo_name},
+            {'$set': {'last_hash': last_hash, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    def get_commits(self, limit: int = 100, repo_name: Optional[str] = None,
+                    fields: Optional[List[str]] = None, after: Optional[str] = None,
+                    before: Optional[str] = None, include_diff: bool = True) -> List[Dict[str, Any]]:
         """
         Retrieve commits with optional filtering
         
         Args:
             limit: Maximum number of commits to return
             repo_name: Filter by repository name
+            fields: Only return these fields (plus _id and timestamp)
+            after: Cursor; return the page of commits newer than it
+            before: Cursor; return the page of commits older than it
+            include_diff: Resolve each file's diff_blob back into its `diff`
             
         Returns:
-            List[Dict]: List of commit documents
+            List[Dict]: List of commit documents, newest first
         """
+        if after or before:
+            self.decode_cursor(after or before)
         try:
             query = {}
             
             if repo_name:
                 query['repo_name'] = repo_name
             
-            cursor = self.commits_collection.find(query).sort("timestamp", -1).limit(limit)
-            commits = list(cursor)
-            
-            # Convert ObjectId to string for JSON serialization
-            for commit in commits:
-                commit['_id'] = str(commit['_id'])
-                
-            return commits
+            commits = self._keyset_find(self.commits_collection, query, limit, fields, after, before)
+            return self._resolve_diffs(commits) if include_diff else commits
         except Exception as e:
             logger.error(f"Failed to retrieve commits: {e}")
             return []
 
+    def iter_commits(self, repo_name: Optional[str] = None, fields: Optional[List[str]] = None,
+                     batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream commits in batches for exports
+        
+        Args:
+            repo_name: Filter by repository name
+            fields: Only return these fields (plus _id and timestamp)
+            batch_size: Number of documents per yielded batch
+            
+        Yields:
+            List[Dict]: Raw commit documents with their diffs resolved, newest first
+        """
+        query = {'repo_name': repo_name} if repo_name else {}
+        return (self._resolve_diffs(batch)
+                for batch in self._iter_batches(self.commits_collection, query, fields, batch_size))
+
     def clear_commits(self) -> bool:
         """
         Clear all commits from the collection
@@ -398,6 +1098,288 @@ class MongoDBClient:
             logger.error(f"Failed to get collection stats: {e}")
             return {'logs': 0, 'metrics': 0, 'commits': 0}
 
+    def check_index_usage(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Explain the queries issued by the get_* methods and report index usage
+        
+        A query is flagged when its winning plan scans the whole collection
+        (COLLSCAN) or sorts in memory (SORT stage).
+        
+        Returns:
+            Dict: Query name -> {'indexed': bool, 'stages': [...], 'indexes': [...]}
+        """
+        queries = {
+            'logs_by_time': (self.logs_collection, {}),
+            'logs_by_level': (self.logs_collection, {'level': {'$in': ['ERROR', 'WARNING']}}),
+            'metrics_by_time': (self.metrics_collection, {}),
+            'metrics_by_type': (self.metrics_collection, {'metric_type': 'system'}),
+            'commits_by_time': (self.commits_collection, {}),
+            'commits_by_repo': (self.commits_collection, {'repo_name': 'unknown'}),
+        }
+        
+        report = {}
+        for name, (collection, query) in queries.items():
+            try:
+                plan = collection.find(query).sort(self.KEYSET_SORT).limit(1).explain()
+                stages, indexes = [], []
+                self._collect_plan_stages(plan.get('queryPlanner', {}).get('winningPlan', {}), stages, indexes)
+                indexed = 'COLLSCAN' not in stages and 'SORT' not in stages
+                report[name] = {'indexed': indexed, 'stages': stages, 'indexes': indexes}
+                if not indexed:
+                    logger.warning(f"Query '{name}' is not index-covered: {stages}")
+            except Exception as e:
+                logger.error(f"Failed to explain query '{name}': {e}")
+                report[name] = {'indexed': False, 'stages': [], 'indexes': [], 'error': str(e)}
+        return report
+
+    @classmethod
+    def _collect_plan_stages(cls, plan: Dict[str, Any], stages: List[str], indexes: List[str]):
+        """Walk an explain() plan tree collecting stage and index names"""
+        if not plan:
+            return
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        if 'indexName' in plan:
+            indexes.append(plan['indexName'])
+        # Newer servers wrap the classic plan in queryPlan
+        cls._collect_plan_stages(plan.get('queryPlan', {}), stages, indexes)
+        cls._collect_plan_stages(plan.get('inputStage', {}), stages, indexes)
+        for child in plan.get('inputStages', []):
+            cls._collect_plan_stages(child, stages, indexes)
+
+    def get_storage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get storage usage of the logs, metrics and commits collections
+        
+        Returns:
+            Dict: Collection name -> document count, data/storage/index sizes in bytes
+                  and the TTL (seconds) on timestamp, if any
+        """
+        usage = {}
+        for name in ('logs', 'metrics', 'commits'):
+            try:
+                stats = self.db.command('collStats', name)
+                usage[name] = {
+                    'count': stats.get('count', 0),
+                    'size_bytes': stats.get('size', 0),
+                    'storage_bytes': stats.get('storageSize', 0),
+                    'index_bytes': stats.get('totalIndexSize', 0),
+                    'avg_doc_bytes': stats.get('avgObjSize', 0),
+                    'ttl_seconds': self._timestamp_ttl(self.db[name]),
+                }
+            except Exception as e:
+                logger.error(f"Failed to get storage stats for {name}: {e}")
+                usage[name] = {'count': 0, 'size_bytes': 0, 'storage_bytes': 0,
+                               'index_bytes': 0, 'avg_doc_bytes': 0, 'ttl_seconds': None}
+        return usage
+
+    # =============== ARCHIVE ===============
+
+    def attach_archive(self, archive):
+        """Register the archive that holds documents moved out of MongoDB"""
+        self.archive = archive
+
+    def get_documents_before(self, name: str, cutoff: datetime, limit: int = 10000) -> List[Dict[str, Any]]:
+        """
+        Get the oldest raw documents of a collection with a timestamp before cutoff
+        
+        Args:
+            name: Collection name
+            cutoff: Exclusive upper bound on timestamp
+            limit: Maximum number of documents to return
+            
+        Returns:
+            List[Dict]: Raw documents (ObjectId _id), oldest first
+        """
+        cursor = self.db[name].find({'timestamp': {'$lt': cutoff}}).sort('timestamp', ASCENDING).limit(limit)
+        documents = list(cursor)
+        return self._rebuild_messages(documents) if name == 'logs' else documents
+
+    def delete_documents(self, name: str, ids: List[Any]) -> int:
+        """
+        Delete documents of a collection by _id
+        
+        Returns:
+            int: Number of documents deleted
+        """
+        if not ids:
+            return 0
+        return self.db[name].delete_many({'_id': {'$in': ids}}).deleted_count
+
+    def search_logs(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                    levels: Optional[List[str]] = None, status_codes: Optional[List[int]] = None,
+                    endpoints: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                    limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Search logs across MongoDB and the Parquet archive
+        
+        MongoDB holds the newest logs, so the archive is only read when
+        MongoDB cannot fill the limit.
+        
+        Args:
+            start_time: Only logs at or after this time
+            end_time: Only logs at or before this time
+            levels: Only these levels
+            status_codes: Only these status codes
+            endpoints: Only these endpoints
+            fields: Only return these fields (plus _id and timestamp)
+            limit: Maximum number of logs to return
+            
+        Returns:
+            List[Dict]: Logs, newest first
+        """
+        query = {}
+        if levels:
+            query['level'] = {'$in': levels}
+        if status_codes:
+            query['status_code'] = {'$in': status_codes}
+        if endpoints:
+            query['endpoint'] = {'$in': endpoints}
+        timestamp_query = self._time_range(start_time, end_time)
+        if timestamp_query:
+            query['timestamp'] = timestamp_query
+        
+        try:
+            logs = self._rebuild_messages(
+                self._keyset_find(self.logs_collection, query, limit, self._log_fields(fields)), fields)
+        except Exception as e:
+            logger.error(f"Failed to search logs: {e}")
+            logs = []
+        
+        if self.archive is not None and len(logs) < limit:
+            # Archived logs are older than everything still in MongoDB
+            if logs:
+                oldest = logs[-1]['timestamp']
+                end_time = min(end_time, oldest) if end_time else oldest
+            archived = self.archive.query_logs(start_time=start_time, end_time=end_time, levels=levels,
+                                               status_codes=status_codes, endpoints=endpoints,
+                                               fields=fields, limit=limit - len(logs))
+            seen = {log['_id'] for log in logs}
+            logs.extend(log for log in archived if log['_id'] not in seen)
+        return logs
+
+    def search_metrics(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                       metric_type: Optional[str] = None, fields: Optional[List[str]] = None,
+                       limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Search metrics across MongoDB and the Parquet archive
+        
+        Returns:
+            List[Dict]: Metrics, newest first
+        """
+        metrics = self.get_metrics(limit=limit, metric_type=metric_type, start_time=start_time,
+                                   end_time=end_time, fields=fields)
+        
+        if self.archive is not None and len(metrics) < limit:
+            if metrics:
+                oldest = metrics[-1]['timestamp']
+                end_time = min(end_time, oldest) if end_time else oldest
+            archived = self.archive.query_metrics(start_time=start_time, end_time=end_time,
+                                                  metric_type=metric_type, fields=fields,
+                                                  limit=limit - len(metrics))
+            seen = {metric['_id'] for metric in metrics}
+            metrics.extend(metric for metric in archived if metric['_id'] not in seen)
+        return metrics
+
+    # =============== RETENTION ===============
+
+    @staticmethod
+    def _timestamp_ttl(collection) -> Optional[int]:
+        """expireAfterSeconds of the single-field timestamp index, if set"""
+        index = collection.index_information().get('timestamp_1', {})
+        return index.get('expireAfterSeconds')
+
+    def set_retention(self, name: str, seconds: Optional[int]) -> bool:
+        """
+        Expire documents of a collection `seconds` after their timestamp
+        
+        Converts the existing timestamp index into a TTL index (or back
+        to a plain index when seconds is None).
+        
+        Args:
+            name: Collection name (logs, metrics, commits)
+            seconds: Retention in seconds, None to keep documents forever
+            
+        Returns:
+            bool: True if the index now matches the requested retention
+        """
+        collection = self.db[name]
+        try:
+            current = self._timestamp_ttl(collection)
+            if current == seconds:
+                return True
+            
+            if seconds is not None:
+                try:
+                    # Cheap in-place change; converting a plain index needs MongoDB 5.1+
+                    self.db.command('collMod', name, index={
+                        'keyPattern': {'timestamp': 1},
+                        'expireAfterSeconds': seconds
+                    })
+                    logger.info(f"Set {name} retention to {seconds}s")
+                    return True
+                except Exception as e:
+                    logger.info(f"collMod TTL on {name} failed ({e}), rebuilding index")
+            
+            collection.drop_index('timestamp_1')
+            if seconds is None:
+                collection.create_index('timestamp')
+            else:
+                collection.create_index('timestamp', expireAfterSeconds=seconds)
+            logger.info(f"Set {name} retention to {seconds}s")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to set retention on {name}: {e}")
+            return False
+
+    def prune_to_budget(self, name: str, max_bytes: int, batch_size: int = 1000) -> int:
+        """
+        Remove the oldest documents until a collection's data size fits a budget
+        
+        With an archive attached, collections it holds are moved to it up to
+        the timestamp of the last excess document instead of being deleted;
+        if archiving fails nothing is removed.
+        
+        Args:
+            name: Collection name
+            max_bytes: Budget for the collection's data size
+            batch_size: Documents deleted per round trip
+            
+        Returns:
+            int: Number of documents removed (archived or deleted)
+        """
+        collection = self.db[name]
+        try:
+            stats = self.db.command('collStats', name)
+            size, avg_size = stats.get('size', 0), stats.get('avgObjSize', 0)
+            if size <= max_bytes or not avg_size:
+                return 0
+            
+            excess = -(-(size - max_bytes) // avg_size)
+            if self.archive is not None and self.archive.handles(name):
+                last = list(collection.find({}, {'timestamp': 1}).sort('timestamp', ASCENDING)
+                            .skip(excess - 1).limit(1))
+                if last and isinstance(last[0].get('timestamp'), datetime):
+                    # BSON dates have millisecond precision: include the last excess document
+                    cutoff = last[0]['timestamp'] + timedelta(milliseconds=1)
+                    archived = self.archive.archive_collection(name, cutoff)
+                    logger.info(f"Archived {archived} documents from {name} to fit {max_bytes} bytes")
+                    return archived
+            
+            deleted = 0
+            while deleted < excess:
+                oldest = collection.find({}, {'_id': 1}).sort('timestamp', ASCENDING).limit(min(batch_size, excess - deleted))
+                ids = [document['_id'] for document in oldest]
+                if not ids:
+                    break
+                deleted += collection.delete_many({'_id': {'$in': ids}}).deleted_count
+            
+            logger.info(f"Pruned {deleted} documents from {name} to fit {max_bytes} bytes")
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to prune {name}: {e}")
+            return 0
+
     def close_connection(self):
         """Close the MongoDB connection"""
         try:
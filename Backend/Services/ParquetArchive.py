@@ -0,0 +1,303 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from .MongoClient import MongoDBClient
+
+# Column layout of archived documents; fields outside the schema, and values a column
+# cannot hold, are kept as JSON in `extra`
+LOG_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("user", pa.string()),
+    ("ip", pa.string()),
+    ("method", pa.string()),
+    ("endpoint", pa.string()),
+    ("status_code", pa.int32()),
+    ("request_id", pa.string()),
+    ("latency_ms", pa.float64()),
+    ("cpu_spike", pa.bool_()),
+    ("message", pa.string()),
+    ("extra", pa.string()),
+])
+
+METRIC_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("metric_type", pa.string()),
+    ("cpu_percent", pa.float64()),
+    ("memory_percent", pa.float64()),
+    ("memory_used_mb", pa.float64()),
+    ("memory_total_mb", pa.float64()),
+    ("extra", pa.string()),
+])
+
+# Directory partitions (hive style: day=YYYY-MM-DD/level=ERROR)
+PARTITIONS = {
+    "logs": pa.schema([("day", pa.string()), ("level", pa.string())]),
+    "metrics": pa.schema([("day", pa.string())]),
+}
+
+SCHEMAS = {"logs": LOG_SCHEMA, "metrics": METRIC_SCHEMA}
+
+# Fields that are never archived
+SKIPPED_FIELDS = {"_seq"}
+
+
+def _fits(value: Any, arrow_type: pa.DataType) -> bool:
+    """True if a value converts to a column type without loss (otherwise it goes to `extra`)"""
+    if pa.types.is_string(arrow_type):
+        return isinstance(value, str)
+    if pa.types.is_boolean(arrow_type):
+        return isinstance(value, bool)
+    if isinstance(value, bool):
+        return False
+    if pa.types.is_integer(arrow_type):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        bits = arrow_type.bit_width - 1
+        return isinstance(value, int) and -2 ** bits <= value < 2 ** bits
+    if pa.types.is_floating(arrow_type):
+        return isinstance(value, (int, float))
+    if pa.types.is_timestamp(arrow_type):
+        return isinstance(value, datetime)
+    return False
+
+
+class ParquetArchive:
+    def __init__(self, mongo_client=None, root=None, archive_after_days=1, batch_size=50000,
+                 row_group_size=64 * 1024, interval=3600):
+        """
+        Move aged logs and metrics from MongoDB into partitioned Parquet files
+
+        Files are partitioned by day (and level for logs) and sorted by
+        timestamp, so queries prune whole directories on day/level and
+        skip row groups using the timestamp/status_code/endpoint statistics.
+
+        Args:
+            mongo_client: MongoDBClient owning the collections
+            root: Archive directory (defaults to data/archive in the project root)
+            archive_after_days: Documents older than this are moved to the archive
+            batch_size: Documents moved per MongoDB round trip
+            row_group_size: Rows per Parquet row group
+            interval: Seconds between archival runs
+        """
+        self.mongo_client = mongo_client or MongoDBClient()
+        if root is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            root = os.path.join(project_root, "data", "archive")
+        self.root = root
+        self.archive_after = timedelta(days=archive_after_days)
+        self.batch_size = batch_size
+        self.row_group_size = row_group_size
+        self.interval = interval
+        self.task = None
+        # Archive runs and budget pruning may move the same documents; one at a time
+        self._lock = threading.Lock()
+
+    # =============== ARCHIVAL ===============
+
+    @staticmethod
+    def handles(name: str) -> bool:
+        """True if documents of this collection can be archived"""
+        return name in SCHEMAS
+
+    def _to_table(self, name: str, documents: List[Dict[str, Any]]) -> pa.Table:
+        schema = SCHEMAS[name]
+        types = {field: schema.field(field).type for field in schema.names if field not in ("_id", "extra")}
+        columns = {field: [] for field in schema.names}
+        partition_columns = {field: [] for field in PARTITIONS[name].names}
+        known = set(schema.names) | set(partition_columns)
+
+        for document in documents:
+            timestamp = document["timestamp"]
+            partition_columns["day"].append(timestamp.strftime("%Y-%m-%d"))
+            if "level" in partition_columns:
+                partition_columns["level"].append(document.get("level") or "UNKNOWN")
+            columns["_id"].append(str(document["_id"]))
+            extra = {key: value for key, value in document.items()
+                     if key not in known and key not in SKIPPED_FIELDS}
+            for field, arrow_type in types.items():
+                value = document.get(field)
+                if value is not None and not _fits(value, arrow_type):
+                    # Keep values the column cannot hold (e.g. status_code "-") in extra
+                    extra[field] = value
+                    value = None
+                columns[field].append(value)
+            columns["extra"].append(json.dumps(extra, default=str) if extra else None)
+
+        arrays = {field: pa.array(columns[field], type=schema.field(field).type) for field in schema.names}
+        for field, values in partition_columns.items():
+            arrays[field] = pa.array(values, type=pa.string())
+        table = pa.table(arrays)
+        return table.sort_by([("timestamp", "ascending")])
+
+    def _write(self, name: str, table: pa.Table):
+        ds.write_dataset(
+            table,
+            os.path.join(self.root, name),
+            format="parquet",
+            partitioning=ds.partitioning(PARTITIONS[name], flavor="hive"),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, 1024),
+        )
+
+    def archive_collection(self, name: str, cutoff: datetime) -> int:
+        """
+        Move documents of a collection older than cutoff into the archive
+
+        Each batch is written to Parquet before it is deleted from MongoDB,
+        so a crash can at worst duplicate a batch, never lose it.
+
+        Returns:
+            int: Number of documents archived
+        """
+        archived = 0
+        with self._lock:
+            while True:
+                documents = self.mongo_client.get_documents_before(name, cutoff, limit=self.batch_size)
+                documents = [document for document in documents if isinstance(document.get("timestamp"), datetime)]
+                if not documents:
+                    break
+                self._write(name, self._to_table(name, documents))
+                self.mongo_client.delete_documents(name, [document["_id"] for document in documents])
+                archived += len(documents)
+                if len(documents) < self.batch_size:
+                    break
+        return archived
+
+    def archive_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive every aged log and metric"""
+        cutoff = (now or datetime.utcnow()) - self.archive_after
+        return {name: self.archive_collection(name, cutoff) for name in SCHEMAS}
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._archive_loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _archive_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                archived = await loop.run_in_executor(None, self.archive_once)
+                if any(archived.values()):
+                    print(f"Archived to Parquet: {archived}")
+            except Exception as e:
+                print(f"Error archiving to Parquet: {e}")
+            await asyncio.sleep(self.interval)
+
+    # =============== QUERIES ===============
+
+    def _dataset(self, name: str) -> Optional[ds.Dataset]:
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format="parquet", schema=pa.unify_schemas([SCHEMAS[name], PARTITIONS[name]]),
+                          partitioning=ds.partitioning(PARTITIONS[name], flavor="hive"))
+
+    def _query(self, name: str, conditions: List[pc.Expression], columns: Optional[List[str]],
+               limit: Optional[int]) -> List[Dict[str, Any]]:
+        dataset = self._dataset(name)
+        if dataset is None:
+            return []
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        selected = None
+        if columns:
+            available = set(dataset.schema.names)
+            columns = list(dict.fromkeys(list(columns) + ["_id", "timestamp"]))
+            selected = [column for column in columns if column in available]
+            if len(selected) < len(columns):
+                # Requested fields outside the schema live in the JSON extra column
+                selected.append("extra")
+        table = dataset.to_table(columns=selected, filter=expression)
+        table = table.sort_by([("timestamp", "descending")])
+        if limit is not None:
+            table = table.slice(0, limit)
+
+        rows = []
+        for row in table.to_pylist():
+            extra = row.pop("extra", None)
+            row.pop("day", None)
+            # Match MongoDB documents: absent fields are omitted, not null
+            row = {key: value for key, value in row.items() if value is not None}
+            if extra:
+                row.update(json.loads(extra))
+            rows.append(row)
+        if columns:
+            rows = [{key: row[key] for key in columns if key in row} for row in rows]
+        return rows
+
+    @staticmethod
+    def _time_conditions(start_time: Optional[datetime], end_time: Optional[datetime]) -> List[pc.Expression]:
+        conditions = []
+        if start_time:
+            # Day partitions are pruned by path, timestamps by row group statistics
+            conditions.append(pc.field("day") >= start_time.strftime("%Y-%m-%d"))
+            conditions.append(pc.field("timestamp") >= pa.scalar(start_time, type=pa.timestamp("us")))
+        if end_time:
+            conditions.append(pc.field("day") <= end_time.strftime("%Y-%m-%d"))
+            conditions.append(pc.field("timestamp") <= pa.scalar(end_time, type=pa.timestamp("us")))
+        return conditions
+
+    def query_logs(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                   levels: Optional[List[str]] = None, status_codes: Optional[List[int]] = None,
+                   endpoints: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                   limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        """
+        Read archived logs, scanning only the needed partitions and columns
+
+        Args:
+            start_time: Only logs at or after this time
+            end_time: Only logs at or before this time
+            levels: Only these levels (prunes level partitions)
+            status_codes: Only these status codes
+            endpoints: Only these endpoints
+            fields: Columns to read (plus _id and timestamp); None reads all
+            limit: Maximum number of logs to return
+
+        Returns:
+            List[Dict]: Archived logs, newest first
+        """
+        conditions = self._time_conditions(start_time, end_time)
+        if levels:
+            conditions.append(pc.field("level").isin(levels))
+        if status_codes:
+            conditions.append(pc.field("status_code").isin(status_codes))
+        if endpoints:
+            conditions.append(pc.field("endpoint").isin(endpoints))
+        return self._query("logs", conditions, fields, limit)
+
+    def query_metrics(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                      metric_type: Optional[str] = None, fields: Optional[List[str]] = None,
+                      limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        """
+        Read archived metrics, scanning only the needed partitions and columns
+
+        Returns:
+            List[Dict]: Archived metrics, newest first
+        """
+        conditions = self._time_conditions(start_time, end_time)
+        if metric_type:
+            conditions.append(pc.field("metric_type") == metric_type)
+        return self._query("metrics", conditions, fields, limit)
@@ -0,0 +1,64 @@
+import asyncio
+from .MongoClient import MongoDBClient
+
+class RetentionPruner:
+    def __init__(self, mongo_client=None, retention=None, budgets=None, interval=300):
+        """
+        Enforce per-collection retention and storage budgets
+
+        Args:
+            mongo_client: MongoDBClient owning the collections
+            retention: Collection name -> seconds to keep documents (None = forever),
+                       applied as TTL indexes on timestamp
+            budgets: Collection name -> maximum data size in bytes, enforced by
+                     archiving (when an archive is attached) or deleting the
+                     oldest documents from a background task
+            interval: Seconds between budget checks
+        """
+        self.mongo_client = mongo_client or MongoDBClient()
+        self.retention = retention or {}
+        self.budgets = {name: limit for name, limit in (budgets or {}).items() if limit}
+        self.interval = interval
+        self.task = None
+
+    def apply_retention(self):
+        """Create or update the TTL indexes for the configured retention"""
+        for name, seconds in self.retention.items():
+            self.mongo_client.set_retention(name, seconds)
+
+    def prune_once(self):
+        """Bring every budgeted collection back under its budget"""
+        deleted = {}
+        for name, max_bytes in self.budgets.items():
+            deleted[name] = self.mongo_client.prune_to_budget(name, max_bytes)
+        return deleted
+
+    async def start(self):
+        """Apply retention and start the periodic budget pruner"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.apply_retention)
+        if self.budgets and self.task is None:
+            self.task = asyncio.create_task(self._prune_loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def get_config(self):
+        return {"retention_seconds": dict(self.retention), "budget_bytes": dict(self.budgets)}
+
+    async def _prune_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                deleted = await loop.run_in_executor(None, self.prune_once)
+                if any(deleted.values()):
+                    print(f"Storage budget pruning removed: {deleted}")
+            except Exception as e:
+                print(f"Error pruning collections: {e}")
+            await asyncio.sleep(self.interval)
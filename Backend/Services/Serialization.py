@@ -0,0 +1,42 @@
+from datetime import datetime, date
+from typing import Any, Dict, Iterable
+import json
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode the BSON/Python types the JSON encoders do not handle natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(document: Dict[str, Any]) -> bytes:
+    """
+    Serialize a MongoDB document to compact JSON bytes
+
+    ObjectId values become strings and datetimes ISO 8601 strings, so raw
+    cursor documents can be encoded without a conversion pass.
+    """
+    if orjson is not None:
+        return orjson.dumps(document, default=_default)
+    return json.dumps(document, default=_default, separators=(',', ':')).encode()
+
+
+def encode_ndjson(documents: Iterable[Dict[str, Any]]) -> bytes:
+    """Serialize documents as newline-delimited JSON, one document per line"""
+    return b''.join(dumps(document) + b'\n' for document in documents)
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,307 @@
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from .MetricsRollup import to_utc_datetime
+
+WILDCARD = "<*>"
+
+# Tokens that are always parameters: numbers, versions/IPs (optionally with a port), hex, UUIDs
+PARAM_TOKEN = re.compile(
+    r"^(?:[-+]?\d+(?:[.:]\d+)*%?|0x[0-9a-fA-F]+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$"
+)
+
+# Distinct messages remembered with their template before the cache is reset
+MESSAGE_CACHE_SIZE = 50000
+
+
+def _has_digit(token: str) -> bool:
+    return any(char.isdigit() for char in token)
+
+
+def render_template(template: str, params: List[str]) -> Optional[str]:
+    """Rebuild a message from a template version and its parameters (None if they do not fit)"""
+    tokens = template.split(" ") if template else []
+    if sum(token == WILDCARD for token in tokens) != len(params):
+        return None
+    values = iter(params)
+    return " ".join(next(values) if token == WILDCARD else token for token in tokens)
+
+
+class _Cluster:
+    __slots__ = ("template_id", "tokens", "versions", "count", "first_seen", "last_seen")
+
+    def __init__(self, template_id: int, tokens: List[str], first_seen: Optional[datetime] = None):
+        self.template_id = template_id
+        self.tokens = tokens
+        # Every template text this cluster had; stored logs refer to one by index
+        self.versions = [" ".join(tokens)]
+        self.count = 0
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def params(self, tokens: List[str]) -> List[str]:
+        return [token for template_token, token in zip(self.tokens, tokens) if template_token == WILDCARD]
+
+
+class TemplateMiner:
+    def __init__(self, depth: int = 1, similarity: float = 0.4, max_children: int = 100,
+                 flush_interval: float = 5.0):
+        """
+        Online log template mining (Drain)
+
+        Messages are split on whitespace and routed through a fixed-depth
+        parse tree: first by token count, then by their first `depth`
+        tokens (tokens containing digits, and prefixes beyond max_children
+        per node, share a wildcard branch). The leaf holds the candidate
+        templates; the message joins the most similar one (share of equal
+        tokens at least `similarity`), turning the differing positions into
+        <*>, or starts a new template. Routing never looks at more than
+        `depth` tokens, so the cost of a message does not grow with the
+        number of templates outside its leaf; repeated messages are served
+        from a cache.
+
+        Template ids are stable: a template keeps its id when it is
+        generalized, and load() restores persisted templates at startup.
+        Generalizing appends a new template version, so a log stamped with
+        template_version can be rebuilt later from that version and its
+        template_params (see render_template).
+
+        Args:
+            depth: Leading tokens used to route a message to its leaf
+            similarity: Minimum share of matching tokens to join a template
+            max_children: Prefix branches per tree node before overflowing to <*>
+            flush_interval: Seconds between drain() results for persistence
+        """
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.flush_interval = flush_interval
+        self.root: Dict[int, Dict[str, Any]] = {}
+        self.clusters: Dict[int, _Cluster] = {}
+        self.next_id = 1
+        self.message_cache: Dict[str, _Cluster] = {}
+        self.minute_cache: Dict[str, datetime] = {}
+        self.dirty = set()
+        self.counts: Dict[Tuple[int, datetime], int] = {}
+        self.next_flush = time.monotonic() + flush_interval
+        self.messages = 0
+        self.cache_hits = 0
+
+    # =============== PARSE TREE ===============
+
+    @staticmethod
+    def tokenize(message: str) -> List[str]:
+        return [WILDCARD if PARAM_TOKEN.match(token) else token for token in message.split()]
+
+    def _leaf(self, tokens: List[str]) -> List[_Cluster]:
+        """Templates sharing the token count and routing prefix of `tokens` (created on first use)"""
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            key = WILDCARD if _has_digit(token) else token
+            child = node.get(key)
+            if child is None:
+                if len(node) >= self.max_children:
+                    key = WILDCARD
+                child = node.setdefault(key, {})
+            node = child
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[_Cluster], tokens: List[str]) -> Optional[_Cluster]:
+        best, best_score, best_params = None, -1.0, -1
+        for cluster in leaf:
+            equal = params = 0
+            for template_token, token in zip(cluster.tokens, tokens):
+                if template_token == WILDCARD:
+                    params += 1
+                elif template_token == token:
+                    equal += 1
+            score = equal / len(tokens) if tokens else 1.0
+            # Equal scores: prefer the more general template
+            if score > best_score or (score == best_score and params > best_params):
+                best, best_score, best_params = cluster, score, params
+        return best if best is not None and best_score >= self.similarity else None
+
+    def _add_cluster(self, tokens: List[str], template_id: Optional[int] = None,
+                     first_seen: Optional[datetime] = None) -> _Cluster:
+        if template_id is None:
+            template_id = self.next_id
+        self.next_id = max(self.next_id, template_id + 1)
+        cluster = _Cluster(template_id, tokens, first_seen)
+        self.clusters[template_id] = cluster
+        self._leaf(tokens).append(cluster)
+        return cluster
+
+    def _match(self, message: str) -> _Cluster:
+        tokens = self.tokenize(message)
+        leaf = self._leaf(tokens)
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            cluster = self._add_cluster(tokens)
+        else:
+            merged = [template_token if template_token == token else WILDCARD
+                      for template_token, token in zip(cluster.tokens, tokens)]
+            if merged != cluster.tokens:
+                cluster.tokens = merged
+                cluster.versions.append(cluster.template)
+                self.dirty.add(cluster.template_id)
+        return cluster
+
+    # =============== INGEST ===============
+
+    def _minute(self, timestamp) -> datetime:
+        """Start of the count bucket of a log timestamp (ISO strings without offset are parsed once per minute)"""
+        if isinstance(timestamp, str) and len(timestamp) >= 16 and timestamp.find("+", 10) < 0 \
+                and timestamp.find("-", 10) < 0:
+            key = timestamp[:16]
+            minute = self.minute_cache.get(key)
+            if minute is None:
+                minute = to_utc_datetime(key)
+                if minute is None:
+                    return datetime.utcnow().replace(second=0, microsecond=0)
+                if len(self.minute_cache) >= MESSAGE_CACHE_SIZE:
+                    self.minute_cache.clear()
+                self.minute_cache[key] = minute
+            return minute
+        timestamp = to_utc_datetime(timestamp) or datetime.utcnow()
+        return timestamp.replace(second=0, microsecond=0)
+
+    def add(self, message: str, timestamp=None) -> Tuple[int, List[str]]:
+        """
+        Assign one message to a template
+
+        Args:
+            message: Log message
+            timestamp: Log timestamp, counted in its minute (defaults to now)
+
+        Returns:
+            Tuple: (template id, parameter values in template order)
+        """
+        cluster, tokens = self._add(message, timestamp)
+        return cluster.template_id, cluster.params(tokens)
+
+    def _add(self, message: str, timestamp) -> Tuple[_Cluster, List[str]]:
+        self.messages += 1
+        cluster = self.message_cache.get(message)
+        if cluster is None:
+            cluster = self._match(message)
+            if len(self.message_cache) >= MESSAGE_CACHE_SIZE:
+                self.message_cache.clear()
+            self.message_cache[message] = cluster
+        else:
+            self.cache_hits += 1
+        minute = self._minute(timestamp)
+        cluster.count += 1
+        if cluster.first_seen is None or minute < cluster.first_seen:
+            cluster.first_seen = minute
+        if cluster.last_seen is None or minute > cluster.last_seen:
+            cluster.last_seen = minute
+        self.dirty.add(cluster.template_id)
+        key = (cluster.template_id, minute)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return cluster, message.split()
+
+    def add_logs(self, logs: List[Dict[str, Any]]):
+        """
+        Stamp template_id and template_params on every log with a text message
+
+        template_version is added when the message is exactly its template
+        with the parameters filled in (single spaces between tokens), i.e.
+        when render_template can rebuild it and storage may omit it.
+        """
+        for log in logs:
+            message = log.get("message")
+            if isinstance(message, str):
+                cluster, tokens = self._add(message, log.get("timestamp"))
+                log["template_id"] = cluster.template_id
+                log["template_params"] = cluster.params(tokens)
+                if " ".join(tokens) == message:
+                    log["template_version"] = len(cluster.versions) - 1
+
+    # =============== PERSISTENCE ===============
+
+    def load(self, templates: List[Dict[str, Any]]):
+        """Restore persisted templates (documents from drain()) so their ids stay stable"""
+        for document in templates:
+            template_id = document.get("template_id")
+            template = document.get("template")
+            if isinstance(template_id, int):
+                # New templates never reuse a persisted id, even one that cannot be restored
+                self.next_id = max(self.next_id, template_id + 1)
+            if not isinstance(template_id, int) or not isinstance(template, str) or template_id in self.clusters:
+                continue
+            cluster = self._add_cluster(template.split(" ") if template else [], template_id,
+                                        to_utc_datetime(document.get("first_seen")))
+            versions = document.get("versions")
+            if isinstance(versions, list) and versions and versions[-1] == template:
+                cluster.versions = list(versions)
+            cluster.count = int(document.get("count") or 0)
+            cluster.last_seen = to_utc_datetime(document.get("last_seen"))
+
+    def drain(self, force: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Changed templates and per-minute count increments since the last drain
+
+        Returns nothing until flush_interval has passed, unless force is set
+        (use it on shutdown).
+
+        Returns:
+            Tuple: (template documents, {template_id, timestamp, count} increments)
+        """
+        now = time.monotonic()
+        if not force and now < self.next_flush:
+            return [], []
+        self.next_flush = now + self.flush_interval
+        templates = [self._document(self.clusters[template_id]) for template_id in self.dirty]
+        counts = [{"template_id": template_id, "timestamp": minute, "count": count}
+                  for (template_id, minute), count in self.counts.items()]
+        self.dirty = set()
+        self.counts = {}
+        return templates, counts
+
+    @staticmethod
+    def _document(cluster: _Cluster) -> Dict[str, Any]:
+        return {
+            "template_id": cluster.template_id,
+            "template": cluster.template,
+            "versions": list(cluster.versions),
+            "token_count": len(cluster.tokens),
+            "count": cluster.count,
+            "first_seen": cluster.first_seen,
+            "last_seen": cluster.last_seen,
+        }
+
+    # =============== QUERIES ===============
+
+    def get_templates(self, limit: int = 100, min_count: int = 0) -> List[Dict[str, Any]]:
+        """Templates by decreasing message count"""
+        clusters = sorted((cluster for cluster in self.clusters.values() if cluster.count >= min_count),
+                          key=lambda cluster: cluster.count, reverse=True)
+        return [self._document(cluster) for cluster in clusters[:limit]]
+
+    def summarize(self, limit: int = 50) -> str:
+        """
+        Compact text view of the log stream for the agent
+
+        One "count x [id] template" line per template, most frequent first,
+        and a final line accounting for the templates left out.
+        """
+        templates = self.get_templates(limit=len(self.clusters))
+        lines = [f"{template['count']} x [{template['template_id']}] {template['template']}"
+                 for template in templates[:limit]]
+        rest = templates[limit:]
+        if rest:
+            lines.append(f"... {len(rest)} more templates covering {sum(t['count'] for t in rest)} messages")
+        return "\n".join(lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "templates": len(self.clusters),
+            "messages": self.messages,
+            "cache_hits": self.cache_hits,
+            "pending_counts": len(self.counts),
+        }
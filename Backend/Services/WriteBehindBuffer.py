@@ -0,0 +1,209 @@
+import asyncio
+import time
+from pymongo.errors import BulkWriteError
+from .MongoClient import MongoDBClient
+
+DUPLICATE_KEY = 11000
+
+
+def unwritten_records(batch, error):
+    """
+    Records of a failed bulk write that are not in MongoDB yet
+
+    A BulkWriteError reports the operations that failed; in an ordered
+    write everything after the first failure was never attempted.
+    Duplicate-key failures are already stored and are not retried. Any
+    other error leaves the whole batch unwritten.
+    """
+    if not isinstance(error, BulkWriteError):
+        return batch
+    details = error.details or {}
+    errors = details.get("writeErrors", [])
+    failed = [batch[e["index"]] for e in errors
+              if e.get("code") != DUPLICATE_KEY and 0 <= e.get("index", -1) < len(batch)]
+    attempted = len(errors) + sum(details.get(key, 0) for key in ("nInserted", "nUpserted", "nMatched", "nRemoved"))
+    if errors and attempted < len(batch):
+        failed.extend(batch[max(e["index"] for e in errors) + 1:])
+    return failed
+
+
+class WriteBehindBuffer:
+    def __init__(self, mongo_client=None, max_batch_size=500, max_age=0.2, max_pending=100000, max_retries=5):
+        """
+        Accumulate records in memory and flush them to MongoDB in batches
+
+        A failed write puts its unwritten records back at the front of the
+        queue and retries them with exponential backoff; after max_retries
+        failed attempts they are discarded and counted as failed. Each kind
+        holds at most max_pending records, the oldest are dropped (and
+        counted) beyond that.
+
+        Args:
+            mongo_client: MongoDBClient used for the bulk writes
+            max_batch_size: Flush a kind as soon as this many records are pending; also the records per insert
+            max_age: Flush a kind once its oldest pending record is this old (seconds)
+            max_pending: Records kept per kind while MongoDB is slow or unavailable
+            max_retries: Failed attempts before a batch is discarded
+        """
+        self.mongo_client = mongo_client or MongoDBClient()
+        self.max_batch_size = max_batch_size
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.writers = {
+            "logs": self.mongo_client.store_logs,
+            "metrics": self.mongo_client.store_metrics,
+        }
+        self._pending = {kind: [] for kind in self.writers}
+        self._oldest = {}
+        self._retries = {}
+        self._retry_at = {}
+        self.written = {}
+        self.failed = {}
+        self.dropped = {}
+        self.write_errors = {}
+        self._wakeup = None
+        self._flush_lock = None
+        self._flush_task = None
+
+    def register(self, kind, writer):
+        """Register a bulk writer callable for a new kind of record"""
+        self.writers[kind] = writer
+        self._pending.setdefault(kind, [])
+
+    def add(self, kind, records):
+        """Queue records of the given kind for the next flush"""
+        if isinstance(records, dict):
+            records = [records]
+        if not records:
+            return
+
+        pending = self._pending[kind]
+        if not pending:
+            self._oldest[kind] = time.monotonic()
+        pending.extend(records)
+        self._trim(kind)
+
+        if len(pending) >= self.max_batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _trim(self, kind):
+        pending = self._pending[kind]
+        overflow = len(pending) - self.max_pending
+        if overflow > 0:
+            del pending[:overflow]
+            self.dropped[kind] = self.dropped.get(kind, 0) + overflow
+
+    def pending_count(self):
+        """Number of records waiting to be written, per kind"""
+        return {kind: len(records) for kind, records in self._pending.items()}
+
+    def get_stats(self):
+        """Pending, written, failed (discarded after retries) and dropped (overflow) records per kind"""
+        return {
+            kind: {
+                "pending": len(records),
+                "written": self.written.get(kind, 0),
+                "failed": self.failed.get(kind, 0),
+                "dropped": self.dropped.get(kind, 0),
+                "write_errors": self.write_errors.get(kind, 0),
+                "retrying": self._retries.get(kind, 0),
+            }
+            for kind, records in self._pending.items()
+        }
+
+    async def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._flush_task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background task and write out everything still pending"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        for kind, records in self._pending.items():
+            if records:
+                print(f"Write-behind stopped with {len(records)} {kind} not written")
+
+    async def flush(self, kinds=None):
+        """Write pending records of the given kinds (all kinds by default)"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            loop = asyncio.get_running_loop()
+            for kind in kinds or list(self._pending):
+                batch = self._pending[kind]
+                if not batch:
+                    continue
+                self._pending[kind] = []
+                self._oldest.pop(kind, None)
+                # One insert per max_batch_size records, however much piled up while MongoDB was slow
+                for start in range(0, len(batch), self.max_batch_size):
+                    chunk = batch[start:start + self.max_batch_size]
+                    try:
+                        # Run the synchronous pymongo write off the event loop
+                        await loop.run_in_executor(None, self.writers[kind], chunk)
+                    except Exception as e:
+                        # Later chunks were not attempted; they wait behind the failed one
+                        self._requeue(kind, chunk, e, batch[start + self.max_batch_size:])
+                        break
+                    self.written[kind] = self.written.get(kind, 0) + len(chunk)
+                    self._retries.pop(kind, None)
+                    self._retry_at.pop(kind, None)
+
+    def _requeue(self, kind, batch, error, rest=()):
+        """Put the unwritten part of a failed batch, then `rest`, back in front of newer records"""
+        self.write_errors[kind] = self.write_errors.get(kind, 0) + 1
+        unwritten = unwritten_records(batch, error)
+        self.written[kind] = self.written.get(kind, 0) + len(batch) - len(unwritten)
+        attempts = self._retries.get(kind, 0) + 1
+        requeued = list(rest)
+        if not unwritten:
+            self._retries.pop(kind, None)
+            self._retry_at.pop(kind, None)
+        elif attempts > self.max_retries:
+            self.failed[kind] = self.failed.get(kind, 0) + len(unwritten)
+            self._retries.pop(kind, None)
+            self._retry_at.pop(kind, None)
+            print(f"Error flushing {len(batch)} {kind} to MongoDB, discarded {len(unwritten)}: {error}")
+        else:
+            print(f"Error flushing {len(batch)} {kind} to MongoDB (attempt {attempts}), "
+                  f"retrying {len(unwritten)}: {error}")
+            self._retries[kind] = attempts
+            self._retry_at[kind] = time.monotonic() + self.max_age * 2 ** attempts
+            requeued = unwritten + requeued
+        if not requeued:
+            return
+        pending = self._pending[kind]
+        self._pending[kind] = requeued + pending
+        self._oldest[kind] = time.monotonic() if not pending else self._oldest.get(kind, time.monotonic())
+        self._trim(kind)
+
+    def _due_kinds(self):
+        now = time.monotonic()
+        return [
+            kind for kind, records in self._pending.items()
+            if records and now >= self._retry_at.get(kind, 0)
+            and (len(records) >= self.max_batch_size or now - self._oldest.get(kind, now) >= self.max_age)
+        ]
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_age)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            due = self._due_kinds()
+            if due:
+                await self.flush(due)
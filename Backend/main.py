@@ -1,18 +1,35 @@
 import asyncio
+import functools
 import json
 import sys
 import os
 import random
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from DataCollectors.Telemenetry import TelemetryGenerator
 from DataCollectors.CommitsCollector import CommitsCollector
+from DataCollectors.FileTailCollector import FileTailCollector
+from DataCollectors.SyslogListener import SyslogListener
+from DataCollectors.HostMetricsCollector import HostMetricsCollector
 from Services.LogFilter import LogFilter
 from Services.CollectMetrics import MetricsCollector
 from Services.EventDetection import EventDetection
 from Services.MongoClient import MongoDBClient
+from Services.AsyncMongoClient import AsyncMongoDBClient
+from Services.WriteBehindBuffer import WriteBehindBuffer
+from Services.Serialization import encode_ndjson
+from Services.RetentionPruner import RetentionPruner
+from Services.HotTier import HotTier
+from Services.ParquetArchive import ParquetArchive
+from Services.BroadcastHub import BroadcastHub, SlowConsumerError
+from Services.BulkIngest import BulkIngest, IngestLimitError
+from Services.AnomalyDetector import AnomalyDetector, DEFAULT_FIELDS
+from Services.TemplateMiner import TemplateMiner
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'AI'))
 from Agent import Agent
@@ -31,15 +48,132 @@ app.add_middleware(
 # Initialize MongoDB client
 mongo_client = MongoDBClient()
 
+# Non-blocking wrapper used by request handlers
+async_mongo = AsyncMongoDBClient(mongo_client=mongo_client, max_workers=8)
+
+def env_number(name, default=None, scale=1):
+    """Read a numeric setting from the environment (empty/0 disables it)"""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return int(default * scale) if default else None
+    return int(float(value) * scale) or None
+
+def env_float(name, default, minimum=None, maximum=None):
+    """Read a numeric tuning setting from the environment (0 is a value here, not "disabled")"""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got '{value}'")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value}")
+    if maximum is not None and number > maximum:
+        raise ValueError(f"{name} must be at most {maximum}, got {value}")
+    return number
+
+# Retention (TTL on timestamp) and storage budgets per collection
+retention_pruner = RetentionPruner(
+    mongo_client=mongo_client,
+    retention={
+        "logs": env_number("LOGAGENT_LOGS_RETENTION_DAYS", 7, scale=86400),
+        "metrics": env_number("LOGAGENT_METRICS_RETENTION_DAYS", 7, scale=86400),
+        "commits": env_number("LOGAGENT_COMMITS_RETENTION_DAYS", scale=86400),
+    },
+    budgets={
+        "logs": env_number("LOGAGENT_LOGS_MAX_MB", scale=1024 * 1024),
+        "metrics": env_number("LOGAGENT_METRICS_MAX_MB", scale=1024 * 1024),
+        "commits": env_number("LOGAGENT_COMMITS_MAX_MB", scale=1024 * 1024),
+    },
+    interval=300
+)
+
+# Aged logs/metrics move to partitioned Parquet files before their TTL expires
+parquet_archive = ParquetArchive(
+    mongo_client=mongo_client,
+    archive_after_days=env_number("LOGAGENT_ARCHIVE_AFTER_DAYS", 1),
+    interval=3600
+)
+mongo_client.attach_archive(parquet_archive)
+
+# Batch ingest writes instead of one insert per event
+write_buffer = WriteBehindBuffer(mongo_client=mongo_client, max_batch_size=500, max_age=0.2)
+write_buffer.register("metric_rollups", mongo_client.store_metric_rollups)
+write_buffer.register("anomalies", mongo_client.store_anomalies)
+write_buffer.register("log_templates", mongo_client.store_log_templates)
+write_buffer.register("template_counts", mongo_client.store_template_counts)
+
+# Recent telemetry served from memory; older ranges fall through to MongoDB
+hot_tier = HotTier(
+    log_capacity=env_number("LOGAGENT_HOT_TIER_LOGS", 10000),
+    metric_capacity=env_number("LOGAGENT_HOT_TIER_METRICS", 10000)
+)
+
+# Real application log files (comma separated paths/globs), tailed into the same ingest path
+tail_paths = [path.strip() for path in os.getenv("LOGAGENT_TAIL_FILES", "").split(",") if path.strip()]
+file_tailer = FileTailCollector(tail_paths) if tail_paths else None
+
+# Syslog over UDP/TCP from other services (ports unset = disabled)
+syslog_listener = SyslogListener(
+    host=os.getenv("LOGAGENT_SYSLOG_HOST") or "0.0.0.0",
+    udp_port=env_number("LOGAGENT_SYSLOG_UDP_PORT"),
+    tcp_port=env_number("LOGAGENT_SYSLOG_TCP_PORT")
+)
+
+# Real CPU/memory/disk/network/process samples from /proc (interval in seconds; unset = disabled)
+host_metrics_interval = env_number("LOGAGENT_HOST_METRICS", scale=1000)
+host_metrics = HostMetricsCollector(interval=host_metrics_interval / 1000) if host_metrics_interval else None
+
+# Live fan-out of ingested telemetry to SSE/WebSocket subscribers
+stream_hub = BroadcastHub(topics=("logs", "metrics", "anomalies"), capacity=10000, max_frame_events=500, batch_window=0.05)
+
 # Initialize components with MongoDB client
-generator = TelemetryGenerator(min_delay=0.2, max_delay=0.8)
-log_filter = LogFilter(mongo_client=mongo_client)
-metrics_collector = MetricsCollector(mongo_client=mongo_client)
+generator = TelemetryGenerator(
+    min_delay=0.2, max_delay=0.8,
+    # Generator -> ingest buffers are bounded; the policy decides what happens when ingest falls behind
+    buffer_size=env_number("LOGAGENT_STREAM_BUFFER_SIZE", 1000),
+    buffer_policy=os.getenv("LOGAGENT_STREAM_BUFFER_POLICY") or "drop_oldest"
+)
+# Drain-style log template mining; persisted templates keep their ids across restarts
+template_miner = TemplateMiner(depth=int(env_float("LOGAGENT_TEMPLATE_DEPTH", 1, minimum=0, maximum=16)),
+                               similarity=env_float("LOGAGENT_TEMPLATE_SIMILARITY", 0.4, minimum=0, maximum=1))
+# Raises if MongoDB cannot return the persisted templates: starting without them would reuse their ids
+template_miner.load(mongo_client.get_log_templates())
+# Logs whose stored template version rebuilds their message are stored without it (0 keeps every message);
+# compaction only starts once get_log_templates() has succeeded
+mongo_client.compact_messages = bool(env_number("LOGAGENT_TEMPLATE_COMPACT_MESSAGES", 1))
+log_filter = LogFilter(mongo_client=mongo_client, write_buffer=write_buffer, hot_tier=hot_tier, hub=stream_hub,
+                       rules_path=os.getenv("LOGAGENT_FILTER_RULES") or None, template_miner=template_miner)
+# Streaming EWMA/seasonal anomaly scoring of the watched metric fields (comma separated)
+anomaly_fields = [field.strip() for field in os.getenv("LOGAGENT_ANOMALY_FIELDS", "").split(",") if field.strip()]
+anomaly_detector = AnomalyDetector(
+    fields=anomaly_fields or DEFAULT_FIELDS,
+    z_threshold=env_float("LOGAGENT_ANOMALY_Z_THRESHOLD", 4.0, minimum=0)
+)
+metrics_collector = MetricsCollector(mongo_client=mongo_client, write_buffer=write_buffer, hot_tier=hot_tier,
+                                     hub=stream_hub, anomaly_detector=anomaly_detector)
 event_detector = EventDetection()
 
+# NDJSON (optionally gzip) pushed by external agents, stored with one insert per batch
+bulk_ingest = BulkIngest(
+    async_mongo, metrics_collector=metrics_collector, hot_tier=hot_tier, hub=stream_hub,
+    batch_size=5000, max_bytes=env_number("LOGAGENT_INGEST_MAX_MB", 256, scale=1024 * 1024),
+    log_filter=log_filter
+)
+
 ai_agent = Agent()
 agent_analysis_result = None
 analysis_in_progress = False
+commit_syncs = set()  # Repositories with a /commits/sync in progress
+# Repository mining (pydriller/git) runs on its own threads, so a long sync cannot hold up the
+# database executor that serves dashboard queries
+git_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="git")
+
+async def run_git(func, *args, **kwargs):
+    """Run blocking repository work on the git executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(git_executor, functools.partial(func, *args, **kwargs))
 telemetry_auto_stopped = False  # Track internal auto-stop state 
 
 async def run_agent_analysis():
@@ -56,15 +190,19 @@ async def run_agent_analysis():
         
         # Get data from MongoDB instead of files
         print("Fetching logs from MongoDB...")
-        logs = mongo_client.get_filtered_logs(limit=500)
+        logs = hot_tier.recent_logs(limit=500, levels=['ERROR', 'WARNING'])
+        if logs is None:
+            logs = await async_mongo.get_filtered_logs(limit=500)
         print(f"Retrieved {len(logs)} logs from MongoDB")
         
         print("Fetching metrics from MongoDB...")
-        metrics = mongo_client.get_metrics(limit=100)
+        metrics = hot_tier.recent_metrics(limit=100)
+        if metrics is None:
+            metrics = await async_mongo.get_metrics(limit=100)
         print(f"Retrieved {len(metrics)} metrics from MongoDB")
         
         print("Fetching commits from MongoDB...")
-        commits = mongo_client.get_commits(limit=10)
+        commits = await async_mongo.get_commits(limit=10)
         print(f"Retrieved {len(commits)} commits from MongoDB")
         
         # Run the agent in a thread pool to avoid blocking the event loop
@@ -122,6 +260,26 @@ def start_agent_analysis_background():
     """Start agent analysis as a background task"""
     asyncio.create_task(run_agent_analysis())
 
+def parse_fields(fields):
+    """Turn a comma separated ?fields= value into a projection list"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+def page_cursors(items, limit):
+    """Cursors for the pages on either side of a newest-first result page"""
+    return {
+        # Older items: pass back as ?before=
+        "next_cursor": MongoDBClient.encode_cursor(items[-1]) if len(items) >= limit else None,
+        # Newer items: pass back as ?after=
+        "prev_cursor": MongoDBClient.encode_cursor(items[0]) if items else None
+    }
+
+def ndjson_stream(batches):
+    """Encode cursor batches as NDJSON chunks, one chunk per batch"""
+    for batch in batches:
+        yield encode_ndjson(batch)
+
 def telemetry_callback(data_type, data):
     """Handle telemetry data - save to files in background"""
     try:
@@ -151,19 +309,11 @@ async def generator_loop():
     try:
         # Run the generator loop without websocket
         while generator.is_running:
-            # Generate log
             log = await generator._generate_log()
-            await generator.log_buffer.put(log)
-            if generator.callback:
-                generator.callback("log", log)
-            print(f"Generated log: {log.get('message', 'No message')} (Status: {log.get('status_code', 'N/A')})")
-
-            # Generate metric (correlate CPU spike with log)
+            # Correlate CPU spike with the log
             metric = await generator._generate_metric(correlate_cpu=log.get("cpu_spike", False))
-            await generator.metric_buffer.put(metric)
-            if generator.callback:
-                generator.callback("metric", metric)
-            print(f"Generated metric: CPU={metric.get('cpu_percent', 0):.1f}% Memory={metric.get('memory_percent', 0):.1f}%")
+            # Through the bounded buffers to the ingest callback
+            await generator.emit([log], [metric])
 
             await asyncio.sleep(random.uniform(generator.min_delay, generator.max_delay))
             
@@ -176,6 +326,25 @@ async def generator_loop():
 @app.on_event("startup")
 async def startup_event():
     print("=== APPLICATION STARTUP ===")
+    print("Starting write-behind buffer...")
+    await write_buffer.start()
+    await log_filter.start()
+
+    print("Applying retention policies...")
+    await retention_pruner.start()
+    await parquet_archive.start()
+
+    if file_tailer is not None:
+        file_tailer.callback = telemetry_callback
+        await file_tailer.start()
+
+    syslog_listener.callback = telemetry_callback
+    await syslog_listener.start()
+
+    if host_metrics is not None:
+        host_metrics.callback = telemetry_callback
+        await host_metrics.start()
+
     generator.callback = telemetry_callback
     print("Setting up telemetry callback")
     
@@ -191,93 +360,296 @@ async def startup_event():
     print("=== STARTUP COMPLETE ===")
     print("Telemetry should now be generating data for 10 seconds")
 
-async def log_event_stream():
-    """Stream logs in real-time during generation, then stop"""
-    print("=== LOG STREAMING STARTED ===")
-    log_count = 0
-    while True:
-        try:
-            # Always try to get real-time logs from the generator
-            print(f"Waiting for log data... (count: {log_count})")
-            log = await asyncio.wait_for(generator.get_log(), timeout=2.0)
-            print(f"Got log data: {log}")
-            log_count += 1
-            yield f"data: {json.dumps(log)}\n\n"
-        except asyncio.TimeoutError:
-            # If no logs available, send keep-alive
-            print("No log data available, sending keep-alive")
-            yield f"data: {json.dumps({'message': 'Waiting for logs...', 'timestamp': '', 'level': 'INFO'})}\n\n"
-            await asyncio.sleep(0.5)
+@app.on_event("shutdown")
+async def shutdown_event():
+    print("=== APPLICATION SHUTDOWN ===")
+    generator.stop_generation()
+    await generator.stop_load()
+    await generator.stop_delivery()
+    await retention_pruner.stop()
+    await parquet_archive.stop()
+    if file_tailer is not None:
+        await file_tailer.stop()
+    await syslog_listener.stop()
+    if host_metrics is not None:
+        await host_metrics.stop()
+    print("Flushing pending writes to MongoDB...")
+    metrics_collector.flush_rollups()
+    await log_filter.stop()
+    await write_buffer.stop()
+    git_executor.shutdown(wait=False, cancel_futures=True)
+    async_mongo.close()
+
+async def hub_event_stream(subscription):
+    """Server-sent events of live telemetry: one `data:` JSON array per batch frame"""
+    try:
+        while True:
+            frames = await subscription.next_frames(timeout=15.0)
+            if not frames:
+                yield b": keep-alive\n\n"
+            for topic, frame in frames:
+                yield b"event: " + topic.encode() + b"\ndata: " + frame + b"\n\n"
+    except SlowConsumerError as e:
+        # The client reconnects and catches up through /logs/changes and /metrics/changes
+        yield b"event: evicted\ndata: " + json.dumps(str(e)).encode() + b"\n\n"
+    finally:
+        subscription.close()
+
+@app.get("/stream")
+async def stream_telemetry(topics: str = None):
+    """Push live logs/metrics (comma separated topics, default all) as server-sent events"""
+    try:
+        subscription = stream_hub.subscribe(parse_fields(topics))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(hub_event_stream(subscription), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/stream")
+async def websocket_stream(websocket: WebSocket, topics: str = None):
+    """Push live logs/metrics as {"topic", "events"} text frames"""
+    await websocket.accept()
+    try:
+        subscription = stream_hub.subscribe(parse_fields(topics))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    # Clients only listen; reading their messages notices a disconnect while idle
+    disconnected = asyncio.create_task(websocket.receive())
+    try:
+        while not disconnected.done():
+            for topic, frame in await subscription.next_frames(timeout=15.0):
+                await websocket.send_text('{"topic":"%s","events":%s}' % (topic, frame.decode()))
+    except SlowConsumerError as e:
+        await websocket.close(code=1013, reason=str(e))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+@app.get("/stream/stats")
+async def get_stream_stats():
+    """Live stream hub counters, and frame batching of the generator websocket server"""
+    return {**stream_hub.get_stats(), "generator_websocket": generator.get_stream_stats()}
 
 @app.get("/logs")
-async def get_logs():
-    """Get logs from MongoDB"""
+async def get_logs(limit: int = 1000, after: str = None, before: str = None, fields: str = None):
+    """Get a page of logs from MongoDB, newest first"""
     try:
-        logs = mongo_client.get_logs(limit=1000)
-        return {"logs": logs}
+        logs = None
+        if not after and not before:
+            logs = hot_tier.recent_logs(limit=limit, fields=parse_fields(fields))
+        if logs is None:
+            logs = await async_mongo.get_logs(limit=limit, fields=parse_fields(fields), after=after, before=before)
+        return {"logs": logs, **page_cursors(logs, limit)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error retrieving logs from MongoDB: {e}")
         return {"logs": []}
 
-async def metric_event_stream():
-    """Stream metrics in real-time during generation, then stop"""
-    print("=== METRICS STREAMING STARTED ===")
-    metric_count = 0
-    while True:
-        try:
-            # Always try to get real-time metrics from the generator
-            print(f"Waiting for metric data... (count: {metric_count})")
-            metric = await asyncio.wait_for(generator.get_metric(), timeout=2.0)
-            print(f"Got metric data: {metric}")
-            metric_count += 1
-            yield f"data: {json.dumps(metric)}\n\n"
-        except asyncio.TimeoutError:
-            # If no metrics available, send keep-alive with sample data
-            print("No metric data available, sending keep-alive")
-            yield f"data: {json.dumps({'cpu': 0, 'memory': 0, 'message': 'Waiting for metrics...', 'timestamp': ''})}\n\n"
-            await asyncio.sleep(0.5)
+@app.get("/logs/changes")
+async def get_log_changes(since: int = None, limit: int = 1000, fields: str = None):
+    """Get logs stored after the `since` watermark plus the next watermark"""
+    try:
+        changes = await async_mongo.get_logs_since(since=since, limit=limit, fields=parse_fields(fields))
+        return {"logs": changes["items"], "watermark": changes["watermark"], "has_more": changes["has_more"]}
+    except Exception as e:
+        print(f"Error retrieving log changes from MongoDB: {e}")
+        return {"logs": [], "watermark": since or 0, "has_more": False}
+
+@app.get("/logs/export")
+async def export_logs(level: str = None, start: datetime = None, end: datetime = None,
+                      fields: str = None, batch_size: int = 1000):
+    """Stream matching logs as NDJSON straight from the MongoDB cursor"""
+    batches = mongo_client.iter_logs(level=level, start_time=start, end_time=end,
+                                     fields=parse_fields(fields), batch_size=batch_size)
+    # Sync iterators are consumed in a worker thread, so the cursor never blocks the loop
+    return StreamingResponse(ndjson_stream(batches), media_type="application/x-ndjson")
+
+@app.get("/logs/history")
+async def get_logs_history(start: datetime = None, end: datetime = None, level: str = None,
+                           status_code: str = None, endpoint: str = None, fields: str = None,
+                           limit: int = 1000):
+    """Search logs across MongoDB and the Parquet archive (comma separated filters)"""
+    try:
+        status_codes = [int(code) for code in parse_fields(status_code) or []] or None
+        logs = await async_mongo.search_logs(start_time=start, end_time=end, levels=parse_fields(level),
+                                             status_codes=status_codes, endpoints=parse_fields(endpoint),
+                                             fields=parse_fields(fields), limit=limit)
+        return {"logs": logs}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error searching log history: {e}")
+        return {"logs": []}
 
 @app.get("/metrics")
-async def get_metrics():
-    """Get metrics from MongoDB"""
+async def get_metrics(limit: int = 1000, after: str = None, before: str = None, fields: str = None):
+    """Get a page of metrics from MongoDB, newest first"""
     try:
-        metrics = mongo_client.get_metrics(limit=1000)
-        return {"metrics": metrics}
+        metrics = None
+        if not after and not before:
+            metrics = hot_tier.recent_metrics(limit=limit, fields=parse_fields(fields))
+        if metrics is None:
+            metrics = await async_mongo.get_metrics(limit=limit, fields=parse_fields(fields), after=after, before=before)
+        return {"metrics": metrics, **page_cursors(metrics, limit)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error retrieving metrics from MongoDB: {e}")
         return {"metrics": []}
 
 
+@app.get("/metrics/changes")
+async def get_metric_changes(since: int = None, limit: int = 1000, fields: str = None):
+    """Get metrics stored after the `since` watermark plus the next watermark"""
+    try:
+        changes = await async_mongo.get_metrics_since(since=since, limit=limit, fields=parse_fields(fields))
+        return {"metrics": changes["items"], "watermark": changes["watermark"], "has_more": changes["has_more"]}
+    except Exception as e:
+        print(f"Error retrieving metric changes from MongoDB: {e}")
+        return {"metrics": [], "watermark": since or 0, "has_more": False}
+
+
+@app.get("/metrics/export")
+async def export_metrics(metric_type: str = None, start: datetime = None, end: datetime = None,
+                         fields: str = None, batch_size: int = 1000):
+    """Stream matching metrics as NDJSON straight from the MongoDB cursor"""
+    batches = mongo_client.iter_metrics(metric_type=metric_type, start_time=start, end_time=end,
+                                        fields=parse_fields(fields), batch_size=batch_size)
+    return StreamingResponse(ndjson_stream(batches), media_type="application/x-ndjson")
+
+
+@app.get("/metrics/history")
+async def get_metrics_history(start: datetime = None, end: datetime = None, metric_type: str = None,
+                              fields: str = None, limit: int = 1000):
+    """Search metrics across MongoDB and the Parquet archive"""
+    try:
+        metrics = await async_mongo.search_metrics(start_time=start, end_time=end, metric_type=metric_type,
+                                                   fields=parse_fields(fields), limit=limit)
+        return {"metrics": metrics}
+    except Exception as e:
+        print(f"Error searching metric history: {e}")
+        return {"metrics": []}
+
+
+@app.get("/metrics/series")
+async def get_metrics_series(start: datetime = None, end: datetime = None, points: int = 300,
+                             resolution: str = "auto"):
+    """Get a downsampled CPU/memory series from the 10s/1m/1h rollups"""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=1)
+    if resolution != "auto" and resolution not in metrics_collector.rollup.resolutions:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution: {resolution}")
+    try:
+        chosen, series = await async_mongo.run(
+            metrics_collector.get_series, start, end, points=points,
+            resolution=None if resolution == "auto" else resolution
+        )
+        return {"resolution": chosen, "start": start, "end": end, "series": series}
+    except Exception as e:
+        print(f"Error retrieving metrics series: {e}")
+        return {"resolution": resolution, "start": start, "end": end, "series": []}
+
+
+@app.get("/templates")
+async def get_templates(limit: int = 100, min_count: int = 0):
+    """Mined log templates, most frequent first"""
+    return {**template_miner.get_stats(), "templates": template_miner.get_templates(limit=limit, min_count=min_count)}
+
+@app.get("/templates/counts")
+async def get_template_counts(start: datetime = None, end: datetime = None, template_id: int = None,
+                              limit: int = 10000):
+    """Per-minute message counts of log templates (default: last hour)"""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=1)
+    counts = await async_mongo.get_template_counts(start, end, template_id=template_id, limit=limit)
+    return {"start": start, "end": end, "counts": counts}
+
+@app.get("/templates/summary")
+async def get_template_summary(limit: int = 50):
+    """Compact view of the log stream: one line per template with its message count"""
+    return {"summary": template_miner.summarize(limit=limit)}
+
+@app.get("/anomalies")
+async def get_anomalies(limit: int = 100, field: str = None, host: str = None,
+                        start: datetime = None, end: datetime = None):
+    """Detected metric anomalies, newest first"""
+    anomalies = await async_mongo.get_anomalies(limit=limit, field=field, host=host,
+                                                start_time=start, end_time=end)
+    return {"anomalies": anomalies}
+
+@app.get("/anomalies/state")
+async def get_anomaly_state(host: str = None):
+    """Running mean/std and rolling quantiles of every watched series"""
+    return {**anomaly_detector.get_stats(), "state": anomaly_detector.get_state(host)}
+
+
 @app.get("/commits")
-async def get_commits(repo: str = None, k: int = 3, use_static: bool = False):
+async def get_commits(repo: str = None, k: int = 3, use_static: bool = False, fields: str = None,
+                      after: str = None, before: str = None):
     """Get commits from MongoDB or fetch from repository"""
     try:
-        if use_static or not repo:
-            # Get from MongoDB
-            commits = mongo_client.get_commits(limit=k)
-            return {"commits": commits}
+        if use_static or not repo or after or before:
+            # Get from MongoDB; paging always reads stored commits
+            commits = await async_mongo.get_commits(limit=k, fields=parse_fields(fields), after=after, before=before)
+            return {"commits": commits, **page_cursors(commits, k)}
         
         # Try to fetch from repository and store in MongoDB
         collector = CommitsCollector(repo, mongo_client=mongo_client)
         try:
-            commits_data = collector.get_last_k_commits(k)
+            # Repository traversal is blocking too, keep it off the event loop
+            commits_data = await run_git(collector.get_last_k_commits, k)
             return {"commits": commits_data}
         except Exception as repo_error:
             print(f"Repository access failed: {repo_error}")
             # Fallback to MongoDB data
-            commits = mongo_client.get_commits(limit=k)
+            commits = await async_mongo.get_commits(limit=k)
             return {"commits": commits}
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error getting commits: {e}")
         return {"commits": []}
 
 
+@app.post("/commits/sync")
+async def sync_commits(repo: str, batch_size: int = 100, workers: int = None):
+    """Mine commits made since the last sync of a repository (process pool for local clones)"""
+    collector = CommitsCollector(repo, mongo_client=mongo_client)
+    if collector.repo_name in commit_syncs:
+        raise HTTPException(status_code=409, detail=f"{collector.repo_name} is already being synced")
+    commit_syncs.add(collector.repo_name)
+    try:
+        # Each chunk is stored (and the checkpoint advanced) as soon as it is mined
+        processed = await run_git(collector.sync_commits, batch_size=batch_size, workers=workers)
+    except Exception as e:
+        print(f"Commit sync of {repo} failed: {e}")
+        raise HTTPException(status_code=502, detail=f"Repository access failed: {e}")
+    finally:
+        commit_syncs.discard(collector.repo_name)
+    return {
+        "repo_name": collector.repo_name,
+        "processed": processed,
+        "checkpoint": await async_mongo.run(mongo_client.get_sync_checkpoint, collector.repo_name),
+    }
+
+
+@app.get("/commits/export")
+async def export_commits(repo_name: str = None, fields: str = None, batch_size: int = 100):
+    """Stream stored commits as NDJSON straight from the MongoDB cursor"""
+    batches = mongo_client.iter_commits(repo_name=repo_name, fields=parse_fields(fields), batch_size=batch_size)
+    return StreamingResponse(ndjson_stream(batches), media_type="application/x-ndjson")
+
+
 @app.get("/commits/info")
 async def get_commits_info():
     """Get information about commits stored in MongoDB"""
     try:
-        stats = mongo_client.get_collection_stats()
+        stats = await async_mongo.get_collection_stats()
         commit_count = stats.get('commits', 0)
         
         return {
@@ -286,7 +658,9 @@ async def get_commits_info():
             "usage_examples": {
                 "get_all_commits": "/commits",
                 "get_limited_commits": "/commits?k=5",
+                "get_next_page": "/commits?k=5&before=<next_cursor>",
                 "fetch_from_repo": "/commits?repo=https://github.com/user/repo.git&k=3",
+                "sync_repository": "POST /commits/sync?repo=/path/to/clone",
                 "force_mongodb_data": "/commits?use_static=true&k=10"
             }
         }
@@ -299,6 +673,54 @@ async def get_commits_info():
         }
 
 
+@app.get("/storage")
+async def get_storage():
+    """Get per-collection storage usage alongside the retention configuration"""
+    try:
+        usage = await async_mongo.get_storage_stats()
+        return {"collections": usage, "hot_tier": hot_tier.get_stats(), **retention_pruner.get_config()}
+    except Exception as e:
+        print(f"Error getting storage stats: {e}")
+        return {"collections": {}, **retention_pruner.get_config(), "error": str(e)}
+
+
+@app.get("/db/index-check")
+async def get_index_check():
+    """Report which dashboard queries are not served by an index"""
+    try:
+        report = await async_mongo.check_index_usage()
+        return {
+            "all_indexed": all(entry["indexed"] for entry in report.values()),
+            "queries": report
+        }
+    except Exception as e:
+        print(f"Error checking index usage: {e}")
+        return {"all_indexed": False, "queries": {}, "error": str(e)}
+
+
+async def ingest_body(kind, request):
+    # Filled in while the body is processed, so a failure can tell the client where to resume
+    stats = {}
+    try:
+        return await bulk_ingest.ingest(kind, request.stream(), stats=stats)
+    except IngestLimitError as e:
+        raise HTTPException(status_code=413, detail={"error": str(e), **stats})
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail={"error": f"Invalid gzip body: {e}", **stats})
+    except Exception as e:
+        print(f"Error storing ingested {kind}: {e}")
+        raise HTTPException(status_code=503, detail={"error": f"Failed to store {kind}: {e}", **stats})
+
+@app.post("/ingest/logs")
+async def ingest_logs(request: Request):
+    """Store newline-delimited JSON logs (plain or gzip) decoded as the body streams in"""
+    return await ingest_body("logs", request)
+
+@app.post("/ingest/metrics")
+async def ingest_metrics(request: Request):
+    """Store newline-delimited JSON metrics (plain or gzip) decoded as the body streams in"""
+    return await ingest_body("metrics", request)
+
 @app.post("/stop")
 async def stop_telemetry():
     global telemetry_auto_stopped
@@ -319,6 +741,43 @@ async def start_telemetry():
     
     return {"status": "started", "message": "Telemetry generation started"}
 
+@app.post("/load/start")
+async def start_load(rate: int = 50000, duration: float = 10.0, batch_size: int = 1000, metric_ratio: float = 0.1):
+    """Push synthetic logs/metrics through the ingest pipeline at a target events/second rate"""
+    if rate <= 0 or batch_size <= 0:
+        raise HTTPException(status_code=400, detail="rate and batch_size must be positive")
+    try:
+        generator.start_load(rate=rate, duration=duration or None, batch_size=batch_size, metric_ratio=metric_ratio)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "started", "target_rate": rate, "duration": duration, "batch_size": batch_size}
+
+@app.post("/load/stop")
+async def stop_load():
+    """Stop load generation and report achieved vs target throughput"""
+    return await generator.stop_load()
+
+@app.get("/load/status")
+async def get_load_status():
+    """Achieved vs target throughput of the current or last load run"""
+    return generator.get_load_stats()
+
+@app.get("/buffers")
+async def get_buffers():
+    """Depth and drop counters of the telemetry stream buffers"""
+    return {
+        **generator.get_buffer_stats(),
+        "write_behind": write_buffer.get_stats(),
+        "file_tail": file_tailer.get_stats() if file_tailer is not None else None,
+        "syslog": syslog_listener.get_stats(),
+        "host_metrics": host_metrics.get_stats() if host_metrics is not None else None,
+    }
+
+@app.get("/filter-rules")
+async def get_filter_rules():
+    """Active log filter rules with their hit counts (edit the config file to change them)"""
+    return log_filter.rules.get_stats()
+
 @app.get("/status")
 async def get_status():
     global telemetry_auto_stopped
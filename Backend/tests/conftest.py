@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+# Import the backend packages the way main.py does (Services.*, DataCollectors.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """MongoDBClient backed by an in-memory mongomock server"""
+    mongomock = pytest.importorskip("mongomock")
+    from Services import MongoClient as mongo_module
+    monkeypatch.setattr(mongo_module, "MongoClient", mongomock.MongoClient)
+    return mongo_module.MongoDBClient()
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Local git repository with commit(files, message) to add commits"""
+    import shutil
+    import subprocess
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    path = tmp_path / "demo-repo"
+    path.mkdir()
+
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=path, check=True, capture_output=True, text=True).stdout
+
+    git("init", "-q")
+    git("config", "user.name", "Test Author")
+    git("config", "user.email", "author@example.com")
+
+    def commit(files, message):
+        for name, content in files.items():
+            (path / name).write_text(content)
+        git("add", "-A")
+        git("commit", "-qm", message)
+        return git("rev-parse", "HEAD").strip()
+
+    commit.path = str(path)
+    return commit
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from Services.AnomalyDetector import AnomalyDetector, _Series
+
+
+def make_detector(**overrides):
+    options = {"alpha": 0.05, "warmup": 10, "window": 50, "season_period": 64, "season_bins": 64,
+               "season_warmup": 2}
+    options.update(overrides)
+    return AnomalyDetector(fields=["cpu_percent"], **options)
+
+
+def series_pair(detector):
+    return (_Series(detector.window, detector.season_bins), _Series(detector.window, detector.season_bins))
+
+
+def oldest_first(state):
+    return np.roll(state.window, -state.window_next)
+
+
+def assert_same_state(left, right):
+    assert left.count == right.count
+    assert left.mean == pytest.approx(right.mean, rel=1e-9)
+    assert left.var == pytest.approx(right.var, rel=1e-9)
+    np.testing.assert_allclose(oldest_first(left), oldest_first(right))
+    np.testing.assert_allclose(left.season_mean, right.season_mean, rtol=1e-9)
+    np.testing.assert_allclose(left.season_var, right.season_var, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(left.season_count, right.season_count)
+
+
+def test_vectorized_ewma_matches_scalar_across_blocks():
+    detector = make_detector()
+    scalar, vectorized = series_pair(detector)
+    rng = np.random.default_rng(3)
+    # Longer than one closed-form block, one-second spacing so bins repeat within the batch
+    values = rng.normal(40, 5, 700)
+    epochs = np.arange(700, dtype=float)
+
+    expected, stds, z, _ = detector._update_scalar(scalar, values.tolist(), epochs.tolist())
+    v_expected, v_stds, v_z, _ = detector._update(vectorized, values, epochs)
+
+    np.testing.assert_allclose(v_expected, expected, rtol=1e-9)
+    np.testing.assert_allclose(v_stds, stds, rtol=1e-9)
+    np.testing.assert_allclose(v_z, z, rtol=1e-7, atol=1e-9)
+    assert vectorized.mean == pytest.approx(scalar.mean, rel=1e-9)
+    assert vectorized.var == pytest.approx(scalar.var, rel=1e-9)
+
+
+def test_vectorized_batches_match_scalar_when_bins_are_distinct():
+    detector = make_detector()
+    scalar, vectorized = series_pair(detector)
+    rng = np.random.default_rng(5)
+    start = 0
+    for size in (40, 64, 33, 50):
+        values = rng.normal(60, 8, size)
+        epochs = np.arange(start, start + size, dtype=float)
+        start += size
+        result = detector._update_scalar(scalar, values.tolist(), epochs.tolist())
+        v_result = detector._update(vectorized, values, epochs)
+        for got, want in zip(v_result, result):
+            np.testing.assert_allclose(got, want, rtol=1e-7, atol=1e-9)
+        assert_same_state(vectorized, scalar)
+
+
+def test_repeated_equal_values_move_a_bin_like_the_scalar_path():
+    detector = make_detector(season_bins=1)
+    scalar, vectorized = series_pair(detector)
+    for state in (scalar, vectorized):
+        detector._update_scalar(state, [10.0, 14.0, 12.0], [0.0, 1.0, 2.0])
+
+    values = np.full(40, 30.0)
+    epochs = np.arange(3, 43, dtype=float)
+    detector._update_scalar(scalar, values.tolist(), epochs.tolist())
+    detector._update(vectorized, values, epochs)
+
+    np.testing.assert_allclose(vectorized.season_mean, scalar.season_mean, rtol=1e-9)
+    np.testing.assert_allclose(vectorized.season_var, scalar.season_var, rtol=1e-9)
+
+
+def test_window_wraps_the_same_way_for_both_paths():
+    left, right = _Series(7, 1), _Series(7, 1)
+    for chunk in ([1.0, 2.0, 3.0], [4.0, 5.0, 6.0, 7.0, 8.0], list(np.arange(9.0, 20.0)), [20.0]):
+        left.push_values(chunk)
+        right.push_window(np.array(chunk))
+        np.testing.assert_array_equal(oldest_first(left), oldest_first(right))
+    assert oldest_first(left).tolist() == [14.0, 15.0, 16.0, 17.0, 18.0, 19.0, 20.0]
+
+
+@pytest.mark.parametrize("batch", [8, 48])
+def test_spike_is_flagged_after_warmup(batch):
+    detector = make_detector(season_bins=1)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    rng = np.random.default_rng(9)
+    metrics = [{"timestamp": start + timedelta(seconds=i), "host": "web-1",
+                "cpu_percent": float(50 + rng.normal(0, 1))} for i in range(95)]
+    metrics.append({"timestamp": start + timedelta(seconds=95), "host": "web-1", "cpu_percent": 99.0})
+
+    anomalies = []
+    for offset in range(0, len(metrics), batch):
+        anomalies.extend(detector.process(metrics[offset:offset + batch]))
+
+    assert [anomaly["value"] for anomaly in anomalies] == [99.0]
+    anomaly = anomalies[0]
+    assert anomaly["kinds"] == ["zscore", "seasonal"]
+    assert anomaly["timestamp"] == start + timedelta(seconds=95)
+    assert anomaly["host"] == "web-1" and anomaly["field"] == "cpu_percent"
+    assert anomaly["z_score"] > 4 and anomaly["p50"] == pytest.approx(50, abs=1)
+    assert detector.get_stats() == {"series": 1, "samples": 96, "anomalies": 1}
+
+
+def test_missing_and_non_numeric_values_are_skipped():
+    detector = make_detector()
+    now = datetime.utcnow()
+    detector.process([
+        {"timestamp": now, "cpu_percent": True},
+        {"timestamp": now, "cpu_percent": "80"},
+        {"timestamp": now, "cpu_percent": float("nan")},
+        {"timestamp": None, "cpu_percent": 10.0},
+        {"timestamp": now, "source": "db-1", "cpu_percent": 12.5},
+    ])
+    assert detector.get_stats()["samples"] == 1
+    [state] = detector.get_state()
+    assert state["host"] == "db-1" and state["count"] == 1 and state["ewma"] == 12.5
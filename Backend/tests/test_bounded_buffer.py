@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from DataCollectors.BoundedBuffer import BLOCK, DROP_NEWEST, DROP_OLDEST, SAMPLE, BoundedBuffer
+
+
+def fill(buffer, count):
+    return [buffer.put_nowait(i) for i in range(count)]
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        BoundedBuffer(10, "unbounded")
+    with pytest.raises(ValueError):
+        BoundedBuffer(0)
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    buffer = BoundedBuffer(3, DROP_OLDEST)
+    assert fill(buffer, 5) == [True] * 5
+
+    assert list(buffer.items) == [2, 3, 4]
+    stats = buffer.get_stats()
+    assert (stats["depth"], stats["enqueued"], stats["dropped"]) == (3, 5, 2)
+
+
+def test_drop_newest_keeps_the_oldest_items():
+    buffer = BoundedBuffer(3, DROP_NEWEST)
+    assert fill(buffer, 5) == [True, True, True, False, False]
+    assert asyncio.run(buffer.put_many([5, 6])) == 2
+
+    assert list(buffer.items) == [0, 1, 2]
+    assert buffer.get_stats()["dropped"] == 4
+
+
+def test_sample_admits_one_in_n_overflowing_items():
+    buffer = BoundedBuffer(2, SAMPLE, sample_every=3)
+    fill(buffer, 2)
+    admitted = [buffer.put_nowait(i) for i in range(2, 11)]
+
+    # Overflows 3, 6 and 9 (items 4, 7 and 10) each evict the oldest item
+    assert admitted == [False, False, True, False, False, True, False, False, True]
+    assert list(buffer.items) == [7, 10]
+    assert buffer.get_stats()["dropped"] == 9
+
+
+def test_block_put_waits_for_the_consumer():
+    async def run():
+        buffer = BoundedBuffer(2, BLOCK)
+        await buffer.put_many([0, 1])
+        assert buffer.put_nowait(2) is False
+        producer = asyncio.create_task(buffer.put_many([3, 4, 5]))
+        await asyncio.sleep(0.01)
+        assert not producer.done() and buffer.full()
+
+        batches = []
+        while sum(map(len, batches)) < 5:
+            batches.append(await buffer.get_batch(2))
+        assert await producer == 0
+        return buffer, batches
+
+    buffer, batches = asyncio.run(run())
+    assert [item for batch in batches for item in batch] == [0, 1, 3, 4, 5]
+    stats = buffer.get_stats()
+    assert (stats["dropped"], stats["enqueued"]) == (1, 5)
+    assert stats["blocked_puts"] >= 1
+
+
+def test_get_batch_waits_for_an_item_and_takes_what_is_buffered():
+    async def run():
+        buffer = BoundedBuffer(10)
+        consumer = asyncio.create_task(buffer.get_batch(4))
+        await asyncio.sleep(0.01)
+        assert not consumer.done()
+        await buffer.put_many([1, 2, 3])
+        first = await consumer
+        await buffer.put_many(list(range(6)))
+        return first, await buffer.get_batch(4), await buffer.get(), buffer
+
+    first, second, single, buffer = asyncio.run(run())
+    assert (first, second, single) == ([1, 2, 3], [0, 1, 2, 3], 4)
+    assert buffer.qsize() == 1
+    buffer.get_nowait()
+    with pytest.raises(asyncio.QueueEmpty):
+        buffer.get_nowait()
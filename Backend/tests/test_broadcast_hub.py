@@ -0,0 +1,103 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from Services.BroadcastHub import BroadcastHub, SlowConsumerError
+
+
+def events(frames):
+    return {topic: json.loads(frame) for topic, frame in frames}
+
+
+def test_every_subscriber_receives_the_same_encoded_frame():
+    async def run():
+        hub = BroadcastHub(batch_window=0)
+        first, second = hub.subscribe(), hub.subscribe()
+        object_id = ObjectId()
+        hub.publish("logs", [{"_id": object_id, "timestamp": datetime(2024, 5, 1, 12, 0), "message": "a"}])
+        hub.publish("logs", [{"message": "b"}])
+        hub.publish("metrics", [])
+        return object_id, hub, await first.next_frames(), await second.next_frames()
+
+    object_id, hub, first, second = asyncio.run(run())
+
+    assert events(first) == {"logs": [{"_id": str(object_id), "timestamp": "2024-05-01T12:00:00", "message": "a"},
+                                      {"message": "b"}]}
+    # Subscribers at the same cursor share the frame built for the first one
+    assert first[0][1] is second[0][1]
+    assert hub.get_stats()["frames_sent"] == 2
+    assert hub.get_stats()["topics"]["logs"]["published"] == 2
+
+
+def test_subscribers_only_get_their_topics_and_newer_events():
+    async def run():
+        hub = BroadcastHub(batch_window=0)
+        hub.publish("logs", [{"message": "before"}])
+        logs_only = hub.subscribe(["logs", "unknown"])
+        both = hub.subscribe()
+        hub.publish("metrics", [{"cpu_percent": 10.0}])
+        hub.publish("logs", [{"message": "after"}])
+        return await logs_only.next_frames(), await both.next_frames()
+
+    logs_only, both = asyncio.run(run())
+    assert events(logs_only) == {"logs": [{"message": "after"}]}
+    assert events(both) == {"logs": [{"message": "after"}], "metrics": [{"cpu_percent": 10.0}]}
+    with pytest.raises(ValueError):
+        BroadcastHub().subscribe(["traces"])
+
+
+def test_waiting_subscriber_is_woken_by_publish_and_times_out_without_it():
+    async def run():
+        hub = BroadcastHub(batch_window=0.01)
+        subscription = hub.subscribe(["logs"])
+        assert await subscription.next_frames(timeout=0.01) == []
+        waiter = asyncio.create_task(subscription.next_frames(timeout=5))
+        await asyncio.sleep(0.01)
+        hub.publish("logs", [{"message": "first"}])
+        # Published inside the batch window: coalesced into the same frame
+        hub.publish("logs", [{"message": "second"}])
+        return await asyncio.wait_for(waiter, 1)
+
+    assert events(asyncio.run(run())) == {"logs": [{"message": "first"}, {"message": "second"}]}
+
+
+def test_frames_are_capped_near_max_frame_events():
+    async def run():
+        hub = BroadcastHub(batch_window=0, max_frame_events=3)
+        subscription = hub.subscribe(["logs"])
+        for i in range(0, 8, 2):
+            hub.publish("logs", [{"i": i}, {"i": i + 1}])
+        frames = []
+        while True:
+            batch = await subscription.next_frames(timeout=0)
+            if not batch:
+                return frames
+            frames.extend(json.loads(frame) for _, frame in batch)
+
+    frames = asyncio.run(run())
+    # Whole publish() chunks only: 2 + 2 events, then the remaining 4
+    assert [len(frame) for frame in frames] == [4, 4]
+    assert [event["i"] for frame in frames for event in frame] == list(range(8))
+
+
+def test_slow_subscriber_is_evicted_without_affecting_others():
+    async def run():
+        hub = BroadcastHub(batch_window=0, capacity=4)
+        slow, fast = hub.subscribe(["logs"]), hub.subscribe(["logs"])
+        hub.publish("logs", [{"i": 0}, {"i": 1}])
+        assert events(await fast.next_frames()) == {"logs": [{"i": 0}, {"i": 1}]}
+        hub.publish("logs", [{"i": 2}, {"i": 3}])
+        hub.publish("logs", [{"i": 4}, {"i": 5}])
+        with pytest.raises(SlowConsumerError):
+            await slow.next_frames()
+        return hub, slow, await fast.next_frames()
+
+    hub, slow, fast = asyncio.run(run())
+    assert events(fast) == {"logs": [{"i": 2}, {"i": 3}, {"i": 4}, {"i": 5}]}
+    assert slow.closed
+    stats = hub.get_stats()
+    assert (stats["subscribers"], stats["evictions"]) == (1, 1)
+    assert stats["topics"]["logs"]["held"] == 4
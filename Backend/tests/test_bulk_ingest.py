@@ -0,0 +1,181 @@
+import asyncio
+import gzip
+import json
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from pymongo.errors import BulkWriteError
+
+from Services.BulkIngest import BulkIngest, IngestLimitError, NdjsonDecoder, normalize_timestamps
+
+
+def ndjson(records):
+    return b"".join(json.dumps(record).encode() + b"\n" for record in records)
+
+
+def decode(body, chunk_size=7, **kwargs):
+    decoder = NdjsonDecoder(max_bytes=kwargs.pop("max_bytes", 1 << 20), **kwargs)
+    records = []
+    for start in range(0, len(body), chunk_size):
+        records.extend(decoder.feed(body[start:start + chunk_size]))
+    records.extend(decoder.finish())
+    return records, decoder
+
+
+def test_plain_body_split_across_chunks():
+    body = ndjson([{"i": i, "message": "x" * i} for i in range(20)])
+    records, decoder = decode(body)
+    assert [record["i"] for record in records] == list(range(20))
+    assert decoder.rejected == 0
+
+
+def test_last_line_without_newline_and_blank_lines():
+    records, _ = decode(b'{"a": 1}\n\n   \n{"a": 2}', chunk_size=1)
+    assert records == [{"a": 1}, {"a": 2}]
+
+
+def test_gzip_body_including_concatenated_members():
+    first = [{"i": i} for i in range(50)]
+    second = [{"i": i} for i in range(50, 80)]
+    body = gzip.compress(ndjson(first)) + gzip.compress(ndjson(second))
+    records, _ = decode(body, chunk_size=13)
+    assert [record["i"] for record in records] == list(range(80))
+
+
+def test_invalid_lines_are_counted_and_reported():
+    records, decoder = decode(b'{"ok": true}\nnot json\n[1, 2]\n{"ok": false}\n')
+    assert records == [{"ok": True}, {"ok": False}]
+    assert decoder.rejected == 2
+    assert decoder.errors == ["line 2: invalid JSON", "line 3: not a JSON object"]
+
+
+def test_decompressed_size_is_bounded():
+    # A few KB of gzip expanding to 10 MB must fail without inflating it all
+    bomb = gzip.compress(b'{"a": "' + b"0" * (10 << 20) + b'"}\n')
+    with pytest.raises(IngestLimitError):
+        decode(bomb, chunk_size=len(bomb), max_bytes=1 << 20, inflate_chunk=64 << 10)
+
+
+def test_line_length_is_bounded():
+    with pytest.raises(IngestLimitError):
+        decode(b'{"a": "' + b"0" * 200 + b'"}\n', max_line_bytes=100)
+
+
+def test_truncated_gzip_is_an_error():
+    body = gzip.compress(ndjson([{"i": i} for i in range(100)]))
+    with pytest.raises(zlib.error):
+        decode(body[:len(body) // 2])
+
+
+def test_normalize_timestamps_converts_every_form_to_naive_utc():
+    records = [
+        {"timestamp": 1704103200},
+        {"timestamp": 1704103200123},
+        {"timestamp": "2024-01-01T10:00:00"},
+        {"timestamp": "2024-01-01T10:00:00.5Z"},
+        {"timestamp": "2024-01-01T12:00:00+02:00"},
+        {"timestamp": datetime(2024, 1, 1, 10)},
+    ]
+    accepted, rejected = normalize_timestamps(records)
+
+    assert rejected == 0
+    assert [record["timestamp"] for record in accepted] == [
+        datetime(2024, 1, 1, 10),
+        datetime(2024, 1, 1, 10, 0, 0, 123000),
+        datetime(2024, 1, 1, 10),
+        datetime(2024, 1, 1, 10, 0, 0, 500000),
+        datetime(2024, 1, 1, 10),
+        datetime(2024, 1, 1, 10),
+    ]
+
+
+def test_normalize_timestamps_rejects_malformed_and_future_values():
+    future = (datetime.utcnow() + timedelta(days=3)).isoformat()
+    records = [
+        {"timestamp": "2024-01-01T10:00:00", "ok": 1},
+        {"timestamp": "yesterday"},
+        {"timestamp": future},
+        {"timestamp": float("nan")},
+        {"timestamp": True},
+        {"ok": 2},
+    ]
+    before = datetime.utcnow()
+    accepted, rejected = normalize_timestamps(records)
+
+    assert rejected == 4
+    assert [record["ok"] for record in accepted] == [1, 2]
+    assert accepted[0]["timestamp"] == datetime(2024, 1, 1, 10)
+    # Missing timestamps get the current time
+    assert accepted[1]["timestamp"] >= before
+
+
+class FailingStore:
+    """Async store_logs that fails on a given call, optionally after storing part of the batch"""
+
+    def __init__(self, fail_call=None, inserted=None):
+        self.fail_call = fail_call
+        self.inserted = inserted
+        self.stored = []
+        self.calls = 0
+
+    async def store_logs(self, batch):
+        self.calls += 1
+        if self.calls == self.fail_call:
+            if self.inserted is None:
+                raise ConnectionError("MongoDB unavailable")
+            self.stored.extend(batch[:self.inserted])
+            raise BulkWriteError({"nInserted": self.inserted, "writeErrors": [
+                {"index": self.inserted, "code": 1, "errmsg": "boom"}]})
+        self.stored.extend(batch)
+
+
+def ingest_lines(store, lines, batch_size=3):
+    async def body():
+        data = "".join(line + "\n" for line in lines).encode()
+        for start in range(0, len(data), 10):
+            yield data[start:start + 10]
+
+    stats = {}
+    ingest = BulkIngest(store, batch_size=batch_size)
+    try:
+        asyncio.run(ingest.ingest("logs", body(), stats=stats))
+    except (ConnectionError, BulkWriteError):
+        pass
+    return stats
+
+
+def log_lines(count):
+    return [json.dumps({"message": f"log {i}"}) for i in range(count)]
+
+
+def test_ingest_stores_batches_and_reports_progress():
+    store = FailingStore()
+    stats = ingest_lines(store, log_lines(7) + ["not json"])
+    assert [log["message"] for log in store.stored] == [f"log {i}" for i in range(7)]
+    assert (stats["accepted"], stats["stored"], stats["rejected"], stats["batches"]) == (7, 7, 1, 3)
+    assert store.stored[0]["source"] == "ingest" and store.stored[0]["level"] == "INFO"
+
+
+def test_failed_batch_reports_where_to_resume():
+    store = FailingStore(fail_call=2)
+    lines = log_lines(2) + ["", "{bad", json.dumps({"message": "log 2", "timestamp": "nope"})] + log_lines(9)[3:]
+    stats = ingest_lines(store, lines)
+
+    assert stats["stored"] == len(store.stored) == 2
+    # The first batch ended on line 5 (its "log 2" was rejected); everything after it is re-sent
+    assert stats["resume_line"] == 6
+    resent = FailingStore()
+    ingest_lines(resent, lines[stats["resume_line"] - 1:])
+    assert [log["message"] for log in store.stored + resent.stored] == \
+        ["log 0", "log 1"] + [f"log {i}" for i in range(3, 9)]
+
+
+def test_partially_inserted_batch_counts_its_stored_records():
+    store = FailingStore(fail_call=2, inserted=2)
+    lines = log_lines(9)
+    stats = ingest_lines(store, lines)
+
+    assert stats["stored"] == len(store.stored) == 5
+    assert lines[stats["resume_line"] - 1:] == lines[5:]
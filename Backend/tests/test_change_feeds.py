@@ -0,0 +1,61 @@
+import threading
+from datetime import datetime, timedelta
+
+
+def store(mongo_client, messages, timestamp=None):
+    timestamp = timestamp or datetime.utcnow()
+    mongo_client.store_logs([{"timestamp": timestamp, "level": "INFO", "message": message}
+                             for message in messages])
+
+
+def messages(changes):
+    return [item["message"] for item in changes["items"]]
+
+
+def test_first_poll_returns_the_newest_logs_and_a_watermark(mongo_client):
+    store(mongo_client, [f"log {i}" for i in range(5)])
+
+    changes = mongo_client.get_logs_since(limit=3)
+    assert messages(changes) == ["log 4", "log 3", "log 2"]
+    assert (changes["watermark"], changes["has_more"]) == (5, False)
+
+    assert mongo_client.get_logs_since(since=changes["watermark"]) == \
+        {"items": [], "watermark": 5, "has_more": False}
+
+
+def test_polling_pages_through_new_logs_without_gaps(mongo_client):
+    store(mongo_client, ["seen"])
+    watermark = mongo_client.get_logs_since()["watermark"]
+    store(mongo_client, [f"new {i}" for i in range(7)])
+    # Ingested later but timestamped earlier: the sequence still delivers it
+    store(mongo_client, ["late"], datetime.utcnow() - timedelta(hours=2))
+
+    received = []
+    while True:
+        changes = mongo_client.get_logs_since(since=watermark, limit=3)
+        received.extend(reversed(messages(changes)))
+        watermark = changes["watermark"]
+        if not changes["has_more"]:
+            break
+    assert received == [f"new {i}" for i in range(7)] + ["late"]
+    assert watermark == 9
+
+
+def test_projected_changes_keep_the_sequence(mongo_client):
+    mongo_client.store_metrics([{"timestamp": datetime.utcnow(), "cpu_percent": 5.0, "memory_percent": 20.0}])
+    changes = mongo_client.get_metrics_since(since=0, fields=["cpu_percent"])
+    [item] = changes["items"]
+    assert set(item) == {"_id", "_seq", "timestamp", "cpu_percent"}
+    assert changes["watermark"] == item["_seq"] == 1
+
+
+def test_concurrent_writers_get_distinct_sequence_numbers(mongo_client):
+    threads = [threading.Thread(target=store, args=(mongo_client, [f"t{n}-{i}" for i in range(20)]))
+               for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sequences = sorted(doc["_seq"] for doc in mongo_client.logs_collection.find({}, {"_seq": 1}))
+    assert sequences == list(range(1, 81))
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("pydriller")
+
+from DataCollectors import CommitsCollector as collector_module
+from DataCollectors.CommitsCollector import CommitsCollector, _extract_commits
+
+
+def make_history(git_repo, count):
+    return [git_repo({f"module_{i % 2}.py": f"value = {i}\n"}, f"change {i}") for i in range(count)]
+
+
+def test_commit_document_holds_diffs_and_stats_only(git_repo):
+    from pydriller import Git
+
+    first = git_repo({"app.py": "a = 1\n"}, "add app")
+    second = git_repo({"app.py": "a = 2\n"}, "bump app")
+    git = Git(git_repo.path)
+    try:
+        documents = _extract_commits(git, "demo-repo", [first, second])
+    finally:
+        git.clear()
+
+    assert [doc["hash"] for doc in documents] == [first, second]
+    document = documents[1]
+    assert (document["message"], document["author"], document["repo_name"]) == ("bump app", "Test Author", "demo-repo")
+    assert (document["added_lines"], document["deleted_lines"]) == (1, 1)
+    file = document["files"][0]
+    assert set(file) == {"filename", "change_type", "added_lines", "deleted_lines", "changed_methods", "diff"}
+    assert (file["filename"], file["change_type"]) == ("app.py", "MODIFY")
+    assert "-a = 1\n+a = 2" in file["diff"]
+
+
+def test_process_pool_stores_every_commit_in_order(mongo_client, git_repo, monkeypatch):
+    hashes = make_history(git_repo, 7)
+    checkpoints = []
+    set_checkpoint = mongo_client.set_sync_checkpoint
+    monkeypatch.setattr(mongo_client, "set_sync_checkpoint",
+                        lambda repo, last_hash: (checkpoints.append(last_hash), set_checkpoint(repo, last_hash)))
+    collector = CommitsCollector(git_repo.path, mongo_client=mongo_client)
+
+    assert collector.sync_commits(batch_size=3, workers=2) == 7
+
+    # One checkpoint per chunk, moving forward through the history
+    assert checkpoints == [hashes[2], hashes[5], hashes[6]]
+    stored = mongo_client.get_commits(limit=10, repo_name="demo-repo")
+    assert sorted(commit["hash"] for commit in stored) == sorted(hashes)
+    assert all(commit["files"][0]["diff"] for commit in stored)
+    assert collector.sync_commits(batch_size=3, workers=2) == 0
+
+
+def test_single_chunk_is_mined_in_process(mongo_client, git_repo, monkeypatch):
+    hashes = make_history(git_repo, 4)
+    collector = CommitsCollector(git_repo.path, mongo_client=mongo_client)
+    collector.sync_commits(batch_size=2, workers=2)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a single chunk should not start a process pool")
+
+    monkeypatch.setattr(collector_module, "ProcessPoolExecutor", no_pool)
+    hashes += make_history(git_repo, 2)
+    assert collector.sync_commits(batch_size=2, workers=2) == 2
+    assert mongo_client.get_sync_checkpoint("demo-repo") == hashes[-1]
+    assert mongo_client.commits_collection.count_documents({}) == 6
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+DIFF = "@@ -1 +1 @@\n-old\n+new\n"
+
+
+def commit(hash, diff=DIFF, repo="demo", **fields):
+    return {"hash": hash, "message": f"commit {hash}", "timestamp": datetime(2024, 5, 1, 12, 0),
+            "repo_name": repo, "files": [{"filename": "app.py", "diff": diff, "added_lines": 1}], **fields}
+
+
+def test_identical_diffs_are_stored_once(mongo_client):
+    # The same patch cherry-picked, and applied in a second repository
+    commits = [commit("a1"), commit("b2"), commit("c3", repo="fork")]
+    assert len(mongo_client.store_commits(commits)) == 3
+
+    assert mongo_client.commit_blobs_collection.count_documents({}) == 1
+    blob = mongo_client.commit_blobs_collection.find_one()
+    assert (blob["content"], blob["size"]) == (DIFF, len(DIFF))
+    stored = mongo_client.commits_collection.find_one({"hash": "a1"})
+    assert stored["files"][0]["diff_blob"] == blob["_id"]
+    assert "diff" not in stored["files"][0]
+    # Callers keep their diffs
+    assert commits[0]["files"][0]["diff"] == DIFF
+
+
+def test_restoring_a_commit_is_a_no_op(mongo_client):
+    assert len(mongo_client.store_commits([commit("a1")])) == 1
+    assert len(mongo_client.store_commits([commit("a1", message="rewritten"), commit("b2", diff="+other\n")])) == 1
+
+    assert mongo_client.store_commits([commit("a1"), commit("b2")]) == []
+    assert mongo_client.store_commit(commit("a1")) == ""
+    assert mongo_client.commits_collection.count_documents({}) == 2
+    assert mongo_client.commits_collection.find_one({"hash": "a1"})["message"] == "commit a1"
+    assert mongo_client.commit_blobs_collection.count_documents({}) == 2
+
+
+def test_reads_resolve_diffs_from_blobs(mongo_client):
+    mongo_client.store_commits([commit("a1"), commit("b2", diff="+other\n")])
+
+    commits = {c["hash"]: c for c in mongo_client.get_commits(limit=10)}
+    assert commits["a1"]["files"][0]["diff"] == DIFF
+    assert commits["b2"]["files"][0]["diff"] == "+other\n"
+    batches = list(mongo_client.iter_commits(batch_size=1))
+    assert sorted(batch[0]["files"][0]["diff"] for batch in batches) == ["+other\n", DIFF]
+
+    light = mongo_client.get_commits(limit=10, include_diff=False)
+    assert all("diff_blob" in c["files"][0] and "diff" not in c["files"][0] for c in light)
+
+
+def test_commits_without_a_hash_are_inserted(mongo_client):
+    ids = mongo_client.store_commits([{"message": "imported", "timestamp": "2024-05-01T12:00:00Z", "files": []}])
+    assert len(ids) == 1
+    assert len(mongo_client.store_commits([{"message": "imported", "files": []}])) == 1
+    assert mongo_client.commits_collection.count_documents({"message": "imported"}) == 2
+
+
+def test_sync_checkpoint_round_trip(mongo_client):
+    assert mongo_client.get_sync_checkpoint("demo") is None
+    mongo_client.set_sync_checkpoint("demo", "a1")
+    mongo_client.set_sync_checkpoint("demo", "b2")
+    mongo_client.set_sync_checkpoint("other", "c3")
+    assert (mongo_client.get_sync_checkpoint("demo"), mongo_client.get_sync_checkpoint("other")) == ("b2", "c3")
+
+
+def test_incremental_sync_resumes_from_the_checkpoint(mongo_client, git_repo):
+    pytest.importorskip("pydriller")
+    from DataCollectors.CommitsCollector import CommitsCollector
+
+    hashes = [git_repo({"app.py": f"version {i}\n"}, f"change {i}") for i in range(3)]
+    collector = CommitsCollector(git_repo.path, mongo_client=mongo_client)
+
+    assert collector.sync_commits(batch_size=2, workers=1) == 3
+    assert mongo_client.get_sync_checkpoint("demo-repo") == hashes[-1]
+    assert collector.sync_commits(batch_size=2, workers=1) == 0
+
+    hashes.append(git_repo({"app.py": "version 3\n"}, "change 3"))
+    assert collector.sync_commits(batch_size=2, workers=1) == 1
+    assert mongo_client.get_sync_checkpoint("demo-repo") == hashes[-1]
+    stored = mongo_client.get_commits(limit=10, repo_name="demo-repo")
+    assert sorted(c["hash"] for c in stored) == sorted(hashes)
+    assert stored[0]["files"][0]["diff"].endswith("+version 3\n")
+
+
+def test_unreachable_checkpoint_falls_back_to_a_full_resync(mongo_client, git_repo):
+    pytest.importorskip("pydriller")
+    from DataCollectors.CommitsCollector import CommitsCollector
+
+    git_repo({"app.py": "one\n"}, "first")
+    mongo_client.set_sync_checkpoint("demo-repo", "0" * 40)
+    collector = CommitsCollector(git_repo.path, mongo_client=mongo_client)
+
+    assert collector.sync_commits(workers=1) == 1
+    assert mongo_client.commits_collection.count_documents({}) == 1
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+
+from DataCollectors.FileTailCollector import FileTailCollector
+
+TRACEBACK = [
+    "2024-01-01 10:00:01 ERROR request failed",
+    "Traceback (most recent call last):",
+    '  File "app.py", line 10, in handler',
+]
+
+
+async def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+def append(path, lines):
+    with open(path, "a") as f:
+        f.write("".join(line + "\n" for line in lines))
+
+
+def checkpoint_offset(tailer, path):
+    tailer.save_checkpoints()
+    with open(tailer.checkpoint_path) as f:
+        return json.load(f)[str(path)]["offset"]
+
+
+def make_tailer(tmp_path, path, received, **kwargs):
+    return FileTailCollector([str(path)], callback=lambda kind, records: received.extend(records),
+                             checkpoint_path=str(tmp_path / "checkpoints.json"), poll_interval=0.02,
+                             checkpoint_interval=60, start_at_end=False, **kwargs)
+
+
+def test_checkpoint_stops_before_the_held_back_event(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("")
+    received = []
+
+    async def run():
+        tailer = make_tailer(tmp_path, path, received, multiline_timeout=60)
+        await tailer.start()
+        append(path, ["2024-01-01 10:00:00 INFO started"] + TRACEBACK)
+        await wait_for(lambda: len(received) == 1)
+        await asyncio.sleep(0.1)
+
+        # The traceback may still grow, so it is neither delivered nor checkpointed
+        offset = checkpoint_offset(tailer, path)
+        assert path.read_bytes()[offset:].startswith(TRACEBACK[0].encode())
+
+        append(path, ["ValueError: bad input", "2024-01-01 10:00:02 INFO recovered"])
+        await wait_for(lambda: len(received) == 3)
+        assert received[1]["exception_type"] == "ValueError"
+        assert checkpoint_offset(tailer, path) == path.stat().st_size
+        await tailer.stop()
+
+    asyncio.run(run())
+
+
+def test_restart_rereads_only_undelivered_data(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("")
+    first, second = [], []
+
+    async def run():
+        tailer = make_tailer(tmp_path, path, first, multiline_timeout=60)
+        await tailer.start()
+        append(path, ["2024-01-01 10:00:00 INFO started"] + TRACEBACK)
+        await wait_for(lambda: len(first) == 1)
+        # Simulate a crash: keep the periodic checkpoint, lose the in-memory state
+        checkpoint_offset(tailer, path)
+        tailer.callback = None
+        await tailer.stop()
+
+        append(path, ["KeyError: 'id'"])
+        restarted = make_tailer(tmp_path, path, second)
+        await restarted.start()
+        await wait_for(lambda: len(second) == 1)
+        await restarted.stop()
+
+    asyncio.run(run())
+    assert [record["message"].split("\n")[0] for record in first] == ["2024-01-01 10:00:00 INFO started"]
+    assert second[0]["exception_type"] == "KeyError"
+    assert second[0]["message"].startswith(TRACEBACK[0])
+
+
+def test_truncation_restarts_at_the_beginning(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("")
+    received = []
+
+    async def run():
+        tailer = make_tailer(tmp_path, path, received)
+        await tailer.start()
+        append(path, ["2024-01-01 10:00:00 INFO one", "2024-01-01 10:00:01 INFO two"])
+        await wait_for(lambda: len(received) == 2)
+        path.write_text("2024-01-01 10:00:02 INFO three\n")
+        await wait_for(lambda: len(received) == 3)
+        assert tailer.get_stats()["truncations"] == 1
+        assert checkpoint_offset(tailer, path) == path.stat().st_size
+        await tailer.stop()
+
+    asyncio.run(run())
+
+
+def test_stats_are_a_snapshot_of_the_reader(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("")
+    received = []
+
+    async def run():
+        tailer = make_tailer(tmp_path, path, received)
+        await tailer.start()
+        append(path, ["2024-01-01 10:00:00 INFO one"])
+        await wait_for(lambda: tailer.get_stats()["lines"] == 1)
+        stats = tailer.get_stats()
+        assert stats["files"] == [str(path)]
+        append(path, ["2024-01-01 10:00:01 INFO two"])
+        await wait_for(lambda: tailer.get_stats()["lines"] == 2)
+        # An earlier snapshot is not changed by later reads
+        assert stats["lines"] == 1
+        await tailer.stop()
+
+    asyncio.run(run())
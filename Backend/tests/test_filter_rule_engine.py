@@ -0,0 +1,154 @@
+import json
+import os
+import random
+from fnmatch import fnmatchcase
+
+import pytest
+
+from Services.FilterRuleEngine import FilterRuleEngine
+
+RULES = [
+    {"name": "drop_health", "action": "drop", "endpoints": ["/health", "/metrics*"]},
+    {"name": "slow_api", "action": "keep", "endpoints": ["/api/*"], "min_latency_ms": 500},
+    {"name": "server_errors", "action": "keep", "status": [[500, 599], 429]},
+    {"name": "drop_noisy_warnings", "action": "drop", "levels": ["warning"], "message_contains": ["retrying"]},
+    {"name": "errors", "action": "keep", "levels": ["ERROR", "WARNING"]},
+    {"name": "fast_writes", "action": "keep", "endpoints": ["/api/orders"], "max_latency_ms": 5,
+     "status": [201]},
+    {"name": "payment_words", "action": "keep", "message_contains": ["Payment", "pay", "refund failed"]},
+]
+
+
+def write_config(path, rules, default="drop"):
+    path.write_text(json.dumps({"default": default, "rules": rules}))
+    return str(path)
+
+
+def reference_match(rules, record):
+    """Plain first-match evaluation of the rule semantics"""
+    for index, rule in enumerate(rules):
+        level = record.get("level")
+        status = record.get("status_code")
+        endpoint = record.get("endpoint")
+        latency = record.get("latency_ms")
+        message = record.get("message")
+        numeric = isinstance(latency, (int, float))
+        if "levels" in rule and not (isinstance(level, str)
+                                     and level.upper() in [str(item).upper() for item in rule["levels"]]):
+            continue
+        if "status" in rule:
+            ranges = [item if isinstance(item, list) else [item, item] for item in rule["status"]]
+            if not isinstance(status, int) or not any(low <= status <= high for low, high in ranges):
+                continue
+        if "endpoints" in rule and not (isinstance(endpoint, str)
+                                        and any(fnmatchcase(endpoint, pattern) for pattern in rule["endpoints"])):
+            continue
+        if "min_latency_ms" in rule and not (numeric and latency >= rule["min_latency_ms"]):
+            continue
+        if "max_latency_ms" in rule and not (numeric and latency <= rule["max_latency_ms"]):
+            continue
+        if "message_contains" in rule and not (isinstance(message, str) and any(
+                substring.lower() in message.lower() for substring in rule["message_contains"])):
+            continue
+        return index
+    return -1
+
+
+def random_record(rng):
+    record = {}
+    if rng.random() < 0.9:
+        record["level"] = rng.choice(["ERROR", "error", "WARNING", "Warning", "INFO", "DEBUG"])
+    if rng.random() < 0.8:
+        record["status_code"] = rng.choice([200, 201, 404, 429, 500, 503, 599, 600, 1000])
+    if rng.random() < 0.8:
+        record["endpoint"] = rng.choice(["/health", "/metrics", "/metrics/host", "/api/orders",
+                                         "/api/users/7", "/login", "/API/orders"])
+    if rng.random() < 0.8:
+        record["latency_ms"] = rng.choice([0, 3, 5, 5.5, 120, 499.9, 500, 2500])
+    if rng.random() < 0.9:
+        record["message"] = rng.choice(["ok", "Retrying upstream", "PAYMENT declined", "repayment scheduled",
+                                        "refund failed twice", "refund ok", ""])
+    return record
+
+
+def test_compiled_rules_agree_with_first_match_semantics(tmp_path):
+    engine = FilterRuleEngine(config_path=write_config(tmp_path / "rules.json", RULES))
+    rng = random.Random(7)
+    records = [random_record(rng) for _ in range(3000)]
+
+    kept = engine.filter(records)
+
+    expected_indexes = [reference_match(RULES, record) for record in records]
+    assert [engine.compiled.match(record) for record in records] == expected_indexes
+    expected_kept = [record for record, index in zip(records, expected_indexes)
+                     if index >= 0 and RULES[index]["action"] == "keep"]
+    assert kept == expected_kept
+    hits = {rule["name"]: rule["hits"] for rule in engine.get_stats()["rules"]}
+    assert hits["errors"] == expected_indexes.count(4)
+
+
+def test_defaults_keep_errors_and_warnings(tmp_path):
+    engine = FilterRuleEngine(config_path=str(tmp_path / "missing.json"))
+    records = [{"level": "ERROR"}, {"level": "INFO"}, {"level": "WARNING"}, {}]
+    assert engine.filter(records) == [{"level": "ERROR"}, {"level": "WARNING"}]
+
+
+def test_default_action_applies_when_no_rule_matches(tmp_path):
+    engine = FilterRuleEngine(config_path=write_config(
+        tmp_path / "rules.json", [{"action": "drop", "levels": ["DEBUG"]}], default="keep"))
+    assert engine.filter([{"level": "DEBUG"}, {"level": "INFO"}]) == [{"level": "INFO"}]
+
+
+def test_extra_rules_are_checked_first(tmp_path):
+    engine = FilterRuleEngine(config_path=write_config(tmp_path / "rules.json", [{"action": "drop"}]),
+                              extra_rules=[{"name": "status_filter", "action": "keep", "status": [[400, 499]]}])
+    assert engine.filter([{"status_code": 404}, {"status_code": 200}]) == [{"status_code": 404}]
+
+
+def test_changed_file_is_reloaded_and_invalid_files_are_ignored(tmp_path):
+    path = tmp_path / "rules.json"
+    engine = FilterRuleEngine(config_path=write_config(path, [{"action": "keep", "levels": ["ERROR"]}]),
+                              reload_interval=0)
+    assert engine.filter([{"level": "INFO"}]) == []
+
+    write_config(path, [{"action": "keep", "levels": ["INFO"]}])
+    os.utime(path, (1, 1))
+    assert engine.filter([{"level": "INFO"}]) == [{"level": "INFO"}]
+
+    path.write_text('{"rules": [{"action": "maybe"}]}')
+    os.utime(path, (2, 2))
+    assert engine.filter([{"level": "INFO"}]) == [{"level": "INFO"}]
+    assert engine.get_stats()["reloads"] == 2
+
+
+@pytest.mark.parametrize("bad_rule", [
+    {"action": "keep", "min_latency_ms": "slow"},
+    {"action": "keep", "max_latency_ms": True},
+    {"action": "keep", "endpoints": [42]},
+])
+def test_invalid_rule_values_keep_the_previous_rules(tmp_path, bad_rule):
+    path = tmp_path / "rules.json"
+    engine = FilterRuleEngine(config_path=write_config(path, [{"action": "keep", "levels": ["ERROR"]}]),
+                              reload_interval=0)
+
+    write_config(path, [bad_rule])
+    os.utime(path, (1, 1))
+    for _ in range(3):
+        assert engine.filter([{"level": "ERROR", "latency_ms": 5}, {"level": "INFO"}]) == \
+            [{"level": "ERROR", "latency_ms": 5}]
+    assert engine.get_stats()["reloads"] == 1
+
+
+@pytest.mark.parametrize("config", [
+    [],
+    {"default": "maybe", "rules": []},
+    {"rules": [{"action": "keep", "colour": ["red"]}]},
+    {"rules": [{"action": "keep", "levels": "ERROR"}]},
+    {"rules": [{"action": "keep", "status": [[500]]}]},
+    {"rules": ["keep everything"]},
+    {"rules": [{"action": "keep", "min_latency_ms": "100"}]},
+    {"rules": [{"action": "keep", "endpoints": ["/api/*", None]}]},
+])
+def test_invalid_configs_are_rejected(config):
+    with pytest.raises(ValueError):
+        FilterRuleEngine.validate(config)
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from DataCollectors import HostMetricsCollector as host_module
+from DataCollectors.HostMetricsCollector import HostMetricsCollector, _parse_pid_stat
+
+NET_HEADER = ("Inter-|   Receive                                                |  Transmit\n"
+              " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets\n")
+
+
+def pid_stat(pid, name, utime, stime, start_time=1000, threads=4, rss=25600):
+    # state ppid pgrp session tty tpgid flags minflt cminflt majflt cmajflt utime stime
+    # cutime cstime priority nice num_threads itrealvalue starttime vsize rss ...
+    return (f"{pid} ({name}) S 1 1 1 0 -1 4194560 100 0 0 0 {utime} {stime} 0 0 20 0 {threads} 0 "
+            f"{start_time} 1000000 {rss} 18446744073709551615 0 0 0\n")
+
+
+class FakeProc:
+    def __init__(self, root):
+        self.root = root
+        (root / "net").mkdir(parents=True)
+        (root / "self").mkdir()
+
+    def write(self, cpu, disk_read, net, processes):
+        self.root.joinpath("stat").write_text(f"cpu  {cpu}\ncpu0 1 2 3 4 5 6 7 8\nintr 1\n")
+        self.root.joinpath("meminfo").write_text(
+            "MemTotal:        8192000 kB\nMemFree:          512000 kB\nMemAvailable:    2048000 kB\n"
+            "Buffers:          100000 kB\nCached:          900000 kB\nSwapCached:            0 kB\n"
+            "SwapTotal:       1024000 kB\nSwapFree:         512000 kB\n")
+        self.root.joinpath("diskstats").write_text(
+            f"   7       0 loop0 10 0 999 0 0 0 0 0 0 0 0\n"
+            f"   8       0 sda 100 0 {disk_read} 0 50 0 4000 0 0 0 0\n"
+            f"   8       1 sda1 100 0 {disk_read} 0 50 0 4000 0 0 0 0\n")
+        rx, tx = net
+        self.root.joinpath("net/dev").write_text(
+            NET_HEADER + "    lo: 99999 1 0 0 0 0 0 0 99999 1 0 0 0 0 0 0\n"
+            f"  eth0: {rx} 10 0 0 0 0 0 0 {tx} 20 0 0 0 0 0 0\n")
+        self.root.joinpath("loadavg").write_text("0.50 0.40 0.30 1/123 4567\n")
+        for pid in [entry.name for entry in self.root.iterdir() if entry.name.isdigit()]:
+            if pid not in processes:
+                self.root.joinpath(pid, "stat").unlink()
+                self.root.joinpath(pid).rmdir()
+        for pid, stat in processes.items():
+            self.root.joinpath(pid).mkdir(exist_ok=True)
+            self.root.joinpath(pid, "stat").write_text(stat)
+
+
+@pytest.fixture
+def proc(tmp_path, monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(host_module, "time", SimpleNamespace(monotonic=lambda: clock.now,
+                                                             thread_time=time.thread_time))
+    fake = FakeProc(tmp_path / "proc")
+    fake.clock = clock
+    return fake
+
+
+def make_collector(proc, **kwargs):
+    collector = HostMetricsCollector(proc_root=str(proc.root), **kwargs)
+    collector.clock_ticks = 100
+    collector.page_mb = 4096 / (1024 * 1024)
+    collector.disks = {"sda"}
+    return collector
+
+
+def test_pid_stat_name_may_contain_spaces_and_parentheses():
+    name, fields = _parse_pid_stat(pid_stat(42, "my app) (x", 7, 3).encode())
+    assert name == b"my app) (x"
+    assert (fields[0], fields[11], fields[12], fields[17], fields[19], fields[21]) == \
+        (b"S", b"7", b"3", b"4", b"1000", b"25600")
+
+
+def test_rates_are_computed_from_the_previous_sample(proc):
+    proc.write("100 0 100 700 100 0 0 0", 2000, (5000, 8000),
+               {"1": pid_stat(1, "init", 100, 50), "42": pid_stat(42, "my app) (x", 10, 0)})
+    collector = make_collector(proc)
+    assert collector.sample() is None
+
+    proc.clock.now += 2
+    proc.write("250 0 250 1200 200 50 50 0", 6000, (9000, 10000),
+               {"1": pid_stat(1, "init", 100, 50), "42": pid_stat(42, "my app) (x", 110, 50, threads=9),
+                "77": pid_stat(77, "new", 500, 0)})
+    metric = collector.sample()
+
+    assert (metric["metric_type"], metric["source"]) == ("system", "host")
+    # 1000 ticks elapsed, 600 of them idle or iowait, 100 iowait
+    assert (metric["cpu_percent"], metric["cpu_iowait_percent"]) == (40.0, 10.0)
+    assert (metric["memory_percent"], metric["memory_used_mb"], metric["memory_total_mb"]) == (75.0, 6000, 8000)
+    assert metric["swap_used_mb"] == 500
+    assert (metric["load_1m"], metric["load_5m"], metric["load_15m"]) == (0.5, 0.4, 0.3)
+    # Whole disks only: partitions and loop devices are not counted twice
+    assert (metric["disk_read_bytes_per_sec"], metric["disk_write_bytes_per_sec"]) == (1024000, 0)
+    # Loopback traffic is excluded
+    assert (metric["net_rx_bytes_per_sec"], metric["net_tx_bytes_per_sec"]) == (2000, 1000)
+    assert metric["process_count"] == 3
+    # Idle and newly seen processes have no CPU share to report
+    assert metric["top_processes"] == [
+        {"pid": 42, "name": "my app) (x", "cpu_percent": 75.0, "rss_mb": 100.0, "threads": 9}]
+
+
+def test_memory_available_falls_back_on_older_kernels(proc):
+    proc.write("100 0 100 700 100 0 0 0", 0, (0, 0), {})
+    proc.root.joinpath("meminfo").write_text("MemTotal: 1024000 kB\nMemFree: 256000 kB\n"
+                                             "Buffers: 128000 kB\nCached: 128000 kB\n")
+    collector = make_collector(proc)
+    collector.sample()
+    proc.clock.now += 1
+    metric = collector.sample()
+    assert (metric["memory_used_mb"], metric["memory_percent"]) == (500, 50.0)
+
+
+def test_process_files_stay_open_until_the_process_exits(proc):
+    processes = {str(pid): pid_stat(pid, f"worker{pid}", 0, 0) for pid in (10, 11, 12)}
+    proc.write("100 0 100 700 100 0 0 0", 0, (0, 0), processes)
+    collector = make_collector(proc, max_process_handles=2)
+    collector.sample()
+    assert collector.open_handles == 2
+
+    # pid 12 has no open handle but is still measured; pid 11 was reused by a new process
+    proc.clock.now += 1
+    processes.update({"10": pid_stat(10, "worker10", 20, 0), "11": pid_stat(11, "other", 90, 0, start_time=5000),
+                      "12": pid_stat(12, "worker12", 30, 0)})
+    proc.write("200 0 200 800 100 0 0 0", 0, (0, 0), processes)
+    metric = collector.sample()
+    assert [(top["pid"], top["cpu_percent"]) for top in metric["top_processes"]] == [(12, 30.0), (10, 20.0)]
+
+    del processes["10"]
+    proc.clock.now += 1
+    proc.write("300 0 300 900 100 0 0 0", 0, (0, 0), processes)
+    metric = collector.sample()
+    assert metric["process_count"] == 2
+    assert sorted(collector.processes) == ["11", "12"]
+    assert collector.open_handles == 1
+
+    asyncio.run(collector.stop())
+    assert (collector.open_handles, collector.files, collector.processes) == (0, {}, {})
+    assert collector.get_stats()["samples"] == 2
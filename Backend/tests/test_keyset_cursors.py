@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from Services.HotTier import HotTier
+from Services.MongoClient import MongoDBClient
+
+
+def make_logs(count, start=None):
+    """Logs with sub-millisecond timestamps, several sharing each millisecond"""
+    start = start or datetime.utcnow() + timedelta(seconds=1)
+    return [{"timestamp": start + timedelta(microseconds=(i // 3) * 1000 + 123 + i),
+             "level": "ERROR", "message": f"event {i}"} for i in range(count)]
+
+
+def walk_older(mongo_client, first_page, limit):
+    """Follow next cursors (?before=) from a first page until the last page"""
+    pages = [first_page]
+    while len(pages[-1]) >= limit:
+        cursor = MongoDBClient.encode_cursor(pages[-1][-1])
+        pages.append(mongo_client.get_logs(limit=limit, before=cursor))
+    return pages
+
+
+def ids(logs):
+    return [str(log["_id"]) for log in logs]
+
+
+def test_cursor_round_trip():
+    object_id = ObjectId()
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    cursor = MongoDBClient.encode_cursor({"timestamp": timestamp, "_id": str(object_id)})
+    assert MongoDBClient.decode_cursor(cursor) == (timestamp, object_id)
+
+
+def test_malformed_cursor_is_rejected(mongo_client):
+    with pytest.raises(ValueError):
+        MongoDBClient.decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        mongo_client.get_logs(limit=10, before="not-a-cursor")
+
+
+def test_pages_cover_every_log_once_in_both_directions(mongo_client):
+    mongo_client.store_logs(make_logs(23))
+    expected = ids(mongo_client.get_logs(limit=100))
+    assert len(expected) == 23
+
+    pages = walk_older(mongo_client, mongo_client.get_logs(limit=5), 5)
+    assert ids(log for page in pages for log in page) == expected
+
+    # Walking back with ?after= from the oldest page returns the same pages
+    newer = [pages[-1]]
+    while True:
+        page = mongo_client.get_logs(limit=5, after=MongoDBClient.encode_cursor(newer[-1][0]))
+        if not page:
+            break
+        newer.append(page)
+    assert ids(log for page in reversed(newer) for log in page) == expected
+
+
+def test_hot_tier_first_page_continues_into_mongodb(mongo_client):
+    hot_tier = HotTier(log_capacity=100)
+    logs = make_logs(20)
+    # Out of timestamp order, as file tails and bulk ingest deliver them
+    logs = logs[10:] + logs[:10]
+    hot_tier.add_logs(logs)
+    mongo_client.store_logs(logs)
+    expected = ids(mongo_client.get_logs(limit=100))
+
+    first_page = hot_tier.recent_logs(limit=6)
+    assert first_page is not None
+    assert ids(first_page) == expected[:6]
+    # Hot-tier timestamps have MongoDB's millisecond precision, so cursors agree
+    assert [log["timestamp"] for log in first_page] == \
+        [log["timestamp"] for log in mongo_client.get_logs(limit=6)]
+
+    pages = walk_older(mongo_client, first_page, 6)
+    assert ids(log for page in pages for log in page) == expected
+    assert mongo_client.get_logs(limit=6, after=MongoDBClient.encode_cursor(first_page[0])) == []
+
+
+def test_hot_tier_falls_through_after_evicting_newer_logs():
+    hot_tier = HotTier(log_capacity=4)
+    logs = make_logs(6)
+    # The newest log arrives first and is evicted by older ones
+    hot_tier.add_logs([logs[-1]] + logs[:-1])
+    assert hot_tier.recent_logs(limit=4) is None
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from Services.KeywordMatcher import KeywordMatcher
+
+
+def naive_find_all(patterns, text, case_sensitive=False, whole_words=False):
+    """Every overlapping occurrence, ordered by end position then longest first"""
+    if not case_sensitive:
+        text = text.lower()
+    found = []
+    for pattern, name in patterns.items():
+        key = pattern if case_sensitive else pattern.lower()
+        start = text.find(key)
+        while start >= 0:
+            end = start + len(key)
+            bounded = not ((start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"))
+                           or (end < len(text) and (text[end].isalnum() or text[end] == "_")))
+            if bounded or not whole_words:
+                found.append((end, -len(key), name, start))
+            start = text.find(key, start + 1)
+    return [(name, start, end) for end, _, name, start in sorted(found)]
+
+
+@pytest.mark.parametrize("case_sensitive,whole_words", [(False, False), (True, False), (False, True)])
+def test_matches_agree_with_naive_search(case_sensitive, whole_words):
+    rng = random.Random(11)
+    alphabet = "abAB _"
+    patterns = {}
+    while len(patterns) < 40:
+        pattern = "".join(rng.choice("abAB") for _ in range(rng.randint(1, 5)))
+        key = pattern if case_sensitive else pattern.lower()
+        if all((p if case_sensitive else p.lower()) != key for p in patterns):
+            patterns[pattern] = f"sig_{len(patterns)}"
+    matcher = KeywordMatcher(patterns, case_sensitive=case_sensitive, whole_words=whole_words)
+
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        expected = naive_find_all(patterns, text, case_sensitive, whole_words)
+        assert matcher.find_all(text) == expected
+        assert matcher.search(text) == bool(expected)
+
+
+def test_overlapping_patterns_are_all_reported():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    assert matcher.find_all("ushers") == [("she", 1, 4), ("he", 2, 4), ("hers", 2, 6)]
+    assert matcher.matches("ushers she") == ["she", "he", "hers"]
+
+
+def test_signature_names_and_per_pattern_whole_word():
+    matcher = KeywordMatcher({"timeout": "timeouts", "Timed Out": "timeouts"})
+    matcher.add("err", "errors", whole_word=True)
+    assert matcher.matches("Request TIMED OUT after timeout") == ["timeouts"]
+    assert not matcher.search("stderr output")
+    assert matcher.find_all("err: disk") == [("errors", 0, 3)]
+
+
+def test_patterns_added_and_removed_after_scanning():
+    matcher = KeywordMatcher(["fail"])
+    assert matcher.matches("failover") == ["fail"]
+
+    matcher.add("over")
+    matcher.add("FAIL", "failure")
+    assert matcher.matches("failover") == ["failure", "over"]
+    assert len(matcher) == 2 and "Fail" in matcher
+
+    assert matcher.remove("fail")
+    assert not matcher.remove("fail")
+    assert matcher.matches("failover") == ["over"]
+
+
+def test_empty_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        KeywordMatcher([""])
@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faker")
+
+from DataCollectors.Telemenetry import TelemetryGenerator
+
+
+def collecting_generator(**kwargs):
+    received = {"log": [], "metric": []}
+    generator = TelemetryGenerator(callback=lambda kind, batch: received[kind].extend(batch), **kwargs)
+    generator.rng = np.random.default_rng(7)
+    return generator, received
+
+
+def test_log_batch_has_the_fields_and_distributions_of_single_logs():
+    generator, _ = collecting_generator()
+    start = np.datetime64("2024-05-01T12:00:00", "us")
+    timestamps = start + np.arange(5000).astype("timedelta64[ms]")
+    logs = generator.generate_log_batch(5000, timestamps)
+
+    assert len(logs) == 5000
+    assert logs[1]["timestamp"] == "2024-05-01T12:00:00.001000"
+    assert set(logs[0]) == {"timestamp", "level", "user", "ip", "method", "endpoint", "status_code",
+                            "request_id", "latency_ms", "cpu_spike", "message"}
+    users = {user["username"]: user["ip"] for user in generator.users}
+    methods = dict(generator.endpoints)
+    for log in logs:
+        assert users[log["user"]] == log["ip"]
+        assert log["method"] in methods[log["endpoint"]]
+        assert log["status_code"] in generator.status_codes
+        assert log["cpu_spike"] == (log["status_code"] >= 500)
+        assert log["latency_ms"] >= 1
+        assert isinstance(log["status_code"], int) and isinstance(log["latency_ms"], int)
+    assert {log["level"] for log in logs if log["status_code"] >= 500} == {"ERROR"}
+    assert {log["level"] for log in logs if 400 <= log["status_code"] < 500} == {"WARNING"}
+    # Endpoints are drawn first, then one of their methods
+    health = sum(log["endpoint"] == "/health" for log in logs) / len(logs)
+    assert 0.17 < health < 0.23
+    errors = sum(log["status_code"] == 500 for log in logs) / len(logs)
+    assert 0.07 < errors < 0.13
+
+
+def test_request_ids_are_unique_version_4_uuids():
+    generator, _ = collecting_generator()
+    request_ids = generator._request_ids(1000)
+
+    assert len(set(request_ids)) == 1000
+    parsed = [uuid.UUID(request_id) for request_id in request_ids]
+    assert all(value.version == 4 and str(value) == text for value, text in zip(parsed, request_ids))
+
+
+def test_metric_batch_spikes_cpu_with_errors():
+    generator, _ = collecting_generator()
+    spikes = np.arange(2000) % 2 == 0
+    metrics = generator.generate_metric_batch(2000, cpu_spikes=spikes)
+
+    assert all(0 <= metric["cpu_percent"] <= 100 and metric["memory_total_mb"] == 8192 for metric in metrics)
+    spiked = np.mean([metric["cpu_percent"] for metric in metrics[::2]])
+    calm = np.mean([metric["cpu_percent"] for metric in metrics[1::2]])
+    assert spiked - calm > 20
+
+
+def test_load_run_delivers_every_event_at_its_scheduled_time():
+    generator, received = collecting_generator(buffer_size=10000)
+
+    async def run():
+        generator.start_load(rate=2000, duration=0.25, batch_size=100, metric_ratio=0.1)
+        with pytest.raises(RuntimeError):
+            generator.start_load()
+        await generator.load_task
+        await generator.stop_delivery()
+        return await generator.stop_load()
+
+    stats = asyncio.run(run())
+
+    assert (stats["running"], stats["events"], stats["metrics"]) == (False, 500, 50)
+    assert stats["elapsed_seconds"] >= 0.25
+    assert (len(received["log"]), len(received["metric"])) == (500, 50)
+    # Timestamps are the open-loop schedule: one event every 500 microseconds
+    times = np.array([log["timestamp"] for log in received["log"]], dtype="datetime64[us]")
+    assert set(np.diff(times).astype(np.int64).tolist()) == {500}
+
+
+def test_stop_load_ends_an_unbounded_run():
+    generator, received = collecting_generator(buffer_size=100000)
+
+    async def run():
+        generator.start_load(rate=5000, duration=None, batch_size=500)
+        await asyncio.sleep(0.2)
+        stats = await generator.stop_load()
+        await generator.stop_delivery()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["running"] is False
+    assert stats["target_rate"] == 5000
+    assert 0 < stats["events"] == len(received["log"])
+    assert generator.load_task is None
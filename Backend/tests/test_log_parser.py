@@ -0,0 +1,179 @@
+import pytest
+
+from Services.LogParser import EXCEPTION_LINE, LogParser, parse_httpdate
+
+TRACEBACK = [
+    "2024-05-01 12:00:00,123 INFO [worker] processing job 7",
+    "Traceback (most recent call last):",
+    '  File "worker.py", line 42, in run',
+    "    result = handle(job)",
+]
+
+
+def assemble_all(parser, lines):
+    records, pending = parser.assemble(lines, "app.log")
+    if pending is not None:
+        records.append(parser.flush(pending))
+    return records
+
+
+def test_access_log_line():
+    line = ('10.0.0.7 - alice [10/Oct/2023:13:55:36 -0700] "GET /api/orders?id=3 HTTP/1.1" 503 512 '
+            '"-" "curl/8.0" 0.250')
+    record = LogParser().parse(line)
+
+    assert record == {
+        "level": "ERROR",
+        "ip": "10.0.0.7",
+        "method": "GET",
+        "endpoint": "/api/orders?id=3",
+        "status_code": 503,
+        "message": line,
+        "timestamp": "2023-10-10T20:55:36",
+        "user": "alice",
+        "bytes": 512,
+        "user_agent": "curl/8.0",
+        "latency_ms": 250.0,
+    }
+
+
+def test_leveled_line():
+    record = LogParser().parse("2024-05-01 12:00:00,123 WARN [main] cache miss ratio high", "app.log")
+    assert record["timestamp"] == "2024-05-01 12:00:00.123"
+    assert record["level"] == "WARNING"
+    assert record["source"] == "app.log"
+
+
+def test_json_line_normalizes_level():
+    record = LogParser().parse('{"level": "fatal", "message": "out of memory", "pod": "api-1"}')
+    assert record == {"level": "ERROR", "message": "out of memory", "pod": "api-1"}
+
+
+def test_key_value_line_maps_aliases():
+    record = LogParser().parse('method=POST path=/login status=401 latency=12.5ms msg="bad \\"token\\""')
+    assert record["endpoint"] == "/login"
+    assert record["status_code"] == 401
+    assert record["latency_ms"] == 12.5
+    assert record["message"] == 'bad "token"'
+    assert record["level"] == "WARNING"
+
+
+def test_json_line_converts_status_and_latency():
+    record = LogParser().parse('{"status_code": "502", "latency_ms": "1.5s", "message": "upstream"}')
+    assert (record["status_code"], record["latency_ms"], record["level"]) == (502, 1500.0, "ERROR")
+    record = LogParser().parse('{"status_code": 404.0, "level": "info", "message": "missing"}')
+    assert (record["status_code"], record["level"]) == (404, "INFO")
+
+
+def test_key_value_keeps_values_that_are_not_numbers():
+    record = LogParser().parse("status=- latency=250ms path=/health")
+    assert (record["status_code"], record["latency_ms"]) == ("-", 250.0)
+    record = LogParser().parse("status=503 latency=slow")
+    assert (record["status_code"], record["latency_ms"], record["level"]) == (503, "slow", "ERROR")
+
+
+def test_plain_line_infers_level():
+    parser = LogParser()
+    assert parser.parse("cache warmed in 12ms")["level"] == "INFO"
+    assert parser.parse("disk usage critical on /var")["level"] == "ERROR"
+    assert parser.parse("Warning: low disk")["level"] == "WARNING"
+    assert parser.parse("")["message"] == ""
+
+
+def test_unmatched_line_falls_back_to_plain():
+    parser = LogParser()
+    record = parser.parse("2024 was a good year")
+    assert record == {"level": "INFO", "message": "2024 was a good year"}
+    assert parser.get_stats()["parsers"]["access"]["misses"] == 1
+
+
+def test_parse_httpdate():
+    assert parse_httpdate("01/Jan/2024:00:30:00 +0100") == "2023-12-31T23:30:00"
+    assert parse_httpdate("not a date") is None
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("ValueError: bad value", ("ValueError", "bad value")),
+    ("requests.exceptions.ConnectionError: refused", ("requests.exceptions.ConnectionError", "refused")),
+    ("app.errors.Timeout: slow upstream", ("app.errors.Timeout", "slow upstream")),
+    ("KeyboardInterrupt", ("KeyboardInterrupt", None)),
+    ("StopIteration", ("StopIteration", None)),
+    ("Killed", None),
+    ("Done", None),
+    ("note: not an exception", None),
+    ("Segmentation fault (core dumped)", None),
+])
+def test_exception_line(line, expected):
+    match = EXCEPTION_LINE.match(line)
+    assert (match.groups() if match else None) == expected
+
+
+def test_traceback_is_folded_into_one_error_event():
+    records = assemble_all(LogParser(), TRACEBACK + [
+        "ValueError: job 7 has no payload",
+        "2024-05-01 12:00:01,000 INFO [worker] processing job 8",
+    ])
+
+    assert len(records) == 2
+    event = records[0]
+    assert event["message"] == "\n".join(TRACEBACK + ["ValueError: job 7 has no payload"])
+    assert event["exception_type"] == "ValueError"
+    assert event["exception_message"] == "job 7 has no payload"
+    assert event["level"] == "ERROR"
+    assert not any(key.startswith("_") for key in event)
+
+
+def test_chained_tracebacks_stay_in_one_event():
+    records = assemble_all(LogParser(), TRACEBACK + [
+        "KeyError: 'payload'",
+        "",
+        "During handling of the above exception, another exception occurred:",
+        "",
+        "Traceback (most recent call last):",
+        '  File "worker.py", line 50, in run',
+        "RuntimeError: job failed",
+    ])
+    assert len(records) == 1
+    assert records[0]["exception_type"] == "RuntimeError"
+    assert records[0]["message"].count("\n\n") == 2
+
+
+def test_chained_traceback_split_across_reads():
+    parser = LogParser()
+    records, pending = parser.assemble(TRACEBACK + ["KeyError: 'payload'", ""], "app.log")
+    assert records == []
+    records, pending = parser.assemble(
+        ["", "During handling of the above exception, another exception occurred:", "",
+         "Traceback (most recent call last):", "RuntimeError: job failed",
+         "2024-05-01 12:00:02,000 INFO [worker] next"], "app.log", pending)
+
+    assert len(records) == 1
+    assert records[0]["message"].endswith("\n\nDuring handling of the above exception, another exception "
+                                          "occurred:\n\nTraceback (most recent call last):\nRuntimeError: job failed")
+    assert pending["message"].endswith("next")
+
+
+def test_blank_lines_after_a_traceback_are_dropped_before_the_next_event():
+    records = assemble_all(LogParser(), TRACEBACK + ["ValueError: boom", "", "", "2024-05-01 12:00:02,000 INFO ok"])
+    assert records[0]["message"].endswith("ValueError: boom")
+    assert "_blank_lines" not in records[0]
+
+
+def test_bare_word_does_not_close_a_traceback():
+    records = assemble_all(LogParser(), TRACEBACK + ["Killed"])
+
+    assert [record["message"] for record in records] == ["\n".join(TRACEBACK), "Killed"]
+    assert "exception_type" not in records[0]
+    assert records[0]["level"] == "ERROR"
+
+
+def test_pending_event_reports_its_first_line():
+    parser = LogParser()
+    records, pending = parser.assemble(["2024-05-01 12:00:00,000 INFO [main] up"] + TRACEBACK, "app.log")
+
+    assert len(records) == 1
+    assert pending["_start_line"] == 1
+    # Continuation lines in the next read extend the same event
+    records, same = parser.assemble(["ValueError: boom"], "app.log", pending)
+    assert records == [] and same is pending
+    assert parser.flush(same)["exception_type"] == "ValueError"
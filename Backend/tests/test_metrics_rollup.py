@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from Services.MetricsRollup import MetricsRollup, histogram_quantile, to_utc_datetime
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def samples(seconds, value=None, start=START):
+    return [{"timestamp": start + timedelta(seconds=second),
+             "cpu_percent": second if value is None else value} for second in seconds]
+
+
+def by_key(updates):
+    return {(update["resolution"], update["timestamp"]): update["fields"]["cpu_percent"] for update in updates}
+
+
+def test_bucket_is_emitted_when_a_later_sample_arrives():
+    rollup = MetricsRollup(fields=["cpu_percent"])
+    assert rollup.add_samples(samples(range(10))) == []
+
+    updates = by_key(rollup.add_samples(samples([10])))
+
+    assert list(updates) == [("10s", START)]
+    stats = updates[("10s", START)]
+    assert (stats["count"], stats["sum"], stats["min"], stats["max"]) == (10, 45, 0, 9)
+    assert sum(stats["hist"].values()) == 10
+
+
+def test_late_samples_are_merged_per_bucket():
+    rollup = MetricsRollup(fields=["cpu_percent"])
+    rollup.add_samples(samples([7200]))
+
+    updates = by_key(rollup.add_samples(samples(range(30))))
+
+    # 3 ten-second buckets, 1 minute and 1 hour, instead of one update per sample and resolution
+    assert sorted(updates) == [("10s", START), ("10s", START + timedelta(seconds=10)),
+                               ("10s", START + timedelta(seconds=20)), ("1h", START), ("1m", START)]
+    assert updates[("1m", START)]["count"] == 30
+    assert updates[("10s", START + timedelta(seconds=20))]["sum"] == sum(range(20, 30))
+
+
+def test_drain_closes_open_buckets():
+    rollup = MetricsRollup(fields=["cpu_percent"])
+    rollup.add_samples(samples([1, 2]))
+
+    updates = by_key(rollup.drain())
+
+    assert set(updates) == {("10s", START), ("1m", START), ("1h", START)}
+    assert rollup.drain() == []
+
+
+def test_samples_without_fields_or_timestamp_are_ignored():
+    rollup = MetricsRollup(fields=["cpu_percent"])
+    rollup.add_samples([{"timestamp": "not a date", "cpu_percent": 5},
+                        {"timestamp": START, "cpu_percent": "high"}])
+    assert rollup.drain() == []
+
+
+def test_partial_buckets_merge_in_mongodb(mongo_client):
+    # Recent buckets: the rollup collections expire old ones through their TTL index
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    rollup = MetricsRollup(fields=["cpu_percent"])
+    rollup.add_samples(samples([0, 1, 2], start=start))
+    mongo_client.store_metric_rollups(rollup.drain())
+    rollup.add_samples(samples([3, 4], value=50, start=start))
+    mongo_client.store_metric_rollups(rollup.drain())
+
+    documents = mongo_client.get_metric_rollups("10s", start, start)
+    point = rollup.summarize(documents[0])["cpu_percent"]
+
+    assert point["count"] == 5
+    assert point["min"] == 0 and point["max"] == 50
+    assert point["avg"] == (0 + 1 + 2 + 50 + 50) / 5
+    assert point["min"] <= point["p95"] <= point["max"]
+
+
+def test_histogram_quantile_interpolates_inside_the_bin():
+    assert histogram_quantile({}, 0, 0.95) is None
+    assert histogram_quantile({"10": 4}, 4, 0.5) == 10.5
+    assert histogram_quantile({"1": 1, "90": 19}, 20, 0.95) == 90 + 18 / 19
+
+
+def test_choose_resolution_keeps_enough_points():
+    rollup = MetricsRollup()
+    assert rollup.choose_resolution(START, START + timedelta(minutes=10), 60) == "10s"
+    assert rollup.choose_resolution(START, START + timedelta(hours=10), 100) == "1m"
+    assert rollup.choose_resolution(START, START + timedelta(days=30), 200) == "1h"
+
+
+def test_to_utc_datetime_normalizes_offsets():
+    assert to_utc_datetime("2024-01-01T14:00:00+02:00") == datetime(2024, 1, 1, 12, 0)
+    assert to_utc_datetime("2024-01-01T12:00:00Z") == datetime(2024, 1, 1, 12, 0)
+    assert to_utc_datetime(42) is None
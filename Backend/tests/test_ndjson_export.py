@@ -0,0 +1,50 @@
+import json
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from Services.Serialization import dumps, encode_ndjson, loads
+
+
+def test_raw_documents_encode_to_ndjson():
+    object_id = ObjectId()
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    body = encode_ndjson([{"_id": object_id, "timestamp": timestamp, "tags": ["a"]}, {"n": 1}])
+
+    first, second, end = body.split(b"\n")
+    assert json.loads(first) == {"_id": str(object_id), "timestamp": "2024-05-01T12:30:15.250000", "tags": ["a"]}
+    assert loads(second) == {"n": 1} and end == b""
+    assert encode_ndjson([]) == b""
+    assert b" " not in dumps({"a": [1, 2], "b": "c"})
+
+
+def test_logs_stream_in_batches_newest_first(mongo_client):
+    now = datetime.utcnow().replace(microsecond=0)
+    mongo_client.store_logs([{"timestamp": now - timedelta(seconds=i), "level": "ERROR" if i % 2 else "INFO",
+                              "message": f"log {i}"} for i in range(7)])
+
+    batches = list(mongo_client.iter_logs(batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [log["message"] for batch in batches for log in batch] == [f"log {i}" for i in range(7)]
+    # Raw driver documents: the encoder handles ObjectId and datetime
+    assert isinstance(batches[0][0]["_id"], ObjectId)
+
+    errors = [log for batch in mongo_client.iter_logs(level="ERROR", start_time=now - timedelta(seconds=4),
+                                                      fields=["message"], batch_size=10) for log in batch]
+    assert [log["message"] for log in errors] == ["log 1", "log 3"]
+    assert set(errors[0]) == {"_id", "timestamp", "message"}
+
+
+def test_export_is_lazy_and_can_stop_early(mongo_client):
+    now = datetime.utcnow()
+    batches = mongo_client.iter_metrics(batch_size=2)
+    mongo_client.store_metrics([{"timestamp": now - timedelta(seconds=i), "cpu_percent": float(i)}
+                                for i in range(5)])
+
+    first = next(batches)
+    assert [metric["cpu_percent"] for metric in first] == [0.0, 1.0]
+    batches.close()
+
+    lines = encode_ndjson(metric for batch in mongo_client.iter_metrics(fields=["cpu_percent"])
+                          for metric in batch).splitlines()
+    assert [loads(line)["cpu_percent"] for line in lines] == [0.0, 1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from Services.ParquetArchive import ParquetArchive
+
+
+def make_log(timestamp, **fields):
+    log = {"timestamp": timestamp, "level": "ERROR", "endpoint": "/api/orders", "status_code": 500,
+           "latency_ms": 12.5, "message": "order failed"}
+    log.update(fields)
+    return log
+
+
+@pytest.fixture
+def archive(mongo_client, tmp_path):
+    archive = ParquetArchive(mongo_client, root=str(tmp_path / "archive"), batch_size=2)
+    mongo_client.attach_archive(archive)
+    return archive
+
+
+def test_aged_documents_move_to_parquet(mongo_client, archive):
+    now = datetime.utcnow().replace(microsecond=0)
+    old = now - timedelta(days=3)
+    mongo_client.store_logs([make_log(old + timedelta(seconds=i), message=f"old {i}") for i in range(5)]
+                            + [make_log(now, message="fresh")])
+
+    assert archive.archive_collection("logs", now - timedelta(days=1)) == 5
+
+    assert [log["message"] for log in mongo_client.get_logs(limit=10)] == ["fresh"]
+    archived = archive.query_logs(limit=None)
+    assert [log["message"] for log in archived] == [f"old {i}" for i in reversed(range(5))]
+    assert archived[0]["timestamp"] == old + timedelta(seconds=4)
+    assert archived[0]["status_code"] == 500 and archived[0]["level"] == "ERROR"
+    assert "_seq" not in archived[0]
+
+
+def test_values_outside_the_schema_are_kept(mongo_client, archive):
+    old = datetime.utcnow().replace(microsecond=0) - timedelta(days=3)
+    mongo_client.store_logs([
+        make_log(old, status_code="-", latency_ms=12.75, trace={"span": "a1"}),
+        make_log(old + timedelta(seconds=1), status_code=502.5, cpu_spike=1),
+        make_log(old + timedelta(seconds=2), status_code=404),
+    ])
+    archive.archive_collection("logs", old + timedelta(days=1))
+
+    newest, middle, oldest = archive.query_logs(limit=None)
+    assert (oldest["status_code"], oldest["latency_ms"], oldest["trace"]) == ("-", 12.75, {"span": "a1"})
+    assert (middle["status_code"], middle["cpu_spike"]) == (502.5, 1)
+    assert newest["status_code"] == 404
+    assert [log["status_code"] for log in archive.query_logs(status_codes=[404], limit=None)] == [404]
+
+
+def test_query_prunes_by_filters_and_projects_fields(mongo_client, archive):
+    old = datetime.utcnow().replace(microsecond=0) - timedelta(days=5)
+    mongo_client.store_logs([
+        make_log(old, level="INFO", status_code=200, endpoint="/health", region="eu"),
+        make_log(old + timedelta(days=1), level="ERROR", status_code=503, region="us"),
+        make_log(old + timedelta(days=2), level="ERROR", status_code=500, region="eu"),
+    ])
+    archive.archive_collection("logs", old + timedelta(days=3))
+
+    errors = archive.query_logs(levels=["ERROR"], start_time=old + timedelta(hours=12), limit=None)
+    assert [log["status_code"] for log in errors] == [500, 503]
+    assert [log["status_code"] for log in archive.query_logs(end_time=old + timedelta(hours=1), limit=None)] \
+        == [200]
+
+    [log] = archive.query_logs(endpoints=["/health"], fields=["status_code", "region"], limit=None)
+    assert set(log) == {"_id", "timestamp", "status_code", "region"}
+    assert log["region"] == "eu"
+    assert len(archive.query_logs(limit=1)) == 1
+
+
+def test_search_falls_back_to_the_archive(mongo_client, archive):
+    now = datetime.utcnow().replace(microsecond=0)
+    mongo_client.store_logs([make_log(now - timedelta(days=3, seconds=i), message=f"archived {i}")
+                             for i in range(3)])
+    archive.archive_collection("logs", now - timedelta(days=1))
+    mongo_client.store_logs([make_log(now - timedelta(seconds=i), message=f"live {i}") for i in range(2)])
+
+    assert [log["message"] for log in mongo_client.search_logs(limit=2)] == ["live 0", "live 1"]
+    assert [log["message"] for log in mongo_client.search_logs(limit=4)] == \
+        ["live 0", "live 1", "archived 0", "archived 1"]
+    assert [log["message"] for log in mongo_client.search_logs(status_codes=[404], limit=4)] == []
+
+
+def test_metrics_are_archived_with_their_schema(mongo_client, archive):
+    old = datetime.utcnow().replace(microsecond=0) - timedelta(days=2)
+    mongo_client.store_metrics([{"timestamp": old, "metric_type": "system", "cpu_percent": 41.5,
+                                 "memory_percent": "n/a"}])
+    assert archive.archive_once() == {"logs": 0, "metrics": 1}
+
+    [metric] = mongo_client.search_metrics(limit=5)
+    assert (metric["cpu_percent"], metric["memory_percent"]) == (41.5, "n/a")
+    assert archive.query_metrics(metric_type="other", limit=None) == []
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from Services.MongoClient import MongoDBClient
+
+
+def test_projection_always_keeps_the_cursor_fields():
+    assert MongoDBClient._projection(None) is None
+    assert MongoDBClient._projection([]) is None
+    assert MongoDBClient._projection(["level", "message"]) == {"level": 1, "message": 1, "timestamp": 1}
+
+
+def test_get_methods_return_only_the_requested_fields(mongo_client):
+    now = datetime.utcnow()
+    mongo_client.store_logs([{"timestamp": now - timedelta(seconds=i), "level": level, "message": f"log {i}",
+                              "endpoint": "/api"} for i, level in enumerate(["ERROR", "INFO", "WARNING"])])
+    mongo_client.store_metrics([{"timestamp": now, "metric_type": "system", "cpu_percent": 12.0,
+                                 "memory_percent": 40.0},
+                                {"timestamp": now, "metric_type": "process", "cpu_percent": 3.0}])
+
+    logs = mongo_client.get_logs(fields=["level"])
+    assert [set(log) for log in logs] == [{"_id", "timestamp", "level"}] * 3
+    assert isinstance(logs[0]["_id"], str)
+
+    filtered = mongo_client.get_filtered_logs(fields=["message"])
+    assert [log["message"] for log in filtered] == ["log 0", "log 2"]
+    assert all(set(log) == {"_id", "timestamp", "message"} for log in filtered)
+
+    [metric] = mongo_client.get_metrics(metric_type="system", fields=["cpu_percent"])
+    assert set(metric) == {"_id", "timestamp", "cpu_percent"} and metric["cpu_percent"] == 12.0
+
+
+def test_compound_indexes_lead_with_the_filter_field(mongo_client):
+    keys = [index["key"] for index in mongo_client.logs_collection.index_information().values()]
+    assert [("level", 1), ("timestamp", -1), ("_id", -1)] in keys
+    keys = [index["key"] for index in mongo_client.commits_collection.index_information().values()]
+    assert [("repo_name", 1), ("timestamp", -1), ("_id", -1)] in keys
+
+
+class ExplainedCollection:
+    """find().sort().limit().explain() returning a canned winning plan"""
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def find(self, query):
+        return self
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, limit):
+        return self
+
+    def explain(self):
+        if isinstance(self.plan, Exception):
+            raise self.plan
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+def test_index_check_flags_collection_scans_and_in_memory_sorts(mongo_client):
+    mongo_client.logs_collection = ExplainedCollection(
+        {"queryPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {
+            "stage": "IXSCAN", "indexName": "level_1_timestamp_-1__id_-1"}}}})
+    mongo_client.metrics_collection = ExplainedCollection(
+        {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}})
+    mongo_client.commits_collection = ExplainedCollection(RuntimeError("not authorized"))
+
+    report = mongo_client.check_index_usage()
+
+    assert report["logs_by_level"] == {"indexed": True, "stages": ["LIMIT", "FETCH", "IXSCAN"],
+                                       "indexes": ["level_1_timestamp_-1__id_-1"]}
+    assert report["metrics_by_type"]["indexed"] is False
+    assert report["metrics_by_type"]["stages"] == ["SORT", "COLLSCAN"]
+    assert report["commits_by_repo"] == {"indexed": False, "stages": [], "indexes": [],
+                                         "error": "not authorized"}
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from Services.RetentionPruner import RetentionPruner
+
+
+class FakeCommands:
+    """Stands in for db.command: collStats figures and an optional collMod failure"""
+
+    def __init__(self, sizes=None, coll_mod_error=None):
+        self.sizes = sizes or {}
+        self.coll_mod_error = coll_mod_error
+        self.calls = []
+
+    def __call__(self, name, collection, **kwargs):
+        self.calls.append((name, collection, kwargs))
+        if name == "collMod":
+            if self.coll_mod_error:
+                raise self.coll_mod_error
+            return {"ok": 1}
+        size, count = self.sizes[collection]
+        return {"size": size, "avgObjSize": size // count if count else 0}
+
+
+def store_logs(mongo_client, count, start):
+    mongo_client.store_logs([{"timestamp": start + timedelta(seconds=i), "level": "INFO",
+                              "message": f"log {i}"} for i in range(count)])
+
+
+def test_retention_uses_coll_mod(mongo_client, monkeypatch):
+    commands = FakeCommands()
+    monkeypatch.setattr(mongo_client.db, "command", commands)
+
+    assert mongo_client.set_retention("logs", 3600)
+    assert commands.calls == [("collMod", "logs", {"index": {"keyPattern": {"timestamp": 1},
+                                                             "expireAfterSeconds": 3600}})]
+
+
+def test_retention_rebuilds_the_index_when_coll_mod_fails(mongo_client, monkeypatch):
+    monkeypatch.setattr(mongo_client.db, "command", FakeCommands(coll_mod_error=RuntimeError("not supported")))
+
+    assert mongo_client.set_retention("logs", 7200)
+    assert mongo_client.logs_collection.index_information()["timestamp_1"]["expireAfterSeconds"] == 7200
+    # Unchanged retention is a no-op; None turns it back into a plain index
+    assert mongo_client.set_retention("logs", 7200)
+    assert mongo_client.set_retention("logs", None)
+    assert "expireAfterSeconds" not in mongo_client.logs_collection.index_information()["timestamp_1"]
+
+
+def test_pruner_applies_configured_retention(mongo_client, monkeypatch):
+    monkeypatch.setattr(mongo_client.db, "command", FakeCommands(coll_mod_error=RuntimeError("not supported")))
+    pruner = RetentionPruner(mongo_client, retention={"metrics": 600}, budgets={"logs": 0, "metrics": 10})
+
+    pruner.apply_retention()
+
+    assert mongo_client.metrics_collection.index_information()["timestamp_1"]["expireAfterSeconds"] == 600
+    assert pruner.get_config() == {"retention_seconds": {"metrics": 600}, "budget_bytes": {"metrics": 10}}
+
+
+def test_budget_deletes_the_oldest_documents(mongo_client, monkeypatch):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    store_logs(mongo_client, 10, start)
+    monkeypatch.setattr(mongo_client.db, "command", FakeCommands({"logs": (1000, 10)}))
+
+    assert mongo_client.prune_to_budget("logs", 650, batch_size=2) == 4
+    assert sorted(log["message"] for log in mongo_client.get_logs(limit=20)) == [f"log {i}" for i in range(4, 10)]
+    assert mongo_client.prune_to_budget("logs", 1000) == 0
+
+
+def test_budget_archives_before_removing(mongo_client, monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    from Services.ParquetArchive import ParquetArchive
+
+    archive = ParquetArchive(mongo_client, root=str(tmp_path / "archive"))
+    mongo_client.attach_archive(archive)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    store_logs(mongo_client, 10, start)
+    monkeypatch.setattr(mongo_client.db, "command", FakeCommands({"logs": (1000, 10)}))
+
+    assert RetentionPruner(mongo_client, budgets={"logs": 650}).prune_once() == {"logs": 4}
+
+    assert mongo_client.logs_collection.count_documents({}) == 6
+    assert [log["message"] for log in archive.query_logs(limit=None)] == [f"log {i}" for i in reversed(range(4))]
+    assert len(mongo_client.search_logs(limit=20)) == 10
+
+
+def test_budget_keeps_documents_when_archiving_fails(mongo_client, monkeypatch):
+    class BrokenArchive:
+        def handles(self, name):
+            return True
+
+        def archive_collection(self, name, cutoff):
+            raise OSError("disk full")
+
+    mongo_client.attach_archive(BrokenArchive())
+    store_logs(mongo_client, 5, datetime.utcnow() - timedelta(hours=1))
+    monkeypatch.setattr(mongo_client.db, "command", FakeCommands({"logs": (500, 5)}))
+
+    assert mongo_client.prune_to_budget("logs", 100) == 0
+    assert mongo_client.logs_collection.count_documents({}) == 5
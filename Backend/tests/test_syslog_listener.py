@@ -0,0 +1,122 @@
+import asyncio
+import datetime
+
+from DataCollectors.SyslogListener import MAX_MESSAGE_BYTES, SyslogListener, _TcpProtocol, parse_syslog
+
+
+class FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_rfc5424_message():
+    record = parse_syslog(b'<165>1 2024-03-01T10:15:30.123+02:00 web01 nginx 4711 ID47 '
+                          b'[meta k="a \\] b"][origin ip="10.0.0.1"] \xef\xbb\xbfrequest failed\n')
+
+    assert record == {
+        "timestamp": "2024-03-01T08:15:30.123000",
+        "message": "request failed",
+        "host": "web01",
+        "app": "nginx",
+        "procid": "4711",
+        "msgid": "ID47",
+        "structured_data": '[meta k="a \\] b"][origin ip="10.0.0.1"]',
+        "facility": 20,
+        "severity": 5,
+        "level": "INFO",
+        "source": "syslog",
+    }
+
+
+def test_rfc5424_nil_fields_are_dropped():
+    record = parse_syslog(b"<11>1 - - app - - - disk full")
+
+    assert record["message"] == "disk full"
+    assert record["app"] == "app"
+    assert record["level"] == "ERROR"
+    assert not {"timestamp", "host", "procid", "msgid", "structured_data"} & set(record)
+
+
+def test_rfc3164_message():
+    record = parse_syslog(b"<12>Mar  1 10:15:30 db01 postgres[312]: connection reset")
+
+    assert record["host"] == "db01"
+    assert record["app"] == "postgres"
+    assert record["procid"] == "312"
+    assert record["message"] == "connection reset"
+    assert record["level"] == "WARNING"
+    assert record["timestamp"].endswith("-03-01T10:15:30")
+    assert datetime.datetime.fromisoformat(record["timestamp"]) <= \
+        datetime.datetime.utcnow() + datetime.timedelta(days=1)
+
+
+def test_message_without_pri_is_plain_info():
+    # "just a line" contains spaces, so it is not taken for a tag
+    record = parse_syslog(b"just a line: with a colon")
+    assert record == {"message": "just a line: with a colon", "level": "INFO", "source": "syslog"}
+
+
+def test_out_of_range_pri_is_not_a_header():
+    record = parse_syslog(b"<999>1 2024-03-01T10:15:30Z host app - - - text")
+    assert "severity" not in record
+    assert record["message"].startswith("<999>")
+
+
+def test_tcp_framing_handles_octet_counting_newlines_and_split_reads():
+    received = []
+    listener = SyslogListener(callback=lambda kind, records: received.extend(records), batch_size=1)
+    protocol = _TcpProtocol(listener)
+    protocol.connection_made(FakeTransport())
+
+    first = b"<14>1 - host app - - - counted"
+    protocol.data_received(str(len(first)).encode() + b" " + first + b"<14>plain li")
+    protocol.data_received(b"ne\n<14>1 - host app - - - second")
+    protocol.data_received(b"\n")
+
+    assert [record["message"] for record in received] == ["counted", "plain line", "second"]
+    assert listener.get_stats()["received"] == 3
+
+
+def test_tcp_digit_lines_without_a_count_use_newline_framing():
+    received = []
+    listener = SyslogListener(callback=lambda kind, records: received.extend(records), batch_size=1)
+    protocol = _TcpProtocol(listener)
+    transport = FakeTransport()
+    protocol.connection_made(transport)
+
+    protocol.data_received(b"12a4 not a count\n2024-03-01 10:15:30 disk")
+    protocol.data_received(b" full\n42\n11 <14>counted")
+
+    assert [record["message"] for record in received] == \
+        ["12a4 not a count", "2024-03-01 10:15:30 disk full", "42", "counted"]
+    assert not transport.closed
+
+
+def test_tcp_oversized_frame_closes_the_connection():
+    listener = SyslogListener(batch_size=1)
+    protocol = _TcpProtocol(listener)
+    transport = FakeTransport()
+    protocol.connection_made(transport)
+
+    protocol.data_received(str(MAX_MESSAGE_BYTES + 1).encode() + b" <14>too big")
+
+    assert transport.closed
+    assert listener.get_stats()["rejected"] == 1
+
+
+def test_messages_are_batched_until_the_interval():
+    batches = []
+
+    async def run():
+        listener = SyslogListener(callback=lambda kind, records: batches.append(records),
+                                  batch_size=100, batch_interval=0.05)
+        listener.receive(b"<14>one")
+        listener.receive(b"<14>two")
+        assert batches == []
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert [[record["message"] for record in batch] for batch in batches] == [["one", "two"]]
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+websockets = pytest.importorskip("websockets")
+pytest.importorskip("faker")
+
+from DataCollectors.Telemenetry import TelemetryGenerator
+
+
+async def connect(generator, **kwargs):
+    """Start the generator's websocket server on a free port and connect one client"""
+    generator.port = 0
+    server_task = asyncio.create_task(generator._start_async())
+    while generator.server is None:
+        await asyncio.sleep(0.01)
+    port = generator.server.sockets[0].getsockname()[1]
+    client = await websockets.connect(f"ws://127.0.0.1:{port}", **kwargs)
+    while not generator.connections:
+        await asyncio.sleep(0.01)
+    return server_task, client
+
+
+async def close(generator, server_task, client):
+    await client.close()
+    generator.server.close()
+    await server_task
+
+
+def test_batch_frames_are_deflated_with_the_configured_window():
+    async def run():
+        generator = TelemetryGenerator(host="127.0.0.1", batch_window=60, max_batch=3)
+        server_task, client = await connect(generator)
+        [extension] = client.extensions
+        assert extension.name == "permessage-deflate"
+        assert extension.remote_max_window_bits == 15
+
+        generator._queue_frame_events([{"message": "a"}, {"message": "b"}], [{"cpu_percent": 1.0}])
+        frame = json.loads(await asyncio.wait_for(client.recv(), 2))
+        generator._queue_frame_events([{"message": "c"}], [])
+        generator._flush_frame()
+        second = json.loads(await asyncio.wait_for(client.recv(), 2))
+
+        await close(generator, server_task, client)
+        return generator, frame, second
+
+    generator, frame, second = asyncio.run(run())
+    assert frame == {"type": "batch", "logs": [{"message": "a"}, {"message": "b"}],
+                     "metrics": [{"cpu_percent": 1.0}]}
+    assert second == {"type": "batch", "logs": [{"message": "c"}], "metrics": []}
+    stats = generator.get_stream_stats()
+    assert (stats["frames_sent"], stats["events_sent"], stats["events_per_frame"]) == (2, 4, 2.0)
+    assert stats["deflate"] == {"window_bits": 15, "mem_level": 8, "level": 6}
+
+
+def test_uncompressed_stream_negotiates_no_extension():
+    async def run():
+        generator = TelemetryGenerator(host="127.0.0.1", compression=None)
+        server_task, client = await connect(generator)
+        extensions = client.extensions
+        await close(generator, server_task, client)
+        return generator, extensions
+
+    generator, extensions = asyncio.run(run())
+    assert extensions == []
+    assert generator.get_stream_stats()["deflate"] is None
+
+
+def test_events_are_only_queued_while_collectors_are_connected():
+    generator = TelemetryGenerator()
+    generator._queue_frame_events([{"message": "a"}], [{"cpu_percent": 1.0}])
+    assert generator.pending_logs == [] and generator.pending_metrics == []
+    generator._flush_frame()
+    assert generator.get_stream_stats()["frames_sent"] == 0
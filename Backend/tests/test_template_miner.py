@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from Services.TemplateMiner import TemplateMiner, render_template
+
+
+def test_similar_messages_share_a_generalized_template():
+    miner = TemplateMiner()
+    first = miner.add("user alice logged in from 10.0.0.1")
+    second = miner.add("user bob logged in from 10.0.0.2")
+    other = miner.add("disk /dev/sda1 is 91% full")
+
+    assert first == (1, ["10.0.0.1"])
+    assert second == (1, ["bob", "10.0.0.2"])
+    assert other[0] == 2
+    assert miner.clusters[1].versions == ["user alice logged in from <*>", "user <*> logged in from <*>"]
+    assert miner.add("user alice logged in from 10.0.0.1") == (1, ["alice", "10.0.0.1"])
+    assert miner.get_stats()["cache_hits"] == 1
+
+
+def test_routing_prefix_keeps_different_commands_apart():
+    miner = TemplateMiner(depth=1)
+    assert miner.add("GET /api/users 200")[0] != miner.add("POST /api/users 200")[0]
+    assert TemplateMiner(depth=0).add("GET /api/users 200")[0] == 1
+
+
+def test_logs_are_stamped_with_an_exact_template_version():
+    miner = TemplateMiner()
+    logs = [
+        {"message": "job 17 finished in 12 ms"},
+        {"message": "job 18 failed in 40 ms"},
+        {"message": "job  19 finished in 3 ms"},
+        {"level": "INFO"},
+    ]
+    miner.add_logs(logs)
+
+    versions = miner.clusters[1].versions
+    assert [log.get("template_version") for log in logs] == [0, 1, None, None]
+    assert "template_id" not in logs[3]
+    for log in logs[:2]:
+        assert render_template(versions[log["template_version"]], log["template_params"]) == log["message"]
+    # Irregular spacing cannot be rebuilt, so only the id and parameters are stamped
+    assert logs[2]["template_id"] == 1 and logs[2]["template_params"] == ["19", "finished", "3"]
+
+
+def test_render_template_rejects_mismatched_parameters():
+    assert render_template("took <*> ms on <*>", ["5", "db-1"]) == "took 5 ms on db-1"
+    assert render_template("took <*> ms", ["5", "extra"]) is None
+    assert render_template("", []) == ""
+
+
+def test_drain_waits_for_the_flush_interval_and_resets():
+    miner = TemplateMiner(flush_interval=3600)
+    minute = datetime(2024, 5, 1, 12, 30)
+    miner.add("cache miss for key 41", "2024-05-01T12:30:15")
+    miner.add("cache miss for key 42", minute + timedelta(seconds=40))
+
+    assert miner.drain() == ([], [])
+    templates, counts = miner.drain(force=True)
+    assert [(t["template_id"], t["template"], t["count"]) for t in templates] == [(1, "cache miss for key <*>", 2)]
+    assert templates[0]["first_seen"] == minute
+    assert counts == [{"template_id": 1, "timestamp": minute, "count": 2}]
+    assert miner.drain(force=True) == ([], [])
+
+
+def test_load_keeps_template_ids_and_versions():
+    miner = TemplateMiner()
+    miner.add("worker 3 started on node a")
+    miner.add("worker 4 started on node b")
+    templates, _ = miner.drain(force=True)
+
+    restored = TemplateMiner()
+    restored.load(templates)
+    logs = [{"message": "worker 9 started on node c"}, {"message": "queue drained"}]
+    restored.add_logs(logs)
+
+    assert logs[0]["template_id"] == 1
+    assert logs[0]["template_version"] == 1
+    assert restored.clusters[1].versions == miner.clusters[1].versions
+    assert logs[1]["template_id"] == 2
+
+
+def test_load_never_reuses_a_persisted_id():
+    miner = TemplateMiner()
+    miner.load([{"template_id": 7, "template": "disk <*> full"}, {"template_id": 12, "template": None}])
+    assert miner.add("queue drained")[0] == 13
+
+
+def test_compaction_waits_for_persisted_templates(mongo_client):
+    mongo_client.compact_messages = True
+    miner = TemplateMiner()
+    logs = [{"timestamp": datetime.utcnow(), "message": "worker 3 started"}]
+    miner.add_logs(logs)
+    mongo_client.store_log_templates(miner.drain(force=True)[0])
+    mongo_client.store_logs(logs)
+    assert mongo_client.logs_collection.find_one({}, {"message": 1})["message"] == "worker 3 started"
+
+
+def test_template_load_failure_is_raised(mongo_client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(mongo_client.log_templates_collection, "find", fail)
+    with pytest.raises(RuntimeError):
+        mongo_client.get_log_templates()
+    assert not mongo_client.templates_loaded
+
+
+def test_compacted_logs_are_stored_without_the_message_and_rebuilt(mongo_client):
+    mongo_client.compact_messages = True
+    miner = TemplateMiner()
+    miner.load(mongo_client.get_log_templates())
+    now = datetime.utcnow().replace(microsecond=0)
+
+    def store(messages, offset):
+        logs = [{"timestamp": now + timedelta(seconds=offset + i), "level": "INFO", "message": message}
+                for i, message in enumerate(messages)]
+        miner.add_logs(logs)
+        templates, _ = miner.drain(force=True)
+        mongo_client.store_log_templates(templates)
+        mongo_client.store_logs(logs)
+
+    store(["payment 100 accepted for order 7", "payment  5 accepted for order 8"], 0)
+    # Generalizes the template; the first log still refers to version 0
+    store(["payment 250 declined for order 9"], 10)
+
+    raw = list(mongo_client.logs_collection.find({}, {"_id": 0, "message": 1, "template_version": 1}))
+    assert sorted(["message" in doc for doc in raw]) == [False, False, True]
+
+    expected = ["payment 250 declined for order 9", "payment  5 accepted for order 8",
+                "payment 100 accepted for order 7"]
+    assert [log["message"] for log in mongo_client.get_logs(limit=10)] == expected
+
+    # A cold cache falls back to the persisted template versions
+    mongo_client._template_versions = {}
+    logs = mongo_client.get_logs(limit=10, fields=["message"])
+    assert [log["message"] for log in logs] == expected
+    assert all("template_params" not in log for log in logs)
@@ -0,0 +1,159 @@
+import asyncio
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+from Services.WriteBehindBuffer import WriteBehindBuffer, unwritten_records
+
+
+class FlakyWriter:
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error or ConnectionError("MongoDB unavailable")
+        self.written = []
+        self.calls = []
+
+    def __call__(self, batch):
+        self.calls.append(len(batch))
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.written.extend(batch)
+        return len(batch)
+
+
+def make_buffer(**kwargs):
+    client = SimpleNamespace(store_logs=FlakyWriter(), store_metrics=FlakyWriter())
+    return WriteBehindBuffer(mongo_client=client, **kwargs)
+
+
+def records(start, stop):
+    return [{"i": i} for i in range(start, stop)]
+
+
+def test_flush_writes_pending_records():
+    buffer = make_buffer()
+    writer = FlakyWriter()
+    buffer.register("events", writer)
+    buffer.add("events", records(0, 3))
+    buffer.add("events", {"i": 3})
+
+    asyncio.run(buffer.flush())
+
+    assert writer.written == records(0, 4)
+    assert buffer.get_stats()["events"]["written"] == 4
+    assert buffer.pending_count()["events"] == 0
+
+
+def test_failed_batch_is_retried_before_newer_records():
+    buffer = make_buffer()
+    writer = FlakyWriter(failures=1)
+    buffer.register("events", writer)
+    buffer.add("events", records(0, 3))
+
+    asyncio.run(buffer.flush())
+    assert writer.written == []
+    assert buffer.get_stats()["events"]["retrying"] == 1
+
+    buffer.add("events", records(3, 5))
+    asyncio.run(buffer.flush())
+
+    assert writer.written == records(0, 5)
+    stats = buffer.get_stats()["events"]
+    assert stats["write_errors"] == 1
+    assert stats["failed"] == 0
+    assert stats["retrying"] == 0
+
+
+def test_batch_is_discarded_after_max_retries():
+    buffer = make_buffer(max_retries=2)
+    writer = FlakyWriter(failures=10)
+    buffer.register("events", writer)
+    buffer.add("events", records(0, 4))
+
+    for _ in range(3):
+        asyncio.run(buffer.flush())
+
+    stats = buffer.get_stats()["events"]
+    assert stats["failed"] == 4
+    assert stats["pending"] == 0
+    assert stats["write_errors"] == 3
+
+
+def test_retry_waits_for_backoff():
+    buffer = make_buffer(max_age=10)
+    buffer.register("events", FlakyWriter(failures=1))
+    buffer.add("events", records(0, 600))
+
+    asyncio.run(buffer.flush())
+
+    # Over max_batch_size, but still backing off from the failure
+    assert buffer.pending_count()["events"] == 600
+    assert buffer._due_kinds() == []
+
+
+def test_flush_writes_in_chunks_of_max_batch_size():
+    buffer = make_buffer(max_batch_size=4)
+    writer = FlakyWriter()
+    buffer.register("events", writer)
+    buffer.add("events", records(0, 10))
+
+    asyncio.run(buffer.flush())
+
+    assert writer.calls == [4, 4, 2]
+    assert writer.written == records(0, 10)
+
+
+def test_only_the_failed_chunk_and_later_ones_are_requeued():
+    buffer = make_buffer(max_batch_size=4)
+
+    class FailSecondChunk(FlakyWriter):
+        def __call__(self, batch):
+            if len(self.calls) == 1:
+                self.calls.append(len(batch))
+                raise ConnectionError("MongoDB unavailable")
+            return super().__call__(batch)
+
+    writer = FailSecondChunk()
+    buffer.register("events", writer)
+    buffer.add("events", records(0, 10))
+
+    asyncio.run(buffer.flush())
+    assert writer.written == records(0, 4)
+    assert buffer.pending_count()["events"] == 6
+    stats = buffer.get_stats()["events"]
+    assert (stats["written"], stats["retrying"]) == (4, 1)
+
+    buffer.add("events", records(10, 11))
+    asyncio.run(buffer.flush())
+    assert writer.written == records(0, 11)
+    assert writer.calls == [4, 4, 4, 3]
+
+
+def test_pending_records_are_bounded():
+    buffer = make_buffer(max_pending=5)
+    writer = FlakyWriter()
+    buffer.register("events", writer)
+    buffer.add("events", records(0, 8))
+
+    assert buffer.get_stats()["events"]["dropped"] == 3
+    asyncio.run(buffer.flush())
+    assert writer.written == records(3, 8)
+
+
+def test_unwritten_records_of_an_ordered_insert():
+    batch = records(0, 5)
+    error = BulkWriteError({"writeErrors": [{"index": 2, "code": 6}], "nInserted": 2})
+    assert unwritten_records(batch, error) == records(2, 5)
+
+
+def test_unwritten_records_skip_duplicates_and_completed_operations():
+    batch = records(0, 4)
+    error = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}, {"index": 2, "code": 6}],
+                            "nUpserted": 1, "nMatched": 1})
+    assert unwritten_records(batch, error) == [{"i": 2}]
+
+
+def test_unwritten_records_of_any_other_error_is_the_whole_batch():
+    batch = records(0, 3)
+    assert unwritten_records(batch, ConnectionError("down")) == batch
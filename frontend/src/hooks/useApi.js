@@ -1,6 +1,35 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { apiService } from '../services/api';
 
+// Rows kept client-side per stream; older rows are dropped as deltas arrive
+const MAX_STREAM_ROWS = 1000;
+
+// Prepend a newest-first delta to newest-first rows, capped at MAX_STREAM_ROWS
+// Rows already held (pushed live, then fetched again on catch-up) are skipped
+const mergeDelta = (rows, delta) => {
+  if (delta.length === 0) return rows;
+  const seen = new Set(rows.map(row => row._id));
+  const fresh = delta.filter(row => !seen.has(row._id));
+  if (fresh.length === 0) return rows;
+  return [...fresh, ...rows].slice(0, MAX_STREAM_ROWS);
+};
+
+// Fetch everything after `since`, following has_more until caught up
+const fetchAllChanges = async (fetchChanges, since) => {
+  let watermark = since;
+  let items = [];
+  let result;
+  do {
+    result = await fetchChanges(watermark, MAX_STREAM_ROWS);
+    if (!result || !result.success) {
+      return { success: false, error: result?.error };
+    }
+    items = mergeDelta(items, result.data);
+    watermark = result.watermark;
+  } while (result.hasMore && since !== null);
+  return { success: true, data: items, watermark };
+};
+
 export const useApiStatus = () => {
   const [status, setStatus] = useState({
     isApiConnected: false,
@@ -66,23 +95,29 @@ export const useStreamingData = (autoRefresh = false) => {
   const [logsData, setLogsData] = useState([]);
   const [metricsData, setMetricsData] = useState([]);
   const [error, setError] = useState(null);
+  // Ingest watermarks of the newest rows we hold; null until the first load
+  const logsWatermark = useRef(null);
+  const metricsWatermark = useRef(null);
 
   const fetchStreamingData = useCallback(async () => {
     try {
-      // Fetch logs from file
-      const logsResult = await apiService.fetchLogs();
-      if (logsResult && logsResult.success && Array.isArray(logsResult.data)) {
-        setLogsData(logsResult.data); // Replace data completely since it's from file
+      // First call loads the latest rows, later calls only transfer new rows
+      const logsSince = logsWatermark.current;
+      const logsResult = await fetchAllChanges(apiService.fetchLogChanges, logsSince);
+      if (logsResult.success) {
+        logsWatermark.current = logsResult.watermark;
+        setLogsData(prev => (logsSince === null ? logsResult.data : mergeDelta(prev, logsResult.data)));
       } else {
-        console.warn('Failed to load logs:', logsResult?.error);
+        console.warn('Failed to load logs:', logsResult.error);
       }
 
-      // Fetch metrics from file
-      const metricsResult = await apiService.fetchMetrics();
-      if (metricsResult && metricsResult.success && Array.isArray(metricsResult.data)) {
-        setMetricsData(metricsResult.data); // Replace data completely since it's from file
+      const metricsSince = metricsWatermark.current;
+      const metricsResult = await fetchAllChanges(apiService.fetchMetricChanges, metricsSince);
+      if (metricsResult.success) {
+        metricsWatermark.current = metricsResult.watermark;
+        setMetricsData(prev => (metricsSince === null ? metricsResult.data : mergeDelta(prev, metricsResult.data)));
       } else {
-        console.warn('Failed to load metrics:', metricsResult?.error);
+        console.warn('Failed to load metrics:', metricsResult.error);
       }
 
       setError(null);
@@ -96,6 +131,9 @@ export const useStreamingData = (autoRefresh = false) => {
     setLogsData([]);
     setMetricsData([]);
     setError(null);
+    // Next fetch reloads the latest rows instead of a delta
+    logsWatermark.current = null;
+    metricsWatermark.current = null;
   };
 
   // Initial fetch on mount
@@ -103,21 +141,18 @@ export const useStreamingData = (autoRefresh = false) => {
     fetchStreamingData();
   }, []); // Run once on mount
 
-  // Auto-refresh effect (optional for demo)
+  // Live updates are pushed by the backend instead of polled
   useEffect(() => {
-    let intervalId = null;
-    
-    if (autoRefresh) {
-      intervalId = setInterval(() => {
-        fetchStreamingData();
-      }, 10000); // Refresh every 10 seconds for demo
-    }
-    
-    return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
-      }
-    };
+    if (!autoRefresh) return undefined;
+
+    const unsubscribe = apiService.subscribeStream({
+      // Pushed batches are oldest first, rows are newest first
+      onLogs: (events) => setLogsData(prev => mergeDelta(prev, [...events].reverse())),
+      onMetrics: (events) => setMetricsData(prev => mergeDelta(prev, [...events].reverse())),
+      // Catch up on anything stored while disconnected
+      onOpen: () => fetchStreamingData(),
+    });
+    return unsubscribe;
   }, [autoRefresh, fetchStreamingData]);
 
   return {
@@ -11,7 +11,10 @@ const api = axios.create({
 // API endpoints
 export const endpoints = {
   logs: `${API_BASE}/logs`,
+  logChanges: `${API_BASE}/logs/changes`,
   metrics: `${API_BASE}/metrics`,
+  metricChanges: `${API_BASE}/metrics/changes`,
+  stream: `${API_BASE}/stream`,
   commits: `${API_BASE}/commits`,
   commitsInfo: `${API_BASE}/commits/info`,
   status: `${API_BASE}/status`,
@@ -102,28 +105,97 @@ export const apiService = {
     }
   },
 
-  // Fetch logs from MongoDB via API
-  async fetchLogs() {
+  // Fetch a page of logs from MongoDB via API
+  // params: { limit, before, after, fields } - pass next_cursor as `before` for older logs
+  async fetchLogs(params = {}) {
     try {
-      const response = await api.get('/logs');
+      const response = await api.get('/logs', { params });
       console.log(`Loaded ${response.data.logs?.length || 0} logs from MongoDB`);
-      return { success: true, data: response.data.logs || [] };
+      return {
+        success: true,
+        data: response.data.logs || [],
+        nextCursor: response.data.next_cursor || null,
+        prevCursor: response.data.prev_cursor || null,
+      };
     } catch (error) {
       console.error('Error fetching logs from MongoDB:', error);
       return { success: false, error: error.message };
     }
   },
 
-  // Fetch metrics from MongoDB via API
-  async fetchMetrics() {
+  // Fetch a page of metrics from MongoDB via API
+  // params: { limit, before, after, fields } - pass next_cursor as `before` for older metrics
+  async fetchMetrics(params = {}) {
     try {
-      const response = await api.get('/metrics');
+      const response = await api.get('/metrics', { params });
       console.log(`Loaded ${response.data.metrics?.length || 0} metrics from MongoDB`);
-      return { success: true, data: response.data.metrics || [] };
+      return {
+        success: true,
+        data: response.data.metrics || [],
+        nextCursor: response.data.next_cursor || null,
+        prevCursor: response.data.prev_cursor || null,
+      };
     } catch (error) {
       console.error('Error fetching metrics from MongoDB:', error);
       return { success: false, error: error.message };
     }
+  },
+
+  // Fetch logs stored after a watermark (omit `since` for the latest logs)
+  async fetchLogChanges(since = null, limit = 1000) {
+    try {
+      const params = { limit };
+      if (since !== null) params.since = since;
+
+      const response = await api.get('/logs/changes', { params });
+      return {
+        success: true,
+        data: response.data.logs || [],
+        watermark: response.data.watermark ?? since,
+        hasMore: Boolean(response.data.has_more),
+      };
+    } catch (error) {
+      console.error('Error fetching log changes from MongoDB:', error);
+      return { success: false, error: error.message };
+    }
+  },
+
+  // Fetch metrics stored after a watermark (omit `since` for the latest metrics)
+  async fetchMetricChanges(since = null, limit = 1000) {
+    try {
+      const params = { limit };
+      if (since !== null) params.since = since;
+
+      const response = await api.get('/metrics/changes', { params });
+      return {
+        success: true,
+        data: response.data.metrics || [],
+        watermark: response.data.watermark ?? since,
+        hasMore: Boolean(response.data.has_more),
+      };
+    } catch (error) {
+      console.error('Error fetching metric changes from MongoDB:', error);
+      return { success: false, error: error.message };
+    }
+  },
+
+  // Subscribe to live logs/metrics pushed by the backend (server-sent events)
+  // handlers: { onLogs(events), onMetrics(events), onOpen() } - events are oldest first
+  // Returns a function that closes the subscription
+  subscribeStream(handlers = {}) {
+    const source = new EventSource(endpoints.stream);
+    const parse = (handler) => (event) => {
+      if (handler) handler(JSON.parse(event.data));
+    };
+    source.addEventListener('logs', parse(handlers.onLogs));
+    source.addEventListener('metrics', parse(handlers.onMetrics));
+    source.addEventListener('evicted', (event) => {
+      console.warn('Live stream evicted, reconnecting:', event.data);
+    });
+    // Fires on the first connect and after every automatic reconnect
+    source.onopen = () => handlers.onOpen && handlers.onOpen();
+    source.onerror = () => console.warn('Live stream disconnected, retrying...');
+    return () => source.close();
   }
 };
 